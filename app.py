@@ -3,9 +3,20 @@ Seattle Sounders Depth Chart Dashboard
 Shiny for Python app - embeddable via Shinylive
 """
 
+import asyncio
 import json
 import io
+import os
+import re
+import sys
 import base64
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -13,7 +24,8 @@ import matplotlib.pyplot as plt
 import matplotlib.patheffects as pe
 import matplotlib.patches as mpatches
 from matplotlib.path import Path as MplPath
-from scipy.stats import gaussian_kde
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 try:
     from mplsoccer import football_shirt_marker
@@ -22,6 +34,7 @@ except ImportError:
     HAS_MPLSOCCER = False
 
 from shiny import App, reactive, render, ui
+from shiny.types import SilentException
 
 # ============================================================
 # CONFIGURATION - EDIT THIS SECTION
@@ -46,6 +59,22 @@ PITCH_WIDTH = 80
 # Formation to use
 FORMATION = "4231"
 
+# Action map rendering: False = server-side matplotlib PNGs,
+# True = send compact event payloads and draw them on a canvas in the browser
+CLIENT_SIDE_RENDERING = False
+
+# Image encoding for server-rendered charts
+IMAGE_FORMAT = "png8"          # "png", "png8" (palette-quantized PNG), "webp" or "svg"
+VECTOR_IMAGE_FORMAT = "svg"    # Used for vector-friendly charts (radar)
+PNG_PALETTE_COLORS = 256       # Palette size for "png8"
+WEBP_QUALITY = 85
+IMAGE_BYTE_BUDGET = 200_000    # Max encoded bytes per image (None = no limit)
+
+# Render farm: number of worker processes for heavy charts (0 = render threads in
+# this process). Overridable with the RENDER_PROCESSES environment variable.
+RENDER_PROCESSES = int(os.environ.get("RENDER_PROCESSES", "0"))
+IS_RENDER_WORKER = False  # Set by the render-farm initializer inside worker processes
+
 # Roster designation labels
 ROSTER_DESIGNATIONS = {
     "DP": "Designated Player",
@@ -606,14 +635,252 @@ PLAYER_LOOKUP = SEASON_LOOKUPS[CURRENT_SEASON]["player_lookup"]
 MATCH_LOOKUP = SEASON_LOOKUPS[CURRENT_SEASON]["match_lookup"]
 MINUTES_LOOKUP = SEASON_LOOKUPS[CURRENT_SEASON]["minutes_lookup"]
 
+# ============================================================
+# DERIVED EVENT COLUMNS
+# ============================================================
+
+# export_data (or event_columns.py) writes each season's events sorted by
+# match/player/type, plus render-ready columns next to them: pitch-unit
+# coordinates, type codes and flag bits, and an offsets table per
+# (match, player, type). They are memory-mapped and used only when they were
+# built from the events file loaded above; otherwise the app derives from the
+# event dicts as before (select_view_events, get_game_stats).
+EVENT_COLUMNS_VERSION = 2
+
+
+class EventColumns:
+    """A season's derived event columns; row i describes SEASON_DATA[season][1][i]."""
+
+    def __init__(self, columns, offsets, index):
+        self.columns = columns
+        self.offsets = offsets
+        self.flags = index["flags"]
+        self.pitch = tuple(index["pitch"])
+        self.types = {name: code for code, name in enumerate(index["types"])}
+        self.match_codes = {m: i for i, m in enumerate(index["matches"])}
+        self.player_codes = {p: i for i, p in enumerate(index["players"])}
+
+    def rows(self, player_id=None, match_id=None):
+        """Row numbers (ascending) of a player's and/or a match's events."""
+        keep = np.ones(len(self.offsets), dtype=bool)
+        for field, codes, value in (("player", self.player_codes, player_id),
+                                    ("match", self.match_codes, match_id)):
+            if value is None:
+                continue
+            code = codes.get(str(value))
+            if code is None:
+                return np.zeros(0, dtype=np.int64)
+            keep &= self.offsets[field] == code
+        groups = self.offsets[keep]
+        if not len(groups):
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, stop) for start, stop in zip(groups["start"], groups["stop"])])
+
+    def is_type(self, columns, name):
+        return columns["type"] == self.types.get(name, -1)
+
+    def has(self, columns, flag):
+        return (columns["flags"] & self.flags[flag]) != 0
+
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError):  # No mmap (e.g. under Pyodide) - read it instead
+        return np.load(path)
+
+
+def load_event_columns(year: int):
+    """EventColumns for a season, or None if they're missing or don't match its events file."""
+    suffix = "" if year == CURRENT_SEASON else f"_{year}"
+    events_file = DATA_DIR / f"events{suffix}.json"
+    columns_file = DATA_DIR / f"event_columns{suffix}.npy"
+    offsets_file = DATA_DIR / f"event_offsets{suffix}.npy"
+    index_file = DATA_DIR / f"event_index{suffix}.json"
+    if not all(path.exists() for path in (events_file, columns_file, offsets_file, index_file)):
+        return None
+
+    with open(index_file) as f:
+        index = json.load(f)
+    with open(events_file, "rb") as f:
+        events_hash = hashlib.sha256(f.read()).hexdigest()
+    if index.get("version") != EVENT_COLUMNS_VERSION or index.get("events_sha256") != events_hash:
+        print(f"Derived event columns for {year} are stale - run event_columns.py to rebuild them")
+        return None
+
+    columns = _load_array(columns_file)
+    if len(columns) != len(SEASON_DATA[year][1]):
+        return None
+    return EventColumns(columns, _load_array(offsets_file), index)
+
+
+EVENT_COLUMNS = {year: load_event_columns(year) for year in SEASON_DATA}
+
+# ============================================================
+# PROCESS CACHE
+# ============================================================
+
+# Derived data and rendered images are shared by every session in the process.
+# Keys start with the season's data version, so a new data export never serves
+# stale entries.
+RENDER_CACHE_SIZE = 256        # Rendered images/HTML fragments
+GAME_STATS_CACHE_SIZE = 4096   # Per player per match stats dicts
+
+PROCESS_CACHES = {}
+
+
+def season_data_version(year: int):
+    """Fingerprint of a season's data files (name, size, mtime) for cache keys."""
+    suffix = "" if year == CURRENT_SEASON else f"_{year}"
+    parts = [str(year)]
+    for kind in ("players", "events", "matches"):
+        path = DATA_DIR / f"{kind}{suffix}.json"
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{path.name}:{stat.st_size}:{int(stat.st_mtime)}")
+    return "|".join(parts)
+
+
+SEASON_VERSIONS = {year: season_data_version(year) for year in SEASON_DATA}
+
+
+class ProcessCache:
+    """Thread-safe LRU cache shared across sessions, with hit/miss counters.
+
+    Concurrent requests for a key that is already being computed wait for that
+    result instead of computing it again. Cached values are shared - callers
+    must treat them as read-only.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, name, maxsize=256):
+        self.name = name
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        PROCESS_CACHES[name] = self
+
+    def get(self, key, default=None):
+        """Return the cached value (refreshing its LRU position) or default."""
+        with self._lock:
+            value = self._data.get(key, self._MISSING)
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value, computing it once (across threads) on a miss."""
+        with self._lock:
+            value = self._data.get(key, self._MISSING)
+            if value is not self._MISSING:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_exception(e)
+            raise
+        self.put(key, value)
+        with self._lock:
+            self._pending.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+def cache_stats():
+    """Counters for every process-wide cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in PROCESS_CACHES.items()}
+
+
+PLAYER_EVENTS_CACHE = ProcessCache("player_events", maxsize=512)
+GAME_EVENTS_CACHE = ProcessCache("game_events", maxsize=128)
+GAME_STATS_CACHE = ProcessCache("game_stats", maxsize=GAME_STATS_CACHE_SIZE)
+RENDER_CACHE = ProcessCache("render", maxsize=RENDER_CACHE_SIZE)
+
+
+def season_player_events(season, player_id):
+    """All of a player's events for a season."""
+    def compute():
+        events, columns = SEASON_DATA[season][1], EVENT_COLUMNS.get(season)
+        if columns is not None:
+            return [events[i] for i in columns.rows(player_id=player_id)]
+        return [e for e in events if e.get("player_id") == player_id]
+    return PLAYER_EVENTS_CACHE.get_or_compute((SEASON_VERSIONS[season], player_id), compute)
+
+
+def season_game_events(season, match_id):
+    """All events for one match of a season."""
+    def compute():
+        events, columns = SEASON_DATA[season][1], EVENT_COLUMNS.get(season)
+        if columns is not None:
+            return [events[i] for i in columns.rows(match_id=match_id)]
+        return [e for e in events if str(e.get("match_id")) == str(match_id)]
+    return GAME_EVENTS_CACHE.get_or_compute((SEASON_VERSIONS[season], str(match_id)), compute)
+
+
+def cached_game_stats(season, player_id, match_id):
+    """get_game_stats for a player/match, shared across sessions."""
+    def compute():
+        columns = EVENT_COLUMNS.get(season)
+        if columns is not None:
+            return game_stats_from_columns(columns, columns.rows(player_id, match_id))
+        return get_game_stats(player_id, match_id, season_player_events(season, player_id))
+    return GAME_STATS_CACHE.get_or_compute((SEASON_VERSIONS[season], player_id, str(match_id)), compute)
+
+
 def get_player_matches(player_id, season: int = CURRENT_SEASON):
     """Get list of matches a player appeared in."""
-    events_data = SEASON_DATA[season][1]
     match_lookup = SEASON_LOOKUPS[season]["match_lookup"]
 
     match_ids = set()
-    for e in events_data:
-        if e.get("player_id") == player_id and e.get("match_id"):
+    for e in season_player_events(season, player_id):
+        if e.get("match_id"):
             match_ids.add(e["match_id"])
 
     # Get match details and sort by date
@@ -626,6 +893,109 @@ def get_player_matches(player_id, season: int = CURRENT_SEASON):
     matches.sort(key=lambda m: m.get("start_date", ""), reverse=True)
     return matches
 
+
+# ============================================================
+# MAP VIEW EVENT SELECTION
+# ============================================================
+
+SHOT_EVENT_TYPES = ["Shot", "MissedShots", "SavedShot", "ShotOnPost", "Goal"]
+DEFENSIVE_EVENT_TYPES = ["Tackle", "Interception", "Clearance", "BallRecovery"]
+TOUCH_EVENT_TYPES = ["Pass", "Carry", "Reception"] + SHOT_EVENT_TYPES + DEFENSIVE_EVENT_TYPES
+
+# Events behind each stat drill-down (viz_type): (event types, derived flag the
+# events must have or None, whether they are drawn from start to end point)
+VIZ_EVENT_SELECTIONS = {
+    "key_passes": (["Pass"], "key_pass", True),
+    "assists": (["Pass"], "key_pass", True),  # Approximation: key passes
+    "all_carries": (["Carry"], None, True),
+    "carries": (["Carry"], None, True),
+    "all_passes": (["Pass"], None, True),
+    "progressive_passes": (["Pass"], "progressive_pass", True),
+    "final_third_passes": (["Pass"], "final_third_pass", True),
+    "deep_passes": (["Pass"], "deep_pass", True),
+    "final_third_carries": (["Carry"], "final_third_carry", True),
+    "deep_carries": (["Carry"], "deep_carry", True),
+    "progressive_carries": (["Carry"], "progressive_carry", True),
+    "goals": (["Goal"], None, False),
+    "all_shots": (SHOT_EVENT_TYPES, None, False),
+    "shots_on_target": (["SavedShot", "Goal"], None, False),
+    "all_defensive": (DEFENSIVE_EVENT_TYPES, None, False),
+    "tackles": (["Tackle"], None, False),
+    "interceptions": (["Interception"], None, False),
+    "clearances": (["Clearance"], None, False),
+    "recoveries": (["BallRecovery"], None, False),
+    "all_receptions": (["Reception"], None, False),
+    "final_third_receptions": (["Reception"], "final_third_reception", False),
+    "deep_receptions": (["Reception"], "deep_reception", False),
+}
+
+VIZ_TITLES = {
+    "key_passes": "Key Passes", "assists": "Assists", "all_carries": "Carries",
+    "carries": "Carries", "clearances": "Clearances", "tackles": "Tackles",
+    "interceptions": "Interceptions", "recoveries": "Ball Recoveries", "goals": "Goals",
+    "all_shots": "All Shots", "shots_on_target": "Shots on Target",
+    "all_defensive": "Defensive Actions", "all_passes": "All Passes",
+    "progressive_passes": "Progressive Passes", "final_third_passes": "Final Third Passes",
+    "deep_passes": "Deep Passes", "final_third_carries": "Final Third Carries",
+    "deep_carries": "Deep Carries", "progressive_carries": "Progressive Carries",
+    "all_receptions": "Receptions", "final_third_receptions": "Final Third Receptions",
+    "deep_receptions": "Deep Receptions"
+}
+
+# Heat map types without a drill-down; Pass and Carry maps can show end points
+HEATMAP_EVENT_SELECTIONS = {
+    "Overview": (TOUCH_EVENT_TYPES, None, False),
+    "Defensive": (DEFENSIVE_EVENT_TYPES, None, False),
+    "Shot": (SHOT_EVENT_TYPES, None, False),
+    "Pass": (["Pass"], None, True),
+    "Carry": (["Carry"], None, True),
+    "Reception": (["Reception"], None, False),
+}
+
+# The derived flags tested on an event dict, for seasons without derived columns
+EVENT_FLAG_TESTS = {
+    "key_pass": lambda e: e.get("is_keypass", False),
+    "progressive_pass": lambda e: e.get("is_progressive_pass", False),
+    "final_third_pass": lambda e: e.get("is_final_third_pass", False),
+    "deep_pass": lambda e: e.get("is_deep_pass", False),
+    "progressive_carry": lambda e: e.get("is_progressive_carry", False),
+    "final_third_carry": lambda e: e.get("is_final_third_carry", False),
+    "deep_carry": lambda e: e.get("is_deep_carry", False),
+    "final_third_reception": lambda e: e.get("x") is not None and e["x"] >= 66.67,
+    "deep_reception": lambda e: e.get("x") is not None and e["x"] >= 83.33,
+}
+
+
+def select_view_events(season, player_id, selection, match_id=None, require_start=True, require_end=False):
+    """A player's events for a map view selection (optionally one match), in season order.
+
+    require_start/require_end drop events missing start/end coordinates. Seasons
+    with derived columns are selected with type code and flag masks; the event
+    dicts are only read to return them.
+    """
+    types, flag, _ = selection
+    events, columns = SEASON_DATA[season][1], EVENT_COLUMNS.get(season)
+    if columns is not None:
+        rows = columns.rows(player_id=player_id, match_id=match_id)
+        c = columns.columns[rows]
+        keep = np.isin(c["type"], [columns.types[t] for t in types if t in columns.types])
+        if flag:
+            keep &= columns.has(c, flag)
+        if require_start:
+            keep &= ~np.isnan(c["x"]) & ~np.isnan(c["y"])
+        if require_end:
+            keep &= columns.has(c, "has_end")
+        return [events[i] for i in rows[keep]]
+
+    test = EVENT_FLAG_TESTS[flag] if flag else None
+    return [e for e in season_player_events(season, player_id)
+            if (match_id is None or str(e.get("match_id")) == str(match_id))
+            and e["type_display_name"] in types
+            and (test is None or test(e))
+            and (not require_start or (e["x"] is not None and e["y"] is not None))
+            and (not require_end or (e.get("end_x") is not None and e.get("end_y") is not None))]
+
+
 # ============================================================
 # JERSEY MARKER
 # ============================================================
@@ -672,17 +1042,122 @@ def sanitize_id(name):
     return safe
 
 
+# ============================================================
+# PLAYER NAME INDEX
+# ============================================================
+
+# Depth-chart spellings that differ from the data export: {"Depth Chart Name": "Export Name"}
+PLAYER_NAME_ALIASES = {
+    "Gomez": "Sebastian Gomez",
+    "Kingston": "Peter Kingston",
+}
+
+_AMBIGUOUS = object()
+_name_indexes = {}  # id(player_lookup) -> PlayerNameIndex
+
+
+def normalize_name(name):
+    """Accent-stripped, lower-case name with punctuation collapsed ("A.López" -> "a lopez")."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text.casefold()).strip()
+
+
+class PlayerNameIndex:
+    """Name -> player record resolution for one player lookup, built once per data snapshot.
+
+    Exact names, aliases, player_ids and accent-stripped names resolve directly.
+    Initial-and-surname forms ("A.Lopez") resolve only when exactly one player has
+    them ("C.Roldan" would match both brothers, so it resolves to None). Bare
+    surnames aren't matched: a lookup can hold a different player with the same
+    surname, so depth-chart short names go in PLAYER_NAME_ALIASES.
+    """
+
+    def __init__(self, player_lookup, aliases=None):
+        self.lookup = player_lookup
+        self.exact = dict(player_lookup)
+        self.by_id = {}
+        self.normalized = {}
+        self.short = {}
+        for name, record in player_lookup.items():
+            if record.get("player_id") is not None:
+                self.by_id[str(record["player_id"])] = record
+            key = normalize_name(name)
+            self._add(self.normalized, key, record)
+            tokens = key.split()
+            if len(tokens) > 1:
+                self._add(self.short, f"{tokens[0][0]} {tokens[-1]}", record)
+        for alias, target in (aliases or {}).items():
+            if target in player_lookup:
+                self.exact.setdefault(alias, player_lookup[target])
+        self.ambiguous = sorted(key for table in (self.normalized, self.short)
+                                for key, record in table.items() if record is _AMBIGUOUS)
+
+    @staticmethod
+    def _add(table, key, record):
+        if not key:
+            return
+        existing = table.get(key)
+        if existing is None:
+            table[key] = record
+        elif existing is not record:
+            table[key] = _AMBIGUOUS
+
+    def resolve(self, name):
+        """Player record for a name or player_id; None if unknown or ambiguous."""
+        if name is None:
+            return None
+        if name in self.exact:
+            return self.exact[name]
+        if str(name) in self.by_id:
+            return self.by_id[str(name)]
+        key = normalize_name(name)
+        for table in (self.normalized, self.short):
+            record = table.get(key)
+            if record is not None:
+                return None if record is _AMBIGUOUS else record
+        return None
+
+
+def player_name_index(player_lookup):
+    """The PlayerNameIndex for a player lookup dict, built on first use."""
+    index = _name_indexes.get(id(player_lookup))
+    if index is None or index.lookup is not player_lookup:
+        index = PlayerNameIndex(player_lookup, PLAYER_NAME_ALIASES)
+        _name_indexes[id(player_lookup)] = index
+    return index
+
+
 def get_player_data(name, player_lookup=None):
-    """Get player data by name, with fuzzy matching."""
+    """Get player data by name or player_id (see PlayerNameIndex for accepted forms)."""
     if player_lookup is None:
         player_lookup = PLAYER_LOOKUP
-    if name in player_lookup:
-        return player_lookup[name]
-    name_lower = name.lower()
-    for pname, pdata in player_lookup.items():
-        if name_lower in pname.lower() or pname.lower() in name_lower:
-            return pdata
-    return None
+    return player_name_index(player_lookup).resolve(name)
+
+
+PLAYER_PHOTO_PLACEHOLDER = "https://images.mlssoccer.com/image/private/t_thumb_squared/f_png/mls/player-placeholder.png"
+
+# Earlier seasons whose photos stand in for a missing or placeholder one
+PHOTO_FALLBACK_SEASONS = {2026: [2025, 2024], 2025: [2024]}
+PHOTO_FALLBACK_CHARTS = {2025: DEPTH_CHART, 2024: DEPTH_CHART_2024}
+_fallback_chart_photos = {}
+
+
+def is_placeholder_photo(url):
+    return not url or url == PLAYER_PHOTO_PLACEHOLDER
+
+
+def fallback_chart_photos(season):
+    """{name: first real photo} from a fallback season's depth chart."""
+    photos = _fallback_chart_photos.get(season)
+    if photos is None:
+        photos = {}
+        for players in PHOTO_FALLBACK_CHARTS.get(season, {}).values():
+            for p in players:
+                if p.get("name") not in photos and not is_placeholder_photo(p.get("photo")):
+                    photos[p["name"]] = p["photo"]
+        _fallback_chart_photos[season] = photos
+    return photos
 
 
 def get_player_photo_with_fallback(name, season, depth_chart_entry=None):
@@ -691,8 +1166,6 @@ def get_player_photo_with_fallback(name, season, depth_chart_entry=None):
     For 2026 players who were also on the team in 2025, use their 2025 photo
     if the 2026 photo is missing or a placeholder.
     """
-    PLACEHOLDER_URL = "https://images.mlssoccer.com/image/private/t_thumb_squared/f_png/mls/player-placeholder.png"
-
     # Try to get photo from current season's depth chart entry
     photo_url = None
     if depth_chart_entry:
@@ -704,32 +1177,190 @@ def get_player_photo_with_fallback(name, season, depth_chart_entry=None):
     if player_data and player_data.get("image_url"):
         photo_url = player_data.get("image_url")
 
-    # If photo is missing or placeholder, try previous seasons
-    if not photo_url or photo_url == PLACEHOLDER_URL:
-        # Try 2025 first, then 2024
-        fallback_seasons = [2025, 2024] if season == 2026 else ([2024] if season == 2025 else [])
-
-        for fallback_year in fallback_seasons:
-            # Check depth chart for fallback season
-            fallback_depth_chart = DEPTH_CHART if fallback_year == 2025 else DEPTH_CHART_2024
-            for pos, players in fallback_depth_chart.items():
-                for p in players:
-                    if p.get("name") == name:
-                        fallback_photo = p.get("photo")
-                        if fallback_photo and fallback_photo != PLACEHOLDER_URL:
-                            return fallback_photo
+    # If photo is missing or placeholder, try previous seasons (depth chart, then player lookup)
+    if is_placeholder_photo(photo_url):
+        for fallback_year in PHOTO_FALLBACK_SEASONS.get(season, []):
+            fallback_photo = fallback_chart_photos(fallback_year).get(name)
+            if fallback_photo:
+                return fallback_photo
 
-            # Also check player lookup for fallback season
             fallback_lookup = SEASON_LOOKUPS.get(fallback_year, {}).get("player_lookup", {})
             fallback_player = get_player_data(name, fallback_lookup)
-            if fallback_player and fallback_player.get("image_url"):
-                fallback_img = fallback_player.get("image_url")
-                if fallback_img and fallback_img != PLACEHOLDER_URL:
-                    return fallback_img
+            if fallback_player and not is_placeholder_photo(fallback_player.get("image_url")):
+                return fallback_player["image_url"]
 
     return photo_url
 
 
+# ============================================================
+# PHOTO CACHE
+# ============================================================
+
+# Headshots are downloaded once, resized, and served from data/photos/{season}/
+# so the browser doesn't hot-link the MLS CDN. Shinylive (Pyodide) has no
+# sockets or threads, so there the remote URLs are used as before.
+PHOTO_CACHE_DIR = DATA_DIR / "photos"
+PHOTO_URL_PREFIX = "photos"     # Relative, so URLs resolve under the deploy subpath
+PHOTO_THUMB_SIZE = 160          # px, square thumbnails (displayed at 80px)
+PHOTO_FETCH_TIMEOUT = 10        # seconds per download
+PHOTO_FETCH_WORKERS = 8
+PHOTO_CACHE_ENABLED = sys.platform != "emscripten"
+
+_photo_executor = None
+_photo_inflight = set()
+_photo_failed = set()           # (name, season) pairs not retried until restart
+_photo_failed_seasons = set()   # Seasons whose download failures were already logged
+_photo_prewarm_started = False
+_photo_lock = threading.Lock()
+
+
+def photo_cache_path(name, season):
+    """Local thumbnail path for a player/season."""
+    return PHOTO_CACHE_DIR / str(season) / f"{sanitize_id(name)}.png"
+
+
+def _download_thumbnail(url, dest, season):
+    """Download an image, resize it to a square thumbnail and write it atomically."""
+    import urllib.request
+    from PIL import Image
+
+    try:
+        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        with urllib.request.urlopen(req, timeout=PHOTO_FETCH_TIMEOUT) as resp:
+            img = Image.open(io.BytesIO(resp.read()))
+            img.load()
+        img = img.convert("RGBA")
+        img.thumbnail((PHOTO_THUMB_SIZE, PHOTO_THUMB_SIZE), Image.LANCZOS)
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_suffix(".tmp")
+        img.save(tmp, format="PNG", optimize=True)
+        os.replace(tmp, dest)
+        return True
+    except Exception as e:
+        with _photo_lock:
+            first = season not in _photo_failed_seasons
+            _photo_failed_seasons.add(season)
+        if first:
+            print(f"Photo cache: {season} downloads failing ({e}), using remote URLs for those players")
+        return False
+
+
+def _claim_photo(name, season, url):
+    """Reserve a download slot; returns the destination path, or None if cached/in flight."""
+    if not PHOTO_CACHE_ENABLED or not url or not url.startswith("http"):
+        return None
+    dest = photo_cache_path(name, season)
+    key = (name, season)
+    with _photo_lock:
+        if dest.exists() or key in _photo_inflight or key in _photo_failed:
+            return None
+        _photo_inflight.add(key)
+    return dest
+
+
+def _fetch_photo(name, season, url, dest):
+    ok = False
+    try:
+        ok = _download_thumbnail(url, dest, season)
+        return ok
+    finally:
+        with _photo_lock:
+            _photo_inflight.discard((name, season))
+            if not ok:
+                _photo_failed.add((name, season))
+
+
+def _get_photo_executor():
+    global _photo_executor
+    with _photo_lock:
+        if _photo_executor is None:
+            _photo_executor = ThreadPoolExecutor(max_workers=PHOTO_FETCH_WORKERS,
+                                                 thread_name_prefix="photo")
+        return _photo_executor
+
+
+def request_photo(name, season, url):
+    """Queue a background download of a player's photo if it isn't cached yet.
+    Returns whether a download was queued."""
+    dest = _claim_photo(name, season, url)
+    if dest is None:
+        return False
+    _get_photo_executor().submit(_fetch_photo, name, season, url, dest)
+    return True
+
+
+def cached_photo_url(name, season, remote_url):
+    """Serve the local thumbnail if cached; otherwise queue a download and use the remote URL."""
+    if not PHOTO_CACHE_ENABLED or not remote_url:
+        return remote_url
+    path = photo_cache_path(name, season)
+    if path.exists():
+        return f"{PHOTO_URL_PREFIX}/{season}/{path.name}"
+    request_photo(name, season, remote_url)
+    return remote_url
+
+
+# Every depth-chart player's photo, resolved once (placeholders and the fallback
+# chain included) so player_info does a single lookup per render
+PHOTO_TABLE_CHARTS = [
+    (2024, DEPTH_CHART_2024), (2025, DEPTH_CHART), (2026, DEPTH_CHART_2026),
+    (2024, DEFIANCE_DEPTH_CHART_2024), (2025, DEFIANCE_DEPTH_CHART), (2026, DEFIANCE_DEPTH_CHART_2026),
+]
+
+
+def build_photo_table():
+    """{(season, name, depth-chart photo): resolved URL} for every depth-chart entry."""
+    table = {}
+    for season, chart in PHOTO_TABLE_CHARTS:
+        for players in chart.values():
+            for p in players:
+                key = (season, p["name"], p.get("photo"))
+                if key not in table:
+                    table[key] = get_player_photo_with_fallback(p["name"], season, p)
+    return table
+
+
+PHOTO_TABLE = build_photo_table()
+
+
+def player_photo_url(name, season, depth_chart_entry=None):
+    """Resolved photo URL for a player/season.
+
+    Players off the depth charts are resolved once if the name is on the season's
+    roster as spelled. Other names (they come from the client) are resolved on
+    every call rather than stored, so PHOTO_TABLE can't grow without bound."""
+    key = (season, name, depth_chart_entry.get("photo") if depth_chart_entry else None)
+    url = PHOTO_TABLE.get(key)
+    if url is None and key not in PHOTO_TABLE:
+        url = get_player_photo_with_fallback(name, season, depth_chart_entry)
+        if name in SEASON_LOOKUPS.get(season, {}).get("player_lookup", {}):
+            PHOTO_TABLE[key] = url
+    return url
+
+
+def prewarm_photo_cache():
+    """Queue downloads for every photo in PHOTO_TABLE (runs in the background).
+
+    Called when the first session starts rather than at import, so importing the
+    app (deploy checks, render workers) doesn't start any downloads."""
+    global _photo_prewarm_started
+    if not PHOTO_CACHE_ENABLED or IS_RENDER_WORKER:
+        return
+    with _photo_lock:
+        if _photo_prewarm_started:
+            return
+        _photo_prewarm_started = True
+    queued = sum(request_photo(name, season, url) for (season, name, _), url in list(PHOTO_TABLE.items()))
+    if queued:
+        print(f"Photo cache: queued {queued} downloads")
+
+
+# static_assets only mounts a directory that exists when the App is built
+if PHOTO_CACHE_ENABLED:
+    PHOTO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+
 def get_game_stats(player_id, match_id, events_data=None):
     """Calculate stats for a specific game from events data."""
     if events_data is None:
@@ -815,6 +1446,73 @@ def get_game_stats(player_id, match_id, events_data=None):
     }
 
 
+def game_stats_from_columns(columns, rows):
+    """get_game_stats for the given rows of a season's derived event columns.
+
+    Counts come from the precomputed type codes and flags; sums run over the
+    same values in the same order, so the results are identical.
+    """
+    if not len(rows):
+        return None
+    c = columns.columns[rows]
+    gplus = c["gplus"]
+
+    def count(mask):
+        return int(np.count_nonzero(mask))
+
+    def total(values, *masks):
+        # Left to right, mask by mask - the order get_game_stats adds in
+        return sum(v for mask in masks for v in values[mask].tolist())
+
+    passes, carries, receptions = (columns.is_type(c, t) for t in ("Pass", "Carry", "Reception"))
+    tackles, interceptions, clearances, recoveries = (
+        columns.is_type(c, t) for t in ("Tackle", "Interception", "Clearance", "BallRecovery"))
+    shots = columns.has(c, "shot")
+    successful = columns.has(c, "successful")
+
+    pv_passing = total(gplus, passes)
+    pv_carrying = total(gplus, carries)
+    pv_receiving = total(gplus, receptions)
+    pv_defending = total(gplus, tackles, interceptions, clearances, recoveries)
+    pv_shooting = total(gplus, shots)
+
+    return {
+        "gp": 1,
+        "gs": 1,  # Can't determine from events
+        "goals": count(columns.has(c, "goal")),
+        "assists": count(columns.has(c, "assist")),
+        "total_passes": count(passes),
+        "passes": count(passes & successful),
+        "key_passes": count(passes & columns.has(c, "key_pass")),
+        "progressive_passes": count(passes & columns.has(c, "progressive_pass") & successful),
+        "final_third_passes": count(passes & columns.has(c, "final_third_pass") & successful),
+        "deep_passes": count(passes & columns.has(c, "deep_pass") & successful),
+        "xg_assisted": count(passes & columns.has(c, "shot_assist")) * 0.15,
+        "carries": count(carries),
+        "final_third_carries": count(carries & columns.has(c, "final_third_carry")),
+        "deep_carries": count(carries & columns.has(c, "deep_carry")),
+        "progressive_carries": count(carries & columns.has(c, "progressive_carry")),
+        "receptions": count(receptions),
+        "final_third_receptions": count(columns.has(c, "final_third_reception")),
+        "deep_receptions": count(columns.has(c, "deep_reception")),
+        "shots": count(shots),
+        "shots_on_target": count(columns.has(c, "on_target")),
+        "tackles": count(tackles),
+        "interceptions": count(interceptions),
+        "clearances": count(clearances),
+        "ball_recoveries": count(recoveries),
+        "defensive_actions": count(tackles) + count(interceptions) + count(clearances) + count(recoveries),
+        "pv_total": pv_passing + pv_carrying + pv_receiving + pv_defending + pv_shooting,
+        "pv_passing": pv_passing,
+        "pv_carrying": pv_carrying,
+        "pv_receiving": pv_receiving,
+        "pv_defending": pv_defending,
+        "pv_shooting": pv_shooting,
+        "xg": total(c["xg"], shots),
+        "mins": 90,  # Assume 90 for single game stats
+    }
+
+
 def calculate_roster_counts(depth_chart, year: int = 2025, team: str = "first_team"):
     """Calculate roster slot counts from depth chart data.
 
@@ -975,7 +1673,9 @@ PLAYER_LOOKUP = SEASON_LOOKUPS[CURRENT_SEASON]["player_lookup"]
 
 def create_pitch_figure(figsize=(10, 15)):
     """Create a 120x80 vertical pitch figure."""
-    fig, ax = plt.subplots(figsize=figsize, facecolor=PITCH_COLOR)
+    fig = Figure(figsize=figsize, facecolor=PITCH_COLOR)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     ax.set_facecolor(PITCH_COLOR)
 
     lw = 1.5  # Line width
@@ -1047,14 +1747,309 @@ def draw_jersey(ax, x, y, color=JERSEY_GREEN, size=800, number=None):
                edgecolor=ACCENT_WHITE, linewidth=1.5, zorder=4)
 
 
-def fig_to_base64(fig, dpi=120):
-    """Convert matplotlib figure to base64 string."""
+IMAGE_MIME_TYPES = {
+    "png": "image/png",
+    "png8": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+# Recent encode results (format, size, time) for monitoring payload sizes
+ENCODE_STATS = deque(maxlen=500)
+
+
+def _save_figure(fig, fmt, dpi):
+    """Save a figure to bytes in a matplotlib-native format."""
     buf = io.BytesIO()
-    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight',
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight',
                 facecolor=fig.get_facecolor(), edgecolor='none', pad_inches=0.1)
-    buf.seek(0)
+    return buf.getvalue()
+
+
+def _encode_raster(png_bytes, fmt, colors=PNG_PALETTE_COLORS, quality=WEBP_QUALITY):
+    """Re-encode a rendered PNG as a palette PNG or WebP."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(png_bytes))
+    out = io.BytesIO()
+    if fmt == "png8":
+        # Fast octree is the only quantizer that keeps the alpha channel
+        img.convert("RGBA").quantize(colors=colors, method=Image.Quantize.FASTOCTREE).save(
+            out, format="PNG", optimize=True)
+    else:
+        img.save(out, format="WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+
+def encode_figure(fig, dpi=120, fmt=None, byte_budget=IMAGE_BYTE_BUDGET):
+    """Encode a figure to image bytes, stepping down quality to fit the byte budget.
+
+    Returns (data, mime_type, stats). Does not close the figure.
+    """
+    fmt = fmt or IMAGE_FORMAT
+    start = time.perf_counter()
+
+    # Candidate encodings in order of preference: requested format first,
+    # then smaller palettes, then lower resolution
+    attempts = [(fmt, dpi, PNG_PALETTE_COLORS, WEBP_QUALITY)]
+    if byte_budget:
+        raster_fmt = fmt if fmt in ("png8", "webp") else "png8"
+        attempts += [
+            (raster_fmt, dpi, 64, 70),
+            (raster_fmt, int(dpi * 0.75), 64, 60),
+            (raster_fmt, int(dpi * 0.5), 32, 50),
+        ]
+
+    rendered = {}
+    for attempt_fmt, attempt_dpi, colors, quality in attempts:
+        if attempt_fmt == "svg":
+            data = _save_figure(fig, "svg", attempt_dpi)
+        else:
+            if attempt_dpi not in rendered:
+                rendered[attempt_dpi] = _save_figure(fig, "png", attempt_dpi)
+            data = rendered[attempt_dpi]
+            if attempt_fmt in ("png8", "webp"):
+                data = _encode_raster(data, attempt_fmt, colors=colors, quality=quality)
+        if not byte_budget or len(data) <= byte_budget:
+            break
+
+    stats = {
+        "format": attempt_fmt,
+        "requested_format": fmt,
+        "dpi": attempt_dpi,
+        "bytes": len(data),
+        "base64_bytes": 4 * ((len(data) + 2) // 3),
+        "encode_ms": round((time.perf_counter() - start) * 1000, 1),
+        "over_budget": bool(byte_budget) and len(data) > byte_budget,
+    }
+    ENCODE_STATS.append(stats)
+    return data, IMAGE_MIME_TYPES[attempt_fmt], stats
+
+
+def encoder_summary():
+    """Summarize recent encodes: count, mean size and mean encode time per format."""
+    summary = {}
+    for s in ENCODE_STATS:
+        entry = summary.setdefault(s["format"], {"count": 0, "bytes": 0, "encode_ms": 0.0, "over_budget": 0})
+        entry["count"] += 1
+        entry["bytes"] += s["bytes"]
+        entry["encode_ms"] += s["encode_ms"]
+        entry["over_budget"] += int(s["over_budget"])
+    for entry in summary.values():
+        entry["mean_bytes"] = entry["bytes"] // entry["count"]
+        entry["mean_encode_ms"] = round(entry["encode_ms"] / entry["count"], 1)
+    return summary
+
+
+def fig_to_base64(fig, dpi=120):
+    """Convert matplotlib figure to a base64 PNG string."""
+    data, _, _ = encode_figure(fig, dpi=dpi, fmt="png", byte_budget=None)
     plt.close(fig)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    return base64.b64encode(data).decode('utf-8')
+
+
+def fig_to_data_uri(fig, dpi=120, fmt=None, close=True):
+    """Encode a matplotlib figure with the configured encoder as a data: URI.
+
+    Pass close=False for pooled figures, which are released back to FIGURE_POOL instead.
+    """
+    data, mime, _ = encode_figure(fig, dpi=dpi, fmt=fmt)
+    if close:
+        plt.close(fig)
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+# ============================================================
+# FIGURE POOL
+# ============================================================
+
+FIGURE_POOL_MAX_IDLE = 4   # Idle figures kept per view type
+HEATMAP_BG = "#000000"
+RADAR_AXES = 5
+
+
+def draw_horizontal_pitch(ax, width=120, height=80, line_col="#ffffff", lw=2):
+    """Draw horizontal pitch markings (attacking right) above the data layers."""
+    # Outer boundary - draw as rectangle to ensure all sides visible
+    rect = plt.Rectangle((0, 0), width, height, fill=False,
+                         edgecolor=line_col, linewidth=lw, zorder=10)
+    ax.add_patch(rect)
+
+    # Center line and circle
+    ax.plot([width/2, width/2], [0, height], color=line_col, lw=lw, zorder=10)
+    circle = plt.Circle((width/2, height/2), 10, fill=False, color=line_col, lw=lw, zorder=10)
+    ax.add_patch(circle)
+    ax.scatter(width/2, height/2, s=25, color=line_col, zorder=10)
+
+    # Penalty areas (18 yards deep, 44 yards wide)
+    box_depth, box_height = 18, 44
+    box_top = (height - box_height) / 2
+    ax.plot([0, box_depth, box_depth, 0],
+            [box_top, box_top, box_top + box_height, box_top + box_height],
+            color=line_col, lw=lw, zorder=10)
+    ax.plot([width, width - box_depth, width - box_depth, width],
+            [box_top, box_top, box_top + box_height, box_top + box_height],
+            color=line_col, lw=lw, zorder=10)
+
+    # 6-yard boxes
+    six_depth, six_height = 6, 20
+    six_top = (height - six_height) / 2
+    ax.plot([0, six_depth, six_depth, 0],
+            [six_top, six_top, six_top + six_height, six_top + six_height],
+            color=line_col, lw=lw, zorder=10)
+    ax.plot([width, width - six_depth, width - six_depth, width],
+            [six_top, six_top, six_top + six_height, six_top + six_height],
+            color=line_col, lw=lw, zorder=10)
+
+    # Penalty spots
+    ax.scatter(12, height/2, s=25, color=line_col, zorder=10)
+    ax.scatter(width - 12, height/2, s=25, color=line_col, zorder=10)
+
+    # Small padding to show full boundary
+    ax.set_xlim(-1, width + 1)
+    ax.set_ylim(-1, height + 1)
+    ax.set_aspect('equal')
+    ax.axis('off')
+
+
+def create_heatmap_figure(figsize=(10, 7)):
+    """Create a horizontal 120x80 pitch on a black background (heat maps, trajectories)."""
+    fig = Figure(figsize=figsize, facecolor=HEATMAP_BG)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor(HEATMAP_BG)
+    draw_horizontal_pitch(ax)
+    return fig, ax
+
+
+def create_export_figure():
+    """Create the action map export layout: header/footer space around a horizontal pitch."""
+    fig = Figure(figsize=(12, 9), facecolor='#0a0a0a')
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0.05, 0.18, 0.9, 0.70])
+    ax.set_facecolor(HEATMAP_BG)
+    draw_horizontal_pitch(ax)
+    return fig, ax
+
+
+def radar_angles(n=RADAR_AXES):
+    """Angles for each radar axis (closed loop), starting from the bottom."""
+    angles = [i / float(n) * 2 * np.pi + np.pi/2 for i in range(n)]
+    return angles + angles[:1]
+
+
+def create_radar_figure():
+    """Create the empty pentagon radar: polar axes with grid and spokes."""
+    fig = Figure(figsize=(6, 6), facecolor='none')
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(polar=True)
+    ax.set_facecolor('none')
+
+    angles = radar_angles()
+
+    # Pentagon grid lines
+    for i in [0.25, 0.5, 0.75, 1.0]:
+        ax.plot(angles, [i] * (RADAR_AXES + 1), color='#444444', linewidth=1.5, linestyle='-', alpha=0.6)
+
+    # Axis lines from center to each point
+    for angle in angles[:-1]:
+        ax.plot([angle, angle], [0, 1], color='#444444', linewidth=1.5, alpha=0.6)
+
+    ax.set_ylim(0, 1)
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.spines['polar'].set_visible(False)
+    return fig, ax
+
+
+class FigurePool:
+    """Thread-safe pool of pre-built Agg figures, one free list per view type.
+
+    Each view type has a factory that builds the figure with its static artists
+    (pitch markings, radar grid). Renders acquire a figure, draw on it, encode it
+    and release it; release removes only the artists added since the figure was built.
+    """
+
+    def __init__(self, max_idle=FIGURE_POOL_MAX_IDLE):
+        self.max_idle = max_idle
+        self._factories = {}
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def register(self, view, factory):
+        """Register a factory returning (fig, ax) for a view type."""
+        self._factories[view] = factory
+        self._idle.setdefault(view, [])
+
+    def acquire(self, view):
+        """Check out a (fig, ax) pair for the view type, building one if none are idle."""
+        with self._lock:
+            idle = self._idle[view]
+            if idle:
+                self.reused += 1
+                return idle.pop()
+            self.created += 1
+
+        fig, ax = self._factories[view]()
+        static = set(fig.texts)
+        for a in fig.axes:
+            static.update(a.get_children())
+        limits = [(a.get_xlim(), a.get_ylim()) for a in fig.axes]
+        fig._pool_state = (view, ax, static, limits)
+        return fig, ax
+
+    @contextmanager
+    def figure(self, view):
+        """acquire() a (fig, ax) pair for the block and release it afterwards, even if drawing fails."""
+        fig, ax = self.acquire(view)
+        try:
+            yield fig, ax
+        finally:
+            self.release(fig)
+
+    def release(self, fig):
+        """Clear dynamic artists and return the figure to its free list."""
+        view, ax, static, limits = fig._pool_state
+        if len(fig.axes) != len(limits):
+            return  # Layout was changed by the caller - let it be garbage collected
+
+        for a, (xlim, ylim) in zip(fig.axes, limits):
+            for artist in a.get_children():
+                if artist not in static and hasattr(artist, "remove"):
+                    try:
+                        artist.remove()
+                    except NotImplementedError:
+                        pass
+            a.set_title("")
+            a.set_prop_cycle(None)
+            a.set_xlim(xlim)
+            a.set_ylim(ylim)
+        for text in list(fig.texts):
+            if text not in static:
+                text.remove()
+
+        with self._lock:
+            idle = self._idle[view]
+            if len(idle) < self.max_idle:
+                idle.append((fig, ax))
+
+    def stats(self):
+        """Created/reused counts and idle figures per view type."""
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "idle": {view: len(idle) for view, idle in self._idle.items()},
+            }
+
+
+FIGURE_POOL = FigurePool()
+FIGURE_POOL.register("pitch", lambda: create_pitch_figure(figsize=(8, 12)))
+FIGURE_POOL.register("heatmap", create_heatmap_figure)
+FIGURE_POOL.register("export", create_export_figure)
+FIGURE_POOL.register("radar", create_radar_figure)
 
 
 def create_radar_chart(player_data, is_per_90=False, accent_color=None):
@@ -1093,91 +2088,1314 @@ def create_radar_chart(player_data, is_per_90=False, accent_color=None):
         pv_raw = player_data.get(key, 0) or 0
         per_90_values.append(round(pv_raw / per_90_divisor, 2))
 
-    # Number of variables
-    N = len(categories)
+    # The image depends only on the shape, labels and colour, so players with the
+    # same percentiles share one rendered radar
+    render_key = ("radar", tuple(values), tuple(raw_pcts), accent_color, VECTOR_IMAGE_FORMAT)
+    img_data = RENDER_CACHE.get(render_key)
+    if img_data is not None:
+        return img_data
 
     # Compute angle for each axis - start from bottom (flipped) with point facing down
-    angles = [n / float(N) * 2 * np.pi + np.pi/2 for n in range(N)]
-    angles += angles[:1]  # Complete the loop
+    angles = radar_angles(len(categories))
     values += values[:1]  # Complete the loop
 
-    # Create figure
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True), facecolor='none')
-    ax.set_facecolor('none')
+    # Pooled figure already has the pentagon grid and spokes
+    with FIGURE_POOL.figure("radar") as (fig, ax):
 
-    # Draw the pentagon grid lines
-    for i in [0.25, 0.5, 0.75, 1.0]:
-        grid_angles = angles.copy()
-        ax.plot(grid_angles, [i] * (N + 1), color='#444444', linewidth=1.5, linestyle='-', alpha=0.6)
+        # Plot data - filled area
+        ax.fill(angles, values, color=accent_color, alpha=0.3)
+        ax.plot(angles, values, color=accent_color, linewidth=2.5)
 
-    # Draw axis lines from center to each point
-    for angle in angles[:-1]:
-        ax.plot([angle, angle], [0, 1], color='#444444', linewidth=1.5, alpha=0.6)
+        # Add dots at each point
+        ax.scatter(angles[:-1], values[:-1], color=accent_color, s=60, zorder=5, edgecolors='white', linewidth=1.5)
 
-    # Plot data - filled area
-    ax.fill(angles, values, color=accent_color, alpha=0.3)
-    ax.plot(angles, values, color=accent_color, linewidth=2.5)
+        # Add category labels with percentile values (both modes show percentiles now)
+        for i, (angle, cat, pct) in enumerate(zip(angles[:-1], categories, raw_pcts)):
+            # Always show percentile ranking
+            ax.text(angle, 1.25, f"{cat}\n{pct}%", ha='center', va='center',
+                    fontsize=18, color=TEXT_COLOR, fontweight='bold', linespacing=1.2)
 
-    # Add dots at each point
-    ax.scatter(angles[:-1], values[:-1], color=accent_color, s=60, zorder=5, edgecolors='white', linewidth=1.5)
+        img_data = fig_to_data_uri(fig, dpi=100, fmt=VECTOR_IMAGE_FORMAT, close=False)
+    RENDER_CACHE.put(render_key, img_data)
+    return img_data
 
-    # Set limits
-    ax.set_ylim(0, 1)
 
-    # Remove default labels and ticks
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.spines['polar'].set_visible(False)
+# ============================================================
+# DENSITY ESTIMATION
+# ============================================================
 
-    # Add category labels with percentile values (both modes show percentiles now)
-    for i, (angle, cat, pct) in enumerate(zip(angles[:-1], categories, raw_pcts)):
-        # Always show percentile ranking
-        ax.text(angle, 1.25, f"{cat}\n{pct}%", ha='center', va='center',
-                fontsize=18, color=TEXT_COLOR, fontweight='bold', linespacing=1.2)
+KDE_BANDWIDTH = 0.15          # Scott-style factor, same meaning as gaussian_kde's bw_method
+KDE_GRID_SHAPE = (70, 100)    # (rows, cols) evaluation grid over the horizontal pitch
+KDE_CACHE_SIZE = 256
+KDE_EXACT_MAX_POINTS = 50     # Below this, evaluate the kernel directly instead of binning
 
-    return fig_to_base64(fig, dpi=100)
+KDE_CACHE = ProcessCache("kde", maxsize=KDE_CACHE_SIZE)
 
 
-# ============================================================
-# BUILD PLAYER LIST
-# ============================================================
+def binned_kde(xs, ys, width=120, height=80, bw=KDE_BANDWIDTH, grid_shape=KDE_GRID_SHAPE):
+    """Binned Gaussian KDE of points on a width x height pitch.
+
+    Points are linearly binned onto the evaluation grid and convolved with a
+    Gaussian kernel (covariance = data covariance * bw^2, as gaussian_kde does)
+    via FFT. Returns (X, Y, Z) for contourf, or None if the covariance is singular.
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    n = len(xs)
+    if n < 2:
+        return None
+
+    cov = np.cov(np.vstack([xs, ys])) * bw ** 2
+    if not np.all(np.isfinite(cov)) or np.linalg.det(cov) <= 1e-12:
+        return None
+
+    rows, cols = grid_shape
+    dx = width / (cols - 1)
+    dy = height / (rows - 1)
+    X, Y = np.meshgrid(np.linspace(0, width, cols), np.linspace(0, height, rows))
+    inv = np.linalg.inv(cov)
+    norm = 2 * np.pi * np.sqrt(np.linalg.det(cov))
+
+    # Small samples: exact evaluation is cheap and avoids binning error
+    if n <= KDE_EXACT_MAX_POINTS:
+        ox = X[..., None] - xs
+        oy = Y[..., None] - ys
+        quad = inv[0, 0] * ox ** 2 + 2 * inv[0, 1] * ox * oy + inv[1, 1] * oy ** 2
+        return X, Y, np.exp(-0.5 * quad).sum(axis=-1) / (norm * n)
+
+    # Linear binning: split each point's weight across its 4 neighbouring grid nodes
+    gx = np.clip(xs / dx, 0, cols - 1)
+    gy = np.clip(ys / dy, 0, rows - 1)
+    ix = np.minimum(gx.astype(int), cols - 2)
+    iy = np.minimum(gy.astype(int), rows - 2)
+    fx = gx - ix
+    fy = gy - iy
+    counts = np.zeros(grid_shape)
+    np.add.at(counts, (iy, ix), (1 - fx) * (1 - fy))
+    np.add.at(counts, (iy, ix + 1), fx * (1 - fy))
+    np.add.at(counts, (iy + 1, ix), (1 - fx) * fy)
+    np.add.at(counts, (iy + 1, ix + 1), fx * fy)
+
+    # Kernel sampled on grid offsets, truncated at 4 sigma (and at the grid size)
+    kx = min(cols - 1, int(np.ceil(4 * np.sqrt(cov[0, 0]) / dx)))
+    ky = min(rows - 1, int(np.ceil(4 * np.sqrt(cov[1, 1]) / dy)))
+    ox, oy = np.meshgrid(np.arange(-kx, kx + 1) * dx, np.arange(-ky, ky + 1) * dy)
+    quad = inv[0, 0] * ox ** 2 + 2 * inv[0, 1] * ox * oy + inv[1, 1] * oy ** 2
+    kernel = np.exp(-0.5 * quad) / norm
+
+    # Zero-padded FFT convolution, cropped back to the grid
+    fft_shape = (rows + 2 * ky, cols + 2 * kx)
+    conv = np.fft.irfft2(np.fft.rfft2(counts, fft_shape) * np.fft.rfft2(kernel, fft_shape), fft_shape)
+    Z = np.maximum(conv[ky:ky + rows, kx:kx + cols], 0) / n
+    return X, Y, Z
+
+
+def cached_kde(cache_key, xs, ys, **kwargs):
+    """binned_kde, cached process-wide under cache_key.
+
+    The key must pin down the events the density is built from: (view, data version,
+    player, event type, match, start/end, end-coordinate filter). The heatmap and the
+    export filter events differently, so each view has its own entries."""
+    if cache_key is None:
+        return binned_kde(xs, ys, **kwargs)
+    return KDE_CACHE.get_or_compute(cache_key, lambda: binned_kde(xs, ys, **kwargs))
 
-all_depth_players = []
-for pos in POSITION_ORDER:
-    if pos in DEPTH_CHART:
-        for player in DEPTH_CHART[pos]:
-            if player["name"] not in all_depth_players:
-                all_depth_players.append(player["name"])
 
 # ============================================================
-# SHINY APP UI
+# CLIENT-SIDE EVENT RENDERING
 # ============================================================
 
-app_ui = ui.page_fluid(
-    ui.tags.head(
-        ui.tags.style(f"""
-            * {{
-                box-sizing: border-box;
-            }}
-            body {{
-                background-color: {BG_COLOR};
-                color: {TEXT_COLOR};
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 0;
-                padding: 20px;
-            }}
-            .main-container {{
-                display: flex;
-                gap: 20px;
-                max-width: 1400px;
-                margin: 0 auto;
-                min-height: 900px;
-            }}
-            .pitch-panel {{
-                flex: 1.2;
-                background-color: {CARD_BG};
-                border: 1px solid #222;
-                border-radius: 12px;
+# Event type codes used in the binary payload (index = code)
+EVENT_TYPE_CODES = [
+    "Pass", "Carry", "Reception", "Shot", "MissedShots", "SavedShot",
+    "ShotOnPost", "Goal", "Tackle", "Interception", "Clearance", "BallRecovery",
+]
+EVENT_TYPE_INDEX = {t: i for i, t in enumerate(EVENT_TYPE_CODES)}
+
+# Payload flag bits
+FLAG_UNSUCCESSFUL = 1
+FLAG_GOAL = 2
+FLAG_HAS_END = 4
+
+# One record per event: x, y, end_x, end_y (0-100 scaled by 100), type code, flags
+EVENT_PAYLOAD_DTYPE = np.dtype([
+    ("x", "<u2"), ("y", "<u2"), ("end_x", "<u2"), ("end_y", "<u2"),
+    ("type", "u1"), ("flags", "u1"),
+])
+MISSING_COORD = 65535
+
+KDE_COLORS_SOUNDERS = ['#000000', '#1a3d1a', '#2d5a2d', '#3d7a3d', '#5D9741', '#96D35F']
+KDE_COLORS_DEFIANCE = ['#000000', '#1a3d4d', '#2d5a6d', '#3d7a8d', '#4d9aad', '#5BC0EB']
+
+
+def encode_events_payload(events):
+    """Pack events into a little-endian binary payload (10 bytes/event), base64-encoded.
+
+    Coordinates stay in Opta 0-100 units (scaled by 100 to fit uint16); the
+    browser does the pitch-unit conversion.
+    """
+    payload = np.zeros(len(events), dtype=EVENT_PAYLOAD_DTYPE)
+
+    def scale(values):
+        arr = np.array([MISSING_COORD if v is None else v for v in values], dtype=float)
+        missing = arr == MISSING_COORD
+        arr = np.clip(np.round(arr * 100), 0, MISSING_COORD - 1)
+        arr[missing] = MISSING_COORD
+        return arr.astype(np.uint16)
+
+    payload["x"] = scale([e.get("x") for e in events])
+    payload["y"] = scale([e.get("y") for e in events])
+    payload["end_x"] = scale([e.get("end_x") for e in events])
+    payload["end_y"] = scale([e.get("end_y") for e in events])
+    payload["type"] = [EVENT_TYPE_INDEX.get(e.get("type_display_name"), 255) for e in events]
+
+    flags = np.zeros(len(events), dtype=np.uint8)
+    for i, e in enumerate(events):
+        if e.get("outcome_type_display_name") == "Unsuccessful":
+            flags[i] |= FLAG_UNSUCCESSFUL
+        if e.get("type_display_name") == "Goal":
+            flags[i] |= FLAG_GOAL
+        if e.get("end_x") is not None and e.get("end_y") is not None:
+            flags[i] |= FLAG_HAS_END
+    payload["flags"] = flags
+
+    return base64.b64encode(payload.tobytes()).decode('ascii')
+
+
+def event_canvas(events, heatmap_type, viz_type, loc_toggle, mode, accent_color,
+                 is_defiance=False, title=None, needs_end=False):
+    """Build the canvas element that draws an action map in the browser.
+
+    Location (start/end) and mode (action/trajectory/density) toggles are
+    handled by EVENT_CANVAS_JS without a server round trip.
+    """
+    kde_colors = KDE_COLORS_DEFIANCE if is_defiance else KDE_COLORS_SOUNDERS
+    attrs = {
+        "data-events": encode_events_payload(events),
+        "data-heatmap-type": heatmap_type,
+        "data-viz": viz_type or "",
+        "data-title": title or "",
+        "data-needs-end": "1" if needs_end else "0",
+        "data-loc": loc_toggle,
+        "data-mode": mode,
+        "data-accent": accent_color,
+        "data-kde-colors": ",".join(kde_colors),
+    }
+    attr_html = " ".join(f'{k}="{v}"' for k, v in attrs.items())
+    return ui.div(
+        ui.HTML(f'<canvas class="event-canvas" width="1000" height="700" {attr_html} '
+                f'style="width: 100%; display: block; margin: 0 auto;"></canvas>'),
+        ui.tags.script("window.drawEventCanvases && window.drawEventCanvases();"),
+    )
+
+
+EVENT_CANVAS_JS = """
+(function() {
+    var P_W = 120, P_H = 80, W = 1000, H = 700, TOP = 28;
+    var S = W / (P_W + 2);
+    var PT = 100 / 72;  // points -> pixels at 100 dpi
+    var SHOT_CODES = [3, 4, 5, 6, 7];
+
+    function px(x) { return (x + 1) * S; }
+    function py(y) { return TOP + (P_H + 1 - y) * S; }
+    function clip(v, hi) { return Math.min(Math.max(v, 0.1), hi - 0.1); }
+
+    function decode(b64) {
+        var bin = atob(b64), n = bin.length / 10, out = [];
+        var buf = new Uint8Array(bin.length);
+        for (var i = 0; i < bin.length; i++) buf[i] = bin.charCodeAt(i);
+        var dv = new DataView(buf.buffer);
+        for (var k = 0; k < n; k++) {
+            var o = k * 10;
+            var ex = dv.getUint16(o + 4, true), ey = dv.getUint16(o + 6, true);
+            var flags = dv.getUint8(o + 9);
+            out.push({
+                x: dv.getUint16(o, true) / 100 * P_W / 100,
+                y: dv.getUint16(o + 2, true) / 100 * P_H / 100,
+                endX: ex === 65535 ? null : ex / 100 * P_W / 100,
+                endY: ey === 65535 ? null : ey / 100 * P_H / 100,
+                type: dv.getUint8(o + 8),
+                unsuccessful: (flags & 1) !== 0,
+                goal: (flags & 2) !== 0,
+                hasEnd: (flags & 4) !== 0
+            });
+        }
+        return out;
+    }
+
+    function hexToRgb(hex) {
+        var v = parseInt(hex.slice(1), 16);
+        return [(v >> 16) & 255, (v >> 8) & 255, v & 255];
+    }
+
+    function colormap(colors, t) {
+        var rgb = colors.map(hexToRgb), seg = (rgb.length - 1) * t;
+        var i = Math.min(Math.floor(seg), rgb.length - 2), f = seg - i;
+        return rgb[i].map(function(c, j) { return Math.round(c + (rgb[i + 1][j] - c) * f); });
+    }
+
+    function dot(ctx, x, y, r, color, alpha, edge) {
+        ctx.globalAlpha = alpha;
+        ctx.beginPath();
+        ctx.arc(px(x), py(y), r, 0, 2 * Math.PI);
+        ctx.fillStyle = color;
+        ctx.fill();
+        if (edge) { ctx.strokeStyle = '#ffffff'; ctx.lineWidth = PT; ctx.stroke(); }
+        ctx.globalAlpha = 1;
+    }
+
+    function star(ctx, x, y, r, color) {
+        ctx.beginPath();
+        for (var i = 0; i < 10; i++) {
+            var rad = i % 2 === 0 ? r : r * 0.4, a = -Math.PI / 2 + i * Math.PI / 5;
+            ctx.lineTo(px(x) + rad * Math.cos(a), py(y) + rad * Math.sin(a));
+        }
+        ctx.closePath();
+        ctx.fillStyle = color;
+        ctx.fill();
+        ctx.strokeStyle = '#ffffff';
+        ctx.lineWidth = 1.5 * PT;
+        ctx.stroke();
+    }
+
+    function comet(ctx, e, color, lw0, lw1, a0, a1) {
+        var sx = e.x, sy = e.y, ex = e.endX, ey = e.endY, n = 10;
+        ctx.lineCap = 'round';
+        for (var s = 0; s < n; s++) {
+            var t0 = s / n, t1 = (s + 1) / n;
+            ctx.globalAlpha = a0 + (a1 - a0) * t1;
+            ctx.lineWidth = (lw0 + (lw1 - lw0) * t1) * PT;
+            ctx.strokeStyle = color;
+            ctx.beginPath();
+            ctx.moveTo(px(sx + t0 * (ex - sx)), py(sy + t0 * (ey - sy)));
+            ctx.lineTo(px(sx + t1 * (ex - sx)), py(sy + t1 * (ey - sy)));
+            ctx.stroke();
+        }
+        ctx.globalAlpha = 1;
+    }
+
+    function drawPitch(ctx) {
+        ctx.strokeStyle = '#ffffff';
+        ctx.fillStyle = '#ffffff';
+        ctx.lineWidth = 2 * PT;
+        function poly(pts) {
+            ctx.beginPath();
+            pts.forEach(function(p, i) { i ? ctx.lineTo(px(p[0]), py(p[1])) : ctx.moveTo(px(p[0]), py(p[1])); });
+            ctx.stroke();
+        }
+        poly([[0, 0], [P_W, 0], [P_W, P_H], [0, P_H], [0, 0]]);
+        poly([[P_W / 2, 0], [P_W / 2, P_H]]);
+        ctx.beginPath();
+        ctx.arc(px(P_W / 2), py(P_H / 2), 10 * S, 0, 2 * Math.PI);
+        ctx.stroke();
+        var boxTop = (P_H - 44) / 2, sixTop = (P_H - 20) / 2;
+        poly([[0, boxTop], [18, boxTop], [18, boxTop + 44], [0, boxTop + 44]]);
+        poly([[P_W, boxTop], [P_W - 18, boxTop], [P_W - 18, boxTop + 44], [P_W, boxTop + 44]]);
+        poly([[0, sixTop], [6, sixTop], [6, sixTop + 20], [0, sixTop + 20]]);
+        poly([[P_W, sixTop], [P_W - 6, sixTop], [P_W - 6, sixTop + 20], [P_W, sixTop + 20]]);
+        [[P_W / 2, P_H / 2], [12, P_H / 2], [P_W - 12, P_H / 2]].forEach(function(p) {
+            ctx.beginPath();
+            ctx.arc(px(p[0]), py(p[1]), 2.5 * PT, 0, 2 * Math.PI);
+            ctx.fill();
+        });
+    }
+
+    function drawDensity(ctx, pts, colors) {
+        // Gaussian KDE with Scott-style covariance scaled by bw=0.15, on a 100x70 grid
+        var n = pts.length, mx = 0, my = 0;
+        pts.forEach(function(p) { mx += p[0]; my += p[1]; });
+        mx /= n; my /= n;
+        var sxx = 0, syy = 0, sxy = 0;
+        pts.forEach(function(p) {
+            sxx += (p[0] - mx) * (p[0] - mx); syy += (p[1] - my) * (p[1] - my); sxy += (p[0] - mx) * (p[1] - my);
+        });
+        var bw2 = 0.15 * 0.15;
+        var a = sxx / (n - 1) * bw2, d = syy / (n - 1) * bw2, b = sxy / (n - 1) * bw2;
+        var det = a * d - b * b;
+        if (!(det > 0)) return false;
+        var ia = d / det, id = a / det, ib = -b / det;
+        var GX = 100, GY = 70, Z = new Float64Array(GX * GY), zmax = 0;
+        for (var j = 0; j < GY; j++) {
+            var gy = j * P_H / (GY - 1);
+            for (var i = 0; i < GX; i++) {
+                var gx = i * P_W / (GX - 1), z = 0;
+                for (var k = 0; k < n; k++) {
+                    var dx = gx - pts[k][0], dy = gy - pts[k][1];
+                    z += Math.exp(-0.5 * (ia * dx * dx + 2 * ib * dx * dy + id * dy * dy));
+                }
+                Z[j * GX + i] = z;
+                if (z > zmax) zmax = z;
+            }
+        }
+        var cw = P_W / (GX - 1) * S, ch = P_H / (GY - 1) * S;
+        ctx.globalAlpha = 0.8;
+        for (var jj = 0; jj < GY; jj++) {
+            for (var ii = 0; ii < GX; ii++) {
+                var level = Math.min(Math.floor(Z[jj * GX + ii] / zmax * 20), 19) / 19;
+                var rgb = colormap(colors, level);
+                ctx.fillStyle = 'rgb(' + rgb.join(',') + ')';
+                ctx.fillRect(px(ii * P_W / (GX - 1)) - cw / 2, py(jj * P_H / (GY - 1)) - ch / 2, cw + 1, ch + 1);
+            }
+        }
+        ctx.globalAlpha = 1;
+        return true;
+    }
+
+    function draw(canvas) {
+        if (!canvas._events) canvas._events = decode(canvas.getAttribute('data-events'));
+        var events = canvas._events, ctx = canvas.getContext('2d');
+        var heatmapType = canvas.getAttribute('data-heatmap-type');
+        var viz = canvas.getAttribute('data-viz');
+        var needsEnd = canvas.getAttribute('data-needs-end') === '1';
+        var loc = canvas.getAttribute('data-loc'), mode = canvas.getAttribute('data-mode');
+        var accent = canvas.getAttribute('data-accent');
+        var kdeColors = canvas.getAttribute('data-kde-colors').split(',');
+        var useDest = !viz && (heatmapType === 'Pass' || heatmapType === 'Carry') && loc === 'end';
+
+        ctx.clearRect(0, 0, W, H);
+        ctx.fillStyle = '#000000';
+        ctx.fillRect(0, 0, W, H);
+
+        var pts = events.map(function(e) {
+            var x = useDest ? e.endX : e.x, y = useDest ? e.endY : e.y;
+            return [clip(x, P_W), clip(y, P_H)];
+        });
+
+        var title = events.length + ' events';
+        if (viz && mode === 'trajectory') {
+            // Stat drill-down trajectories: comets with start/end markers
+            title = canvas.getAttribute('data-title') + ': ' + events.length + ' events';
+            events.forEach(function(e, i) {
+                var color = e.unsuccessful ? '#666666' : accent;
+                if (needsEnd && e.hasEnd) {
+                    var c = {x: clip(e.x, P_W), y: clip(e.y, P_H), endX: clip(e.endX, P_W), endY: clip(e.endY, P_H)};
+                    comet(ctx, c, color, 1, 3, 0.1, 0.8);
+                    dot(ctx, c.x, c.y, Math.sqrt(30) / 2 * PT, color, 0.5, false);
+                    dot(ctx, c.endX, c.endY, Math.sqrt(80) / 2 * PT, color, e.unsuccessful ? 0.7 : 0.9, !e.unsuccessful);
+                } else if (viz === 'goals') {
+                    star(ctx, pts[i][0], pts[i][1], Math.sqrt(200) / 2 * PT, accent);
+                } else {
+                    dot(ctx, pts[i][0], pts[i][1], 5 * PT, color, e.unsuccessful ? 0.7 : 0.8, !e.unsuccessful);
+                }
+            });
+        } else if (mode === 'kde' && pts.length >= 3 && drawDensity(ctx, pts, kdeColors)) {
+            // density drawn
+        } else if (mode !== 'kde') {
+            var NX = 24, NY = 16, hist = new Array(NX * NY).fill(0), maxCount = 0;
+            var bins = pts.map(function(p) {
+                var b = Math.min(Math.floor(p[0] / P_W * NX), NX - 1) * NY + Math.min(Math.floor(p[1] / P_H * NY), NY - 1);
+                hist[b] += 1;
+                return b;
+            });
+            hist.forEach(function(c) { if (c > maxCount) maxCount = c; });
+            maxCount = maxCount || 1;
+            events.forEach(function(e, i) {
+                var color = e.unsuccessful ? '#666666' : accent;
+                if (mode === 'trajectory' && e.hasEnd) comet(ctx, e, color, 0.5, 4, 0.1, 0.4);
+                if (heatmapType === 'Shot' && e.type === 7) {
+                    star(ctx, pts[i][0], pts[i][1], Math.sqrt(220) / 2 * PT, accent);
+                } else if (e.unsuccessful) {
+                    dot(ctx, pts[i][0], pts[i][1], 5 * PT, '#666666', 0.7, false);
+                } else {
+                    dot(ctx, pts[i][0], pts[i][1], 5 * PT, accent, 0.15 + 0.75 * Math.sqrt(hist[bins[i]] / maxCount), false);
+                }
+            });
+        }
+
+        drawPitch(ctx);
+        ctx.fillStyle = '#888888';
+        ctx.font = (10 * PT) + 'px sans-serif';
+        ctx.textAlign = 'center';
+        ctx.fillText(title, W / 2, TOP - 8);
+    }
+
+    window.drawEventCanvases = function() {
+        document.querySelectorAll('canvas.event-canvas').forEach(draw);
+    };
+
+    // Location and mode toggles redraw locally; the server only restyles the buttons
+    var TOGGLES = {
+        loc_start: ['data-loc', 'start'], loc_end: ['data-loc', 'end'],
+        mode_action: ['data-mode', 'action'], mode_trajectory: ['data-mode', 'trajectory'],
+        mode_kde: ['data-mode', 'kde']
+    };
+    document.addEventListener('click', function(ev) {
+        var btn = ev.target.closest && ev.target.closest('button[id]');
+        if (!btn) return;
+        var canvases = document.querySelectorAll('canvas.event-canvas');
+        if (btn.id === 'reset_heatmap') {
+            canvases.forEach(function(c) { c.setAttribute('data-loc', 'start'); c.setAttribute('data-mode', 'action'); });
+        } else if (TOGGLES[btn.id]) {
+            canvases.forEach(function(c) { c.setAttribute(TOGGLES[btn.id][0], TOGGLES[btn.id][1]); });
+        } else {
+            return;
+        }
+        canvases.forEach(draw);
+    });
+})();
+"""
+
+
+# ============================================================
+# OFF-LOOP RENDERING
+# ============================================================
+
+# Heatmap, trajectory and export renders take 100ms+ of Agg/PNG work. They run on
+# a small thread pool (Agg and the PNG encoder release the GIL) so one user's render
+# doesn't stall every other session's websocket. Pyodide has no threads, so there
+# they run inline as before.
+#
+# With RENDER_PROCESSES > 0 those threads only dispatch: the draw itself runs in a
+# pool of long-lived worker processes, so a host can use every core on matchday.
+# Workers import this module once (loading the season data), and jobs refer to
+# events by their position in the season's event list instead of shipping them.
+RENDER_WORKERS = 4
+RENDER_OFF_LOOP = sys.platform != "emscripten"
+RENDER_FARM_ENABLED = RENDER_PROCESSES > 0 and RENDER_OFF_LOOP
+
+# A render handed to the executor: cache key (None = don't cache), pure draw function, args
+RenderJob = namedtuple("RenderJob", ["key", "fn", "args"])
+
+# A list of season events, sent to render workers as (season, positions)
+EventRef = namedtuple("EventRef", ["season", "indices"])
+
+_render_executor = None
+_render_pool = None
+_render_executor_lock = threading.Lock()
+_event_positions = {}  # season -> {id(event): index}, built on first farm job
+_renders_in_flight = 0  # Real (not prefetch) renders awaiting the executor
+
+
+def _get_render_executor():
+    global _render_executor
+    with _render_executor_lock:
+        if _render_executor is None:
+            _render_executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS,
+                                                  thread_name_prefix="render")
+        return _render_executor
+
+
+def _season_event_positions(season):
+    with _render_executor_lock:
+        positions = _event_positions.get(season)
+        if positions is None:
+            positions = {id(e): i for i, e in enumerate(SEASON_DATA[season][1])}
+            _event_positions[season] = positions
+        return positions
+
+
+def pack_events(events):
+    """Replace a list of season events with an EventRef; other values pass through."""
+    if not isinstance(events, list) or not events or not isinstance(events[0], dict):
+        return events
+    for season in SEASON_DATA:
+        positions = _season_event_positions(season)
+        if id(events[0]) not in positions:
+            continue
+        try:
+            indices = np.fromiter((positions[id(e)] for e in events), dtype=np.int32, count=len(events))
+        except KeyError:
+            return events  # Not all from one season's list - ship as-is
+        return EventRef(season, indices)
+    return events
+
+
+def unpack_events(value):
+    """Resolve an EventRef against this process's copy of the season data."""
+    if not isinstance(value, EventRef):
+        return value
+    season_events = SEASON_DATA[value.season][1]
+    return [season_events[i] for i in value.indices]
+
+
+def event_pitch_xy(events, use_end=False, width=120, height=80):
+    """Pitch-unit x/y arrays of events' start (or end) points, skipping missing ones.
+
+    Season events are read from the derived columns; other lists are scaled here.
+    """
+    ref = pack_events(events)
+    columns = EVENT_COLUMNS.get(ref.season) if isinstance(ref, EventRef) else None
+    if columns is not None and columns.pitch == (width, height):
+        rows = columns.columns[ref.indices]
+        xs, ys = (rows["end_x"], rows["end_y"]) if use_end else (rows["x"], rows["y"])
+        present = ~np.isnan(xs) & ~np.isnan(ys)
+        return xs[present], ys[present]
+
+    kx, ky = ("end_x", "end_y") if use_end else ("x", "y")
+    points = [(e[kx], e[ky]) for e in events if e.get(kx) is not None and e.get(ky) is not None]
+    xs = np.array([x * width / 100 for x, _ in points])
+    ys = np.array([y * height / 100 for _, y in points])
+    return xs, ys
+
+
+def _exit_with_parent():
+    import multiprocessing
+    from multiprocessing.connection import wait
+
+    wait([multiprocessing.parent_process().sentinel])
+    os._exit(0)
+
+
+def _init_render_worker():
+    """Render-farm initializer: mark this process as a worker and build one figure
+    per pooled view up front."""
+    global IS_RENDER_WORKER
+    IS_RENDER_WORKER = True
+    # Don't outlive a server that was killed without shutting the pool down
+    threading.Thread(target=_exit_with_parent, daemon=True).start()
+    for view in ("heatmap", "export"):
+        fig, _ = FIGURE_POOL.acquire(view)
+        FIGURE_POOL.release(fig)
+
+
+def _render_in_worker(fn, args):
+    return fn(*(unpack_events(a) for a in args))
+
+
+def _get_render_pool():
+    global _render_pool
+    with _render_executor_lock:
+        if _render_pool is None:
+            import multiprocessing
+
+            _render_pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES,
+                                               mp_context=multiprocessing.get_context("spawn"),
+                                               initializer=_init_render_worker)
+            print(f"Render farm: {RENDER_PROCESSES} worker processes")
+        return _render_pool
+
+
+def draw(fn, args):
+    """Run a draw function here, or on the render farm when it is enabled."""
+    if not RENDER_FARM_ENABLED or IS_RENDER_WORKER:
+        return fn(*args)
+    packed = tuple(pack_events(a) for a in args)
+    return _get_render_pool().submit(_render_in_worker, fn, packed).result()
+
+
+def run_render(render_key, fn, *args):
+    """Run a draw function, sharing the result through RENDER_CACHE when keyed."""
+    if render_key is None:
+        return draw(fn, args)
+    return RENDER_CACHE.get_or_compute(render_key, lambda: draw(fn, args))
+
+
+async def run_render_async(render_key, fn, *args):
+    """Await a render on the executor without blocking the event loop."""
+    global _renders_in_flight
+    if not RENDER_OFF_LOOP:
+        return run_render(render_key, fn, *args)
+    loop = asyncio.get_running_loop()
+    _renders_in_flight += 1
+    try:
+        return await loop.run_in_executor(_get_render_executor(), run_render, render_key, fn, *args)
+    finally:
+        _renders_in_flight -= 1
+
+
+# ============================================================
+# PREFETCH
+# ============================================================
+
+# After a heatmap is shown, the next click is usually predictable: the start/end
+# toggle, the other heatmap mode, a stat drill-down or a neighbouring tab. A single
+# background thread renders a few of those views into RENDER_CACHE so switching
+# to them is a cache hit. It only works while no real render is in flight and
+# drops its queue as soon as the session moves to another view.
+PREFETCH_ENABLED = RENDER_OFF_LOOP and not CLIENT_SIDE_RENDERING
+PREFETCH_MAX_VIEWS = 4
+PREFETCH_YIELD_SECS = 0.05      # Poll interval while real renders are running
+
+HEATMAP_TABS = ["Overview", "Pass", "Reception", "Shot", "Carry", "Defensive"]
+
+# Stat drill-downs (stat_viz_click) most often opened from each heatmap tab
+PREFETCH_DRILLDOWNS = {
+    "Pass": ["progressive_passes", "key_passes"],
+    "Carry": ["progressive_carries"],
+    "Reception": ["final_third_receptions"],
+    "Shot": ["shots_on_target"],
+    "Defensive": ["tackles"],
+}
+
+_prefetch_executor = None
+
+
+def likely_next_views(heatmap_type, viz_type, loc_toggle, mode):
+    """Up to PREFETCH_MAX_VIEWS (heatmap_type, viz_type, loc_toggle, mode) views, most likely first."""
+    current = (heatmap_type, viz_type, loc_toggle, mode)
+    toggles, drilldowns, tabs = [], [], []
+    if heatmap_type in ("Pass", "Carry") and not viz_type:
+        toggles.append((heatmap_type, None, "end" if loc_toggle == "start" else "start", mode))
+    if not viz_type:
+        drilldowns = [(heatmap_type, viz, loc_toggle, mode) for viz in PREFETCH_DRILLDOWNS.get(heatmap_type, [])]
+    if heatmap_type in HEATMAP_TABS:
+        i = HEATMAP_TABS.index(heatmap_type)
+        tabs = [(tab, viz_type, loc_toggle, mode) for tab in HEATMAP_TABS[i + 1:] + HEATMAP_TABS[:i]]
+    mode_switch = [(heatmap_type, viz_type, loc_toggle, "kde" if mode != "kde" else "action")]
+    # One of each kind first, then the remaining candidates
+    views = toggles[:1] + drilldowns[:1] + tabs[:1] + mode_switch + drilldowns[1:] + tabs[1:]
+
+    seen = {current}
+    unique = []
+    for view in views:
+        if view not in seen:
+            seen.add(view)
+            unique.append(view)
+    return unique[:PREFETCH_MAX_VIEWS]
+
+
+def _get_prefetch_executor():
+    global _prefetch_executor
+    with _render_executor_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        return _prefetch_executor
+
+
+def _prefetch(jobs, is_current):
+    for job in jobs:
+        while _renders_in_flight and is_current():
+            time.sleep(PREFETCH_YIELD_SECS)
+        if not is_current():
+            return
+        try:
+            run_render(job.key, job.fn, *job.args)
+        except Exception as e:
+            print(f"Prefetch render failed: {e}")
+
+
+def prefetch_renders(jobs, is_current):
+    """Render cacheable jobs in the background; is_current() turns False when they go stale."""
+    jobs = [job for job in jobs if job.key is not None]
+    if jobs:
+        _get_prefetch_executor().submit(_prefetch, jobs, is_current)
+
+
+def render_heatmap_html(events, heatmap_type, use_destination, current_heatmap_mode,
+                        draw_trajectories, accent_color, is_defiance, kde_key):
+    """Draw the action/KDE map for already-filtered events and return the <img> HTML."""
+    # Create HORIZONTAL heatmap: 120 width x 80 height
+    # Black background with white lines
+    with FIGURE_POOL.figure("heatmap") as (fig, ax):
+
+        # Pitch dimensions for horizontal view
+        P_WIDTH = 120   # x-axis (length of pitch, attacking right)
+        P_HEIGHT = 80   # y-axis (width of pitch)
+
+        # Pitch-unit coordinates: end_x/end_y for destination, x/y for origin
+        xs, ys = event_pitch_xy(events, use_destination, P_WIDTH, P_HEIGHT)
+
+        # Clip to pitch bounds
+        xs = np.clip(xs, 0.1, P_WIDTH - 0.1)
+        ys = np.clip(ys, 0.1, P_HEIGHT - 0.1)
+
+        if current_heatmap_mode == "kde" and len(xs) >= 3:
+            # KDE Heat Map mode - show density as color gradient
+            try:
+                # Binned KDE on the 100x70 grid, cached per player/event type/match/location
+                X, Y, Z = cached_kde(kde_key, xs, ys, width=P_WIDTH, height=P_HEIGHT)
+
+                # Plot KDE as filled contours with team-specific color map
+                from matplotlib.colors import LinearSegmentedColormap
+                if is_defiance:
+                    # Blue colormap for Defiance
+                    colors = ['#000000', '#1a3d4d', '#2d5a6d', '#3d7a8d', '#4d9aad', '#5BC0EB']
+                else:
+                    # Green colormap for Sounders
+                    colors = ['#000000', '#1a3d1a', '#2d5a2d', '#3d7a3d', '#5D9741', '#96D35F']
+                cmap = LinearSegmentedColormap.from_list('team_heat', colors)
+                ax.contourf(X, Y, Z, levels=20, cmap=cmap, alpha=0.8, zorder=1)
+            except Exception:
+                # Fall back to action mode if KDE fails
+                pass
+        else:
+            # Action mode - show individual dots
+            # Create grid-based density for alpha values
+            n_bins_x = 24
+            n_bins_y = 16
+            H, xedges, yedges = np.histogram2d(xs, ys, bins=[n_bins_x, n_bins_y],
+                                                range=[[0, P_WIDTH], [0, P_HEIGHT]])
+
+            # For each event, find its bin and calculate alpha based on density
+            max_count = H.max() if H.max() > 0 else 1
+
+            # Draw circles for each event with alpha based on local density
+            # For shots heatmap, show goals as soccer balls
+            is_shots_heatmap = heatmap_type == "Shot"
+            can_draw_trajectories = draw_trajectories
+
+            for e in events:
+                if use_destination:
+                    ex = e["end_x"] * P_WIDTH / 100
+                    ey = e["end_y"] * P_HEIGHT / 100
+                else:
+                    ex = e["x"] * P_WIDTH / 100
+                    ey = e["y"] * P_HEIGHT / 100
+                ex = np.clip(ex, 0.1, P_WIDTH - 0.1)
+                ey = np.clip(ey, 0.1, P_HEIGHT - 0.1)
+
+                # Find which bin this point falls into
+                bin_x = min(int(ex / P_WIDTH * n_bins_x), n_bins_x - 1)
+                bin_y = min(int(ey / P_HEIGHT * n_bins_y), n_bins_y - 1)
+
+                # Alpha based on density in this bin (0.15 to 0.9)
+                density = H[bin_x, bin_y]
+                alpha = 0.15 + 0.75 * (density / max_count) ** 0.5
+
+                # Check if this is an unsuccessful outcome
+                is_unsuccessful = e.get("outcome_type_display_name") == "Unsuccessful"
+                # Use grey for unsuccessful, accent color for successful
+                comet_color = '#666666' if is_unsuccessful else accent_color
+
+                # Draw trajectory comets if enabled (for Pass/Carry)
+                # Comet effect: line gets thicker from origin to endpoint
+                if can_draw_trajectories and e.get("x") is not None and e.get("end_x") is not None:
+                    start_x = e["x"] * P_WIDTH / 100
+                    start_y = e["y"] * P_HEIGHT / 100
+                    end_x = e["end_x"] * P_WIDTH / 100
+                    end_y = e["end_y"] * P_HEIGHT / 100
+                    # Draw comet with 10 segments, increasing linewidth
+                    n_segments = 10
+                    for seg in range(n_segments):
+                        t0 = seg / n_segments
+                        t1 = (seg + 1) / n_segments
+                        x0 = start_x + t0 * (end_x - start_x)
+                        y0 = start_y + t0 * (end_y - start_y)
+                        x1 = start_x + t1 * (end_x - start_x)
+                        y1 = start_y + t1 * (end_y - start_y)
+                        # Linewidth grows from 0.5 to 4, alpha grows from 0.1 to 0.4
+                        lw_seg = 0.5 + 3.5 * t1
+                        alpha_seg = 0.1 + 0.3 * t1
+                        ax.plot([x0, x1], [y0, y1], color=comet_color, lw=lw_seg, alpha=alpha_seg, zorder=1)
+
+                # Check if this is a goal - show star with white outline
+                if is_shots_heatmap and e.get("type_display_name") == "Goal":
+                    ax.scatter(ex, ey, s=220, c=accent_color, marker='*', edgecolors='white', linewidth=1.5, zorder=3)
+                elif is_unsuccessful:
+                    # Unsuccessful outcomes: grey
+                    ax.scatter(ex, ey, s=100, c='#666666', alpha=0.7, edgecolors='none', zorder=2)
+                else:
+                    ax.scatter(ex, ey, s=100, c=accent_color, alpha=alpha, edgecolors='none', zorder=2)
+
+        ax.set_title(f"{len(events)} events", color=SUBTEXT_COLOR, fontsize=10, pad=5)
+
+        img_data = fig_to_data_uri(fig, dpi=100, close=False)
+
+    img_html = f'<img src="{img_data}" style="width: 100%; display: block; margin: 0 auto;">'
+    return img_html
+
+
+def render_trajectory_html(events, title, needs_end, viz_type, accent_color):
+    """Draw comet trajectories (or points) for already-filtered events and return the <img> HTML."""
+    # Pooled horizontal pitch (markings are drawn once per figure, above the data)
+    with FIGURE_POOL.figure("heatmap") as (fig, ax):
+
+        P_WIDTH = 120
+        P_HEIGHT = 80
+
+        if needs_end:
+            # Draw trajectory lines with comet effect
+            for e in events:
+                start_x = e["x"] * P_WIDTH / 100
+                start_y = e["y"] * P_HEIGHT / 100
+                end_x = e["end_x"] * P_WIDTH / 100
+                end_y = e["end_y"] * P_HEIGHT / 100
+
+                # Clip to pitch bounds
+                start_x = np.clip(start_x, 0.1, P_WIDTH - 0.1)
+                start_y = np.clip(start_y, 0.1, P_HEIGHT - 0.1)
+                end_x = np.clip(end_x, 0.1, P_WIDTH - 0.1)
+                end_y = np.clip(end_y, 0.1, P_HEIGHT - 0.1)
+
+                # Check if this is an unsuccessful outcome
+                is_unsuccessful = e.get("outcome_type_display_name") == "Unsuccessful"
+                # Use grey for unsuccessful, accent color for successful
+                comet_color = '#666666' if is_unsuccessful else accent_color
+
+                # Create comet effect - line that fades from start to end
+                # Draw multiple segments with increasing alpha
+                n_segments = 10
+                alphas = np.linspace(0.1, 0.8, n_segments)
+                widths = np.linspace(1, 3, n_segments)
+
+                for i in range(n_segments):
+                    t1 = i / n_segments
+                    t2 = (i + 1) / n_segments
+                    x1 = start_x + (end_x - start_x) * t1
+                    y1 = start_y + (end_y - start_y) * t1
+                    x2 = start_x + (end_x - start_x) * t2
+                    y2 = start_y + (end_y - start_y) * t2
+                    ax.plot([x1, x2], [y1, y2], color=comet_color, alpha=alphas[i],
+                            linewidth=widths[i], solid_capstyle='round', zorder=2)
+
+                # Draw start point (small circle)
+                if is_unsuccessful:
+                    ax.scatter(start_x, start_y, s=30, c='#666666', alpha=0.5,
+                              edgecolors='none', zorder=3)
+                else:
+                    ax.scatter(start_x, start_y, s=30, c=accent_color, alpha=0.5,
+                              edgecolors='none', zorder=3)
+
+                # Draw end point (larger circle)
+                if is_unsuccessful:
+                    ax.scatter(end_x, end_y, s=80, c='#666666', alpha=0.7,
+                              edgecolors='none', zorder=4)
+                else:
+                    ax.scatter(end_x, end_y, s=80, c=accent_color, alpha=0.9,
+                              edgecolors='white', linewidth=1, zorder=4)
+        else:
+            # Just show points for events without end coordinates
+            for e in events:
+                ex = e["x"] * P_WIDTH / 100
+                ey = e["y"] * P_HEIGHT / 100
+                ex = np.clip(ex, 0.1, P_WIDTH - 0.1)
+                ey = np.clip(ey, 0.1, P_HEIGHT - 0.1)
+
+                # Check if this is an unsuccessful outcome
+                is_unsuccessful = e.get("outcome_type_display_name") == "Unsuccessful"
+
+                if viz_type == "goals":
+                    # Show goals as stars
+                    ax.scatter(ex, ey, s=200, c=accent_color, marker='*',
+                              edgecolors='white', linewidth=1.5, zorder=3)
+                elif is_unsuccessful:
+                    # Unsuccessful outcomes: grey
+                    ax.scatter(ex, ey, s=100, c='#666666', alpha=0.7,
+                              edgecolors='none', zorder=3)
+                else:
+                    ax.scatter(ex, ey, s=100, c=accent_color, alpha=0.8,
+                              edgecolors='white', linewidth=1, zorder=3)
+
+        ax.set_title(f"{title}: {len(events)} events", color=SUBTEXT_COLOR, fontsize=10, pad=5)
+
+        img_data = fig_to_data_uri(fig, dpi=100, close=False)
+
+    img_html = f'<img src="{img_data}" style="width: 100%; display: block; margin: 0 auto;">'
+    return img_html
+
+
+def render_export_png(player, map_title, game_context, events, heatmap_type, viz_type,
+                      use_destination, current_heatmap_mode, draw_trajectories, accent_color,
+                      is_defiance, stats_player, kde_key):
+    """Draw the downloadable action map (header, pitch, stats line) and return PNG bytes."""
+    # Create figure with header, pitch, and stats below
+    # No headshot image - just the pitch with stats underneath
+    with FIGURE_POOL.figure("export") as (fig, ax):
+
+        # Header area - left aligned (no player image)
+        header_left = 0.05
+
+        # Player name and title - left aligned
+        fig.text(header_left, 0.96, f"{player['name']} - {map_title}", fontsize=18, fontweight='bold',
+                ha='left', color=accent_color)
+        fig.text(header_left, 0.93, game_context, fontsize=12, ha='left', color=TEXT_COLOR)
+
+        # Position and basic info
+        position = player.get('primary_general_position', player.get('position', 'N/A'))
+        age = player.get('age', 'N/A')
+        fig.text(header_left, 0.90, f"#{player.get('shirt_no', '-')} | {position} | Age {age}",
+                fontsize=10, ha='left', color=SUBTEXT_COLOR)
+
+        P_WIDTH, P_HEIGHT = 120, 80
+
+        # Plot events - match the heatmap display logic
+        if events:
+            xs, ys = event_pitch_xy(events, use_destination, P_WIDTH, P_HEIGHT)
+
+            xs = np.clip(xs, 0.1, P_WIDTH - 0.1)
+            ys = np.clip(ys, 0.1, P_HEIGHT - 0.1)
+
+            if current_heatmap_mode == "kde" and len(xs) >= 3:
+                # KDE Heat Map mode - show density as color gradient
+                try:
+                    from matplotlib.colors import LinearSegmentedColormap
+                    X, Y, Z = cached_kde(kde_key, xs, ys, width=P_WIDTH, height=P_HEIGHT)
+                    if is_defiance:
+                        # Blue colormap for Defiance
+                        colors = ['#000000', '#1a3d4d', '#2d5a6d', '#3d7a8d', '#4d9aad', '#5BC0EB']
+                    else:
+                        # Green colormap for Sounders
+                        colors = ['#000000', '#1a3d1a', '#2d5a2d', '#3d7a3d', '#5D9741', '#96D35F']
+                    cmap = LinearSegmentedColormap.from_list('team_heat', colors)
+                    ax.contourf(X, Y, Z, levels=20, cmap=cmap, alpha=0.8, zorder=1)
+                except Exception:
+                    ax.scatter(xs, ys, s=100, c=accent_color, alpha=0.7, edgecolors='white', linewidth=0.5, zorder=2)
+            else:
+                # Action mode - show individual dots with density-based alpha
+                n_bins_x, n_bins_y = 24, 16
+                H, _, _ = np.histogram2d(xs, ys, bins=[n_bins_x, n_bins_y], range=[[0, P_WIDTH], [0, P_HEIGHT]])
+                max_count = H.max() if H.max() > 0 else 1
+
+                is_shots_heatmap = heatmap_type == "Shot"
+                can_draw_trajectories = draw_trajectories
+
+                for e in events:
+                    if use_destination:
+                        ex = e["end_x"] * P_WIDTH / 100 if e.get("end_x") else 0
+                        ey = e["end_y"] * P_HEIGHT / 100 if e.get("end_y") else 0
+                    else:
+                        ex = e["x"] * P_WIDTH / 100
+                        ey = e["y"] * P_HEIGHT / 100
+                    ex = np.clip(ex, 0.1, P_WIDTH - 0.1)
+                    ey = np.clip(ey, 0.1, P_HEIGHT - 0.1)
+
+                    bin_x = min(int(ex / P_WIDTH * n_bins_x), n_bins_x - 1)
+                    bin_y = min(int(ey / P_HEIGHT * n_bins_y), n_bins_y - 1)
+                    density = H[bin_x, bin_y]
+                    alpha = 0.15 + 0.75 * (density / max_count) ** 0.5
+
+                    # Check if this is an unsuccessful outcome
+                    is_unsuccessful = e.get("outcome_type_display_name") == "Unsuccessful"
+                    # Use grey for unsuccessful, accent color for successful
+                    comet_color = '#666666' if is_unsuccessful else accent_color
+
+                    # Draw trajectory comets if enabled
+                    if can_draw_trajectories and e.get("x") is not None and e.get("end_x") is not None:
+                        start_x = e["x"] * P_WIDTH / 100
+                        start_y = e["y"] * P_HEIGHT / 100
+                        end_x = e["end_x"] * P_WIDTH / 100
+                        end_y = e["end_y"] * P_HEIGHT / 100
+                        n_segments = 10
+                        for seg in range(n_segments):
+                            t0, t1 = seg / n_segments, (seg + 1) / n_segments
+                            x0 = start_x + t0 * (end_x - start_x)
+                            y0 = start_y + t0 * (end_y - start_y)
+                            x1 = start_x + t1 * (end_x - start_x)
+                            y1 = start_y + t1 * (end_y - start_y)
+                            lw_seg = 0.5 + 3.5 * t1
+                            alpha_seg = 0.1 + 0.3 * t1
+                            ax.plot([x0, x1], [y0, y1], color=comet_color, lw=lw_seg, alpha=alpha_seg, zorder=1)
+
+                    # Goals shown as stars
+                    if is_shots_heatmap and e.get("type_display_name") == "Goal":
+                        ax.scatter(ex, ey, s=220, c=accent_color, marker='*', edgecolors='white', linewidth=1.5, zorder=3)
+                    elif is_unsuccessful:
+                        # Unsuccessful outcomes: grey
+                        ax.scatter(ex, ey, s=100, c='#666666', alpha=0.7, edgecolors='none', zorder=2)
+                    else:
+                        ax.scatter(ex, ey, s=100, c=accent_color, alpha=alpha, edgecolors='none', zorder=2)
+
+        # Build stats line based on heatmap type
+        if heatmap_type == "Pass" or (viz_type and "pass" in viz_type.lower()):
+            total_p = stats_player.get("total_passes", 0) or 0
+            succ_p = stats_player.get("passes", 0) or 0
+            pass_pct = round((succ_p / total_p * 100) if total_p > 0 else 0, 1)
+            stats_text = f"Passes: {total_p} ({pass_pct}%) | Key Passes: {stats_player.get('key_passes', 0)} | Prog: {stats_player.get('progressive_passes', 0)}"
+        elif heatmap_type == "Carry" or (viz_type and "carr" in viz_type.lower()):
+            stats_text = f"Carries: {stats_player.get('carries', 0)} | Final 3rd: {stats_player.get('final_third_carries', 0)} | Progressive: {stats_player.get('progressive_carries', 0)}"
+        elif heatmap_type == "Shot" or (viz_type and "shot" in viz_type.lower()) or (viz_type and "goal" in viz_type.lower()):
+            shots = stats_player.get("shots", 0) or 0
+            goals = stats_player.get("goals", 0) or 0
+            stats_text = f"Shots: {shots} | Goals: {goals} | SOT: {stats_player.get('shots_on_target', 0)}"
+        elif heatmap_type == "Defensive" or (viz_type and "defen" in viz_type.lower()) or (viz_type and "tackle" in viz_type.lower()) or (viz_type and "intercept" in viz_type.lower()):
+            stats_text = f"Tackles: {stats_player.get('tackles', 0)} | Interceptions: {stats_player.get('interceptions', 0)} | Recoveries: {stats_player.get('ball_recoveries', 0)}"
+        elif heatmap_type == "Reception" or (viz_type and "recep" in viz_type.lower()):
+            stats_text = f"Receptions: {stats_player.get('receptions', 0)} | Final 3rd: {stats_player.get('final_third_receptions', 0)} | Deep: {stats_player.get('deep_receptions', 0)}"
+        else:
+            stats_text = f"Mins: {stats_player.get('mins', 0)} | Goals: {stats_player.get('goals', 0)} | Assists: {stats_player.get('assists', 0)}"
+
+        # Event count and detailed stats - below the pitch
+        fig.text(header_left, 0.12, f"{len(events)} events", fontsize=11, ha='left', color=TEXT_COLOR, fontweight='bold')
+        fig.text(header_left, 0.08, stats_text, fontsize=10, ha='left', color=SUBTEXT_COLOR)
+
+        # Footer - left aligned
+        fig.text(header_left, 0.02, "Data from Opta | Powered by Sunday League Stats", fontsize=8, ha='left', color='#666')
+
+        png_data, _, _ = encode_figure(fig, dpi=150, fmt="png", byte_budget=None)
+    return png_data
+
+
+# ============================================================
+# TEAM RANKINGS
+# ============================================================
+
+# The rankings output sends one players x stats matrix per scope (season, team,
+# game filter). Category, stat and per 90 switching, top-N sorting and the selected
+# player highlight all happen in the browser (RANKINGS_JS); stat clicks are still
+# reported to the server so the action map can follow them.
+RANKING_TOP_N = 10
+
+# Define stat categories with their stats - similar to fbref
+# Note: "passes" = successful passes, "total_passes" = all attempts
+RANKING_CATEGORIES = {
+    "passing": {
+        "label": "Passing",
+        "heatmap_type": "Pass",
+        "stats": [
+            ("passes", "Passes", False, "all_passes"),
+            ("progressive_passes", "Prog", False, "progressive_passes"),
+            ("key_passes", "Key", False, "key_passes"),
+            ("final_third_passes", "Final 3rd", False, "final_third_passes"),
+            ("deep_passes", "Deep", False, "deep_passes"),
+            ("xg_assisted", "xGA", True, None),
+            ("pv_passing", "PV+", True, None),
+        ]
+    },
+    "carrying": {
+        "label": "Carrying",
+        "heatmap_type": "Carry",
+        "stats": [
+            ("carries", "Carries", False, "all_carries"),
+            ("progressive_carries", "Prog", False, "progressive_carries"),
+            ("final_third_carries", "Final 3rd", False, "final_third_carries"),
+            ("deep_carries", "Deep", False, "deep_carries"),
+            ("pv_carrying", "PV+", True, None),
+        ]
+    },
+    "reception": {
+        "label": "Receiving",
+        "heatmap_type": "Reception",
+        "stats": [
+            ("receptions", "Recv", False, "all_receptions"),
+            ("final_third_receptions", "Final 3rd", False, "final_third_receptions"),
+            ("deep_receptions", "Deep", False, "deep_receptions"),
+            ("pv_receiving", "PV+", True, None),
+        ]
+    },
+    "shooting": {
+        "label": "Shooting",
+        "heatmap_type": "Shot",
+        "stats": [
+            ("goals", "Goals", False, "goals"),
+            ("shots", "Shots", False, "all_shots"),
+            ("shots_on_target", "SOT", False, "shots_on_target"),
+            ("total_xg", "xG", True, None),
+            ("pv_shooting", "PV+", True, None),
+        ]
+    },
+    "defensive": {
+        "label": "Defensive",
+        "heatmap_type": "Defensive",
+        "stats": [
+            ("defensive_actions", "Actions", False, "all_defensive"),
+            ("tackles", "Tackles", False, "tackles"),
+            ("interceptions", "Int", False, "interceptions"),
+            ("clearances", "Clr", False, "clearances"),
+            ("ball_recoveries", "Recv", False, "recoveries"),
+            ("pv_defending", "PV+", True, None),
+        ]
+    },
+}
+
+
+# Full stat names for the table header
+RANKING_STAT_NAMES = {
+    "passes": "Successful Passes",
+    "total_passes": "Total Passes",
+    "progressive_passes": "Progressive Passes",
+    "key_passes": "Key Passes",
+    "final_third_passes": "Final Third Passes",
+    "deep_passes": "Deep Passes",
+    "xg_assisted": "xG Assisted",
+    "pv_passing": "Passing PV+",
+    "carries": "Carries",
+    "progressive_carries": "Progressive Carries",
+    "final_third_carries": "Final Third Carries",
+    "deep_carries": "Deep Carries",
+    "pv_carrying": "Carrying PV+",
+    "receptions": "Receptions",
+    "final_third_receptions": "Final Third Receptions",
+    "deep_receptions": "Deep Receptions",
+    "pv_receiving": "Receiving PV+",
+    "goals": "Goals",
+    "shots": "Shots",
+    "shots_on_target": "Shots on Target",
+    "total_xg": "Expected Goals",
+    "pv_shooting": "Shooting PV+",
+    "defensive_actions": "Defensive Actions",
+    "tackles": "Tackles",
+    "interceptions": "Interceptions",
+    "clearances": "Clearances",
+    "ball_recoveries": "Ball Recoveries",
+    "pv_defending": "Defending PV+",
+}
+
+
+def ranking_payload(players, per_90_available=True, indicator=""):
+    """Ranking matrix for every category's stats, in the shape RANKINGS_JS expects."""
+    def stat_value(player, key):
+        val = player.get(key, 0)
+        return float(val) if val is not None else 0.0
+
+    stat_keys = [stat[0] for cat in RANKING_CATEGORIES.values() for stat in cat["stats"]]
+    return {
+        "categories": [
+            {"key": cat_key, "label": cat["label"],
+             "stats": [{"key": key, "label": label, "decimal": is_decimal,
+                        "title": RANKING_STAT_NAMES.get(key, label)}
+                       for key, label, is_decimal, _ in cat["stats"]]}
+            for cat_key, cat in RANKING_CATEGORIES.items()
+        ],
+        "players": [p.get("name", "Unknown") for p in players],
+        "mins": [p.get("mins", 0) or 0 for p in players],
+        "stats": {key: [stat_value(p, key) for p in players] for key in stat_keys},
+        "per90_available": per_90_available,
+        "top_n": RANKING_TOP_N,
+        "indicator": indicator,
+    }
+
+
+RANKINGS_JS = """
+(function() {
+    // View state lives here so it survives re-renders of the output (new scope)
+    var state = {category: null, stat: null, per90: false, player: null};
+    var data = null;
+
+    function esc(s) {
+        return String(s).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/"/g, '&quot;');
+    }
+
+    // Same output as format_decimal(): fixed decimals with trailing zeroes removed
+    function fmt(v, decimals) {
+        var s = v.toFixed(decimals);
+        if (s.indexOf('.') >= 0) {
+            s = s.replace(/0+$/, '').replace(/\\.$/, '');
+        }
+        return s;
+    }
+
+    function draw() {
+        var root = document.getElementById('team-rankings-root');
+        if (!root || !data) {
+            return;
+        }
+        var cat = data.categories[0];
+        data.categories.forEach(function(c) { if (c.key === state.category) { cat = c; } });
+        var stat = cat.stats[0];
+        cat.stats.forEach(function(s) { if (s.key === state.stat) { stat = s; } });
+        var per90 = state.per90 && data.per90_available;
+        var values = data.stats[stat.key];
+
+        function value(i) {
+            var v = values[i];
+            if (per90) {
+                var mins = data.mins[i] || 1;
+                v = v / (mins / 90);
+            }
+            return v;
+        }
+        var order = data.players.map(function(_, i) { return i; });
+        order.sort(function(a, b) { return value(b) - value(a); });
+
+        var html = '<div style="display: flex; align-items: center; margin-bottom: 8px;">' +
+                   '<h4 style="margin: 0;">TEAM RANKINGS</h4>';
+        if (data.per90_available) {
+            html += '<button class="ranking-stat-btn' + (per90 ? ' active' : '') +
+                    '" id="ranking-per90-btn" style="margin-left: auto;">Per 90</button>';
+        }
+        html += '</div>' + data.indicator + '<div class="ranking-category-buttons">';
+        data.categories.forEach(function(c) {
+            html += '<button class="ranking-category-btn' + (c === cat ? ' active' : '') +
+                    '" data-category="' + c.key + '">' + esc(c.label) + '</button>';
+        });
+        html += '</div><div class="ranking-stat-selector">';
+        cat.stats.forEach(function(s) {
+            html += '<button class="ranking-stat-btn' + (s === stat ? ' active' : '') +
+                    '" data-stat="' + s.key + '">' + esc(s.label) + '</button>';
+        });
+        html += '</div><table class="ranking-table"><thead><tr><th>#</th><th>Player</th>' +
+                '<th class="stat-col">' + esc(stat.title) + (per90 ? ' /90' : '') + '</th></tr></thead><tbody>';
+        order.slice(0, data.top_n).forEach(function(i, idx) {
+            var name = data.players[i];
+            var decimals = (stat.decimal || per90) ? 2 : 1;
+            html += '<tr class="' + (name === state.player ? 'highlighted' : '') + '" data-player="' + esc(name) +
+                    '" style="cursor: pointer;"><td class="rank-col">' + (idx + 1) + '</td>' +
+                    '<td class="player-col">' + esc(name) + '</td>' +
+                    '<td class="stat-col">' + fmt(value(i), decimals) + '</td></tr>';
+        });
+        root.innerHTML = html + '</tbody></table>';
+    }
+
+    window.renderTeamRankings = function() {
+        var el = document.getElementById('team-rankings-data');
+        data = el ? JSON.parse(el.textContent) : null;
+        if (data) {
+            state.player = data.player;
+        }
+        draw();
+    };
+
+    document.addEventListener('click', function(ev) {
+        var root = document.getElementById('team-rankings-root');
+        if (!root || !root.contains(ev.target)) {
+            return;
+        }
+        var el;
+        if ((el = ev.target.closest('.ranking-category-btn'))) {
+            state.category = el.getAttribute('data-category');
+            state.stat = null;
+            draw();
+        } else if ((el = ev.target.closest('#ranking-per90-btn'))) {
+            state.per90 = !state.per90;
+            draw();
+        } else if ((el = ev.target.closest('.ranking-stat-btn'))) {
+            state.stat = el.getAttribute('data-stat');
+            draw();
+            Shiny.setInputValue('ranking_stat_click', state.stat, {priority: 'event'});
+        } else if ((el = ev.target.closest('.ranking-table tbody tr[data-player]'))) {
+            Shiny.setInputValue('ranking_player_click', el.getAttribute('data-player'), {priority: 'event'});
+        }
+    });
+
+    function onHighlight(msg) {
+        state.player = msg.player;
+        draw();
+    }
+    if (window.Shiny && Shiny.addCustomMessageHandler) {
+        Shiny.addCustomMessageHandler('ranking_highlight', onHighlight);
+    } else {
+        document.addEventListener('DOMContentLoaded', function() {
+            Shiny.addCustomMessageHandler('ranking_highlight', onHighlight);
+        });
+    }
+})();
+"""
+
+
+# ============================================================
+# PLAYER SELECTION
+# ============================================================
+
+# One delegated listener for every player button and pitch click area, so the
+# server needs a single `player_click` effect regardless of roster size.
+PLAYER_CLICK_JS = """
+document.addEventListener('click', function(ev) {
+    var el = ev.target.closest('.player-btn[data-player], .pitch-click-area[data-player]');
+    if (el && window.Shiny) {
+        Shiny.setInputValue('player_click', el.getAttribute('data-player'), {priority: 'event'});
+    }
+});
+"""
+
+# ============================================================
+# SHINY APP UI
+# ============================================================
+
+app_ui = ui.page_fluid(
+    ui.tags.head(
+        ui.tags.style(f"""
+            * {{
+                box-sizing: border-box;
+            }}
+            body {{
+                background-color: {BG_COLOR};
+                color: {TEXT_COLOR};
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 0;
+                padding: 20px;
+            }}
+            .main-container {{
+                display: flex;
+                gap: 20px;
+                max-width: 1400px;
+                margin: 0 auto;
+                min-height: 900px;
+            }}
+            .pitch-panel {{
+                flex: 1.2;
+                background-color: {CARD_BG};
+                border: 1px solid #222;
+                border-radius: 12px;
                 padding: 20px;
                 display: flex;
                 flex-direction: column;
@@ -1830,7 +4048,10 @@ app_ui = ui.page_fluid(
                     font-size: 11px;
                 }}
             }}
-        """)
+        """),
+        ui.tags.script(PLAYER_CLICK_JS),
+        ui.tags.script(RANKINGS_JS),
+        ui.tags.script(EVENT_CANVAS_JS) if CLIENT_SIDE_RENDERING else "",
     ),
 
     # Header - logo with title underneath, centered
@@ -1967,12 +4188,72 @@ app_ui = ui.page_fluid(
 )
 
 
+# ============================================================
+# INTERACTION SCHEDULING
+# ============================================================
+
+# Clicking quickly through ranking stats, heatmap types or the start/end toggles
+# used to re-render the stats table and heatmap for every intermediate state.
+# Those outputs read their controls through debounced calcs, so a burst of
+# clicks settles into a single render of the final state. Heatmap renders that
+# are already in flight when the controls change are cancelled (see heatmap_task).
+INTERACTION_DEBOUNCE_SECS = 0.25
+
+
+def debounce(delay_secs):
+    """Decorator for a server-side calc whose value only updates after its inputs
+    have been quiet for delay_secs."""
+    def wrapper(f):
+        when = reactive.value(None)
+        trigger = reactive.value(0)
+        primed = [False]
+
+        @reactive.calc
+        def latest():
+            return f()
+
+        @reactive.effect(priority=102)
+        def _restart_timer():
+            try:
+                latest()
+            except SilentException:
+                pass
+            # The first value is served immediately; only later changes wait
+            if not primed[0]:
+                primed[0] = True
+                return
+            when.set(time.time() + delay_secs)
+
+        @reactive.effect(priority=101)
+        def _fire():
+            deadline = when()
+            if deadline is None:
+                return
+            remaining = deadline - time.time()
+            if remaining > 0:
+                reactive.invalidate_later(remaining)
+                return
+            with reactive.isolate():
+                when.set(None)
+                trigger.set(trigger() + 1)
+
+        @reactive.calc
+        @reactive.event(trigger, ignore_none=False)
+        def debounced():
+            return latest()
+
+        return debounced
+    return wrapper
+
+
 # ============================================================
 # SERVER
 # ============================================================
 
 def server(input, output, session):
 
+    prewarm_photo_cache()   # First session starts the background downloads; later ones no-op
+
     # Reactive value to store selected player (None = no selection on load)
     selected_player = reactive.value(None)
 
@@ -1999,15 +4280,16 @@ def server(input, output, session):
     # Reactive value for per 90 mode
     per_90_mode = reactive.value(False)
 
-    # Reactive value for team rankings category
-    # Options: "passing", "carrying", "reception", "shooting", "defensive"
-    ranking_category = reactive.value("passing")
+    # Controls read by the expensive outputs, settled after a burst of clicks
+    @debounce(INTERACTION_DEBOUNCE_SECS)
+    def view_controls():
+        """(heatmap_type, viz_type) for the heatmap and stats table."""
+        return input.heatmap_type(), stat_visualization.get()
 
-    # Reactive value for selected stat within ranking category
-    ranking_stat = reactive.value(None)
-
-    # Reactive value for rankings per 90 mode
-    ranking_per_90 = reactive.value(False)
+    @debounce(INTERACTION_DEBOUNCE_SECS)
+    def map_toggles():
+        """(location toggle, heatmap mode) for the heatmap."""
+        return location_toggle.get(), heatmap_mode.get()
 
     def get_current_season():
         """Get the currently selected season as an integer."""
@@ -2060,6 +4342,35 @@ def server(input, output, session):
         season = get_current_season()
         return SEASON_LOOKUPS[season]["minutes_lookup"]
 
+    # Derived data for the selected player, computed once per change and shared by
+    # the info, stats, game dropdown, heat map and export outputs
+    @reactive.calc
+    def selected_player_record():
+        """Season record for the selected player, or None."""
+        name = selected_player.get()
+        if not name:
+            return None
+        return get_player_data(name, get_season_player_lookup())
+
+    @reactive.calc
+    def selected_game_stats():
+        """Per-match stats for the selected player and game, or None."""
+        player = selected_player_record()
+        game_filter = selected_game.get()
+        if not player or not game_filter or not player.get("player_id"):
+            return None
+        return cached_game_stats(get_current_season(), player["player_id"], game_filter)
+
+    @reactive.calc
+    def selected_player_stats():
+        """Selected player's record, with game stats merged in when a game is selected."""
+        player = selected_player_record()
+        if not player:
+            return None
+        game_stats = selected_game_stats()
+        # Keep player info like name and position, override the counting stats
+        return {**player, **game_stats} if game_stats else player
+
     @reactive.effect
     @reactive.event(input.season_select)
     def _reset_on_season_change():
@@ -2125,10 +4436,9 @@ def server(input, output, session):
             for player in sorted_players:
                 name = player["name"]
                 is_selected = name == current
-                btn_class = "player-btn selected" if is_selected else "player-btn"
-                btn_id = f"btn_{sanitize_id(name)}"
+                btn_class = "btn btn-default player-btn selected" if is_selected else "btn btn-default player-btn"
                 buttons.append(
-                    ui.input_action_button(btn_id, name, class_=btn_class)
+                    ui.tags.button(name, type="button", class_=btn_class, **{"data-player": name})
                 )
 
         return ui.div(*buttons, style="max-height: 200px; overflow-y: auto;")
@@ -2143,7 +4453,7 @@ def server(input, output, session):
         if not name:
             return ui.p("Select a player first", style=f"color: {SUBTEXT_COLOR}; font-size: 12px;")
 
-        player = get_player_data(name, get_season_player_lookup())
+        player = selected_player_record()
         if not player:
             return ui.p("No game data", style=f"color: {SUBTEXT_COLOR}; font-size: 12px;")
 
@@ -2201,29 +4511,11 @@ def server(input, output, session):
         else:
             selected_game.set(val)
 
-    # Create click handlers for all player buttons (both teams)
-    all_players = list(all_depth_players)
-    for pos in DEFIANCE_POSITION_ORDER:
-        if pos in DEFIANCE_DEPTH_CHART:
-            for p in DEFIANCE_DEPTH_CHART[pos]:
-                if p["name"] not in all_players:
-                    all_players.append(p["name"])
-
-    for player_name in all_players:
-        def make_handler(name):
-            btn_id = f"btn_{sanitize_id(name)}"
-            @reactive.effect
-            @reactive.event(input[btn_id])
-            def _():
-                selected_player.set(name)
-                selected_game.set(None)  # Clear game filter on player change
-        make_handler(player_name)
-
-    # Handle pitch player clicks
+    # Handle player clicks (sidebar buttons and pitch click areas, via PLAYER_CLICK_JS)
     @reactive.effect
-    @reactive.event(input.pitch_player_click)
+    @reactive.event(input.player_click)
     def _():
-        player_name = input.pitch_player_click()
+        player_name = input.player_click()
         if player_name:
             selected_player.set(player_name)
             selected_game.set(None)  # Clear game filter on player change
@@ -2328,8 +4620,6 @@ def server(input, output, session):
     @render.ui
     def pitch_display():
         """Render the pitch with jerseys and player names."""
-        fig, ax = create_pitch_figure(figsize=(8, 12))
-
         path_eff = [pe.Stroke(linewidth=2.5, foreground="black"), pe.Normal()]
         current = selected_player.get()
         current_filter = roster_filter.get()
@@ -2338,107 +4628,114 @@ def server(input, output, session):
         has_selection = current is not None
         has_filter = current_filter is not None
 
-        for pos in pos_order:
-            if pos not in depth_chart or pos not in pos_coords:
-                continue
-
-            x, y = pos_coords[pos]
-            players_raw = depth_chart[pos]
-
-            # Sort players by minutes played (descending)
-            player_lookup = get_season_player_lookup()
-            def get_player_minutes(p):
-                player_data = get_player_data(p["name"], player_lookup)
-                mins = player_data.get("mins") if player_data else 0
-                return mins if mins is not None else 0
-            players = sorted(players_raw, key=get_player_minutes, reverse=True)
-
-            # Check if any player at this position is the selected player
-            position_has_selected = any(p["name"] == current for p in players)
-
-            # Check if any player at this position matches the filter
-            position_has_filter_match = any(player_matches_filter(p, current_filter) for p in players)
-
-            # Determine jersey alpha based on selection or filter
-            if has_selection and not position_has_selected:
-                jersey_alpha = 0.3
-            elif has_filter and not position_has_filter_match:
-                jersey_alpha = 0.3
-            else:
-                jersey_alpha = 1.0
-
-            # Choose jersey color based on team
-            team = input.team_select()
-            is_defiance_team = team == "defiance"
-            jersey_color = DEFIANCE_BLUE if is_defiance_team else JERSEY_GREEN
-            accent_color = DEFIANCE_BLUE if is_defiance_team else ACCENT_GREEN
-
-            # Draw jersey with alpha
-            ax.scatter(x, y, marker=JERSEY_MARKER, s=1200, facecolor=jersey_color,
-                       edgecolor=ACCENT_WHITE, linewidth=1.5, zorder=4, alpha=jersey_alpha)
-
-            # Position label above jersey
-            display_pos = pos.replace("2", "")
-            if has_selection:
-                pos_alpha = 0.3 if not position_has_selected else 1.0
-            elif has_filter:
-                pos_alpha = 0.3 if not position_has_filter_match else 1.0
-            else:
-                pos_alpha = 1.0
-            ax.text(x, y + 4, display_pos, ha='center', va='bottom',
-                    fontsize=10, color=accent_color, fontweight='bold', zorder=6, alpha=pos_alpha)
-
-            # Stack player names below jersey
-            for i, player_entry in enumerate(players[:3]):
-                name = player_entry["name"]
-                parts = name.split()
-                display_name = parts[-1].upper() if parts else name.upper()
-
-                # Add captain "C" to the left of Cristian Roldan's name
-                if name == "Cristian Roldan" and i == 0:
-                    display_name = f"(C) {display_name}"
-
-                # Roster designation no longer shown in parentheses on pitch
-                # (shown in legend below instead)
-
-                y_offset = y - 6 - (i * 4)
-
-                # Determine color based on selection/filter state
-                matches_filter = player_matches_filter(player_entry, current_filter)
-
-                # Highlight selected player, fade others when there's a selection or filter
-                if name == current:
-                    color = accent_color
-                    fontweight = 'bold'
-                    fontsize = 10
-                    text_alpha = 1.0
-                elif has_filter and matches_filter:
-                    # Highlight players matching the filter
-                    color = accent_color
-                    fontweight = 'bold'
-                    fontsize = 9 if i == 0 else 8
-                    text_alpha = 1.0
-                elif has_selection:
-                    color = ACCENT_WHITE if i == 0 else SUBTEXT_COLOR
-                    fontweight = 'bold' if i == 0 else 'normal'
-                    fontsize = 9 if i == 0 else 8
-                    text_alpha = 0.3
-                elif has_filter:
-                    color = ACCENT_WHITE if i == 0 else SUBTEXT_COLOR
-                    fontweight = 'bold' if i == 0 else 'normal'
-                    fontsize = 9 if i == 0 else 8
-                    text_alpha = 0.3
-                else:
-                    color = ACCENT_WHITE if i == 0 else SUBTEXT_COLOR
-                    fontweight = 'bold' if i == 0 else 'normal'
-                    fontsize = 9 if i == 0 else 8
-                    text_alpha = 1.0
-
-                ax.text(x, y_offset, display_name, ha='center', va='top',
-                        fontsize=fontsize, color=color, fontweight=fontweight,
-                        zorder=5, path_effects=path_eff, alpha=text_alpha)
-
-        img_data = fig_to_base64(fig, dpi=100)
+        season = get_current_season()
+        render_key = ("pitch", SEASON_VERSIONS[season], input.team_select(), current, current_filter)
+        img_data = RENDER_CACHE.get(render_key)
+        if img_data is None:
+            with FIGURE_POOL.figure("pitch") as (fig, ax):
+
+                for pos in pos_order:
+                    if pos not in depth_chart or pos not in pos_coords:
+                        continue
+
+                    x, y = pos_coords[pos]
+                    players_raw = depth_chart[pos]
+
+                    # Sort players by minutes played (descending)
+                    player_lookup = get_season_player_lookup()
+                    def get_player_minutes(p):
+                        player_data = get_player_data(p["name"], player_lookup)
+                        mins = player_data.get("mins") if player_data else 0
+                        return mins if mins is not None else 0
+                    players = sorted(players_raw, key=get_player_minutes, reverse=True)
+
+                    # Check if any player at this position is the selected player
+                    position_has_selected = any(p["name"] == current for p in players)
+
+                    # Check if any player at this position matches the filter
+                    position_has_filter_match = any(player_matches_filter(p, current_filter) for p in players)
+
+                    # Determine jersey alpha based on selection or filter
+                    if has_selection and not position_has_selected:
+                        jersey_alpha = 0.3
+                    elif has_filter and not position_has_filter_match:
+                        jersey_alpha = 0.3
+                    else:
+                        jersey_alpha = 1.0
+
+                    # Choose jersey color based on team
+                    team = input.team_select()
+                    is_defiance_team = team == "defiance"
+                    jersey_color = DEFIANCE_BLUE if is_defiance_team else JERSEY_GREEN
+                    accent_color = DEFIANCE_BLUE if is_defiance_team else ACCENT_GREEN
+
+                    # Draw jersey with alpha
+                    ax.scatter(x, y, marker=JERSEY_MARKER, s=1200, facecolor=jersey_color,
+                               edgecolor=ACCENT_WHITE, linewidth=1.5, zorder=4, alpha=jersey_alpha)
+
+                    # Position label above jersey
+                    display_pos = pos.replace("2", "")
+                    if has_selection:
+                        pos_alpha = 0.3 if not position_has_selected else 1.0
+                    elif has_filter:
+                        pos_alpha = 0.3 if not position_has_filter_match else 1.0
+                    else:
+                        pos_alpha = 1.0
+                    ax.text(x, y + 4, display_pos, ha='center', va='bottom',
+                            fontsize=10, color=accent_color, fontweight='bold', zorder=6, alpha=pos_alpha)
+
+                    # Stack player names below jersey
+                    for i, player_entry in enumerate(players[:3]):
+                        name = player_entry["name"]
+                        parts = name.split()
+                        display_name = parts[-1].upper() if parts else name.upper()
+
+                        # Add captain "C" to the left of Cristian Roldan's name
+                        if name == "Cristian Roldan" and i == 0:
+                            display_name = f"(C) {display_name}"
+
+                        # Roster designation no longer shown in parentheses on pitch
+                        # (shown in legend below instead)
+
+                        y_offset = y - 6 - (i * 4)
+
+                        # Determine color based on selection/filter state
+                        matches_filter = player_matches_filter(player_entry, current_filter)
+
+                        # Highlight selected player, fade others when there's a selection or filter
+                        if name == current:
+                            color = accent_color
+                            fontweight = 'bold'
+                            fontsize = 10
+                            text_alpha = 1.0
+                        elif has_filter and matches_filter:
+                            # Highlight players matching the filter
+                            color = accent_color
+                            fontweight = 'bold'
+                            fontsize = 9 if i == 0 else 8
+                            text_alpha = 1.0
+                        elif has_selection:
+                            color = ACCENT_WHITE if i == 0 else SUBTEXT_COLOR
+                            fontweight = 'bold' if i == 0 else 'normal'
+                            fontsize = 9 if i == 0 else 8
+                            text_alpha = 0.3
+                        elif has_filter:
+                            color = ACCENT_WHITE if i == 0 else SUBTEXT_COLOR
+                            fontweight = 'bold' if i == 0 else 'normal'
+                            fontsize = 9 if i == 0 else 8
+                            text_alpha = 0.3
+                        else:
+                            color = ACCENT_WHITE if i == 0 else SUBTEXT_COLOR
+                            fontweight = 'bold' if i == 0 else 'normal'
+                            fontsize = 9 if i == 0 else 8
+                            text_alpha = 1.0
+
+                        ax.text(x, y_offset, display_name, ha='center', va='top',
+                                fontsize=fontsize, color=color, fontweight=fontweight,
+                                zorder=5, path_effects=path_eff, alpha=text_alpha)
+
+                img_data = fig_to_data_uri(fig, dpi=100, close=False)
+            RENDER_CACHE.put(render_key, img_data)
 
         # Build clickable overlay areas for each position
         # The pitch is 80 wide x 120 tall in data coords, with padding of 5 on each side
@@ -2501,22 +4798,12 @@ def server(input, output, session):
         return ui.div(
             ui.HTML(f'''
                 <div class="pitch-container">
-                    <img src="data:image/png;base64,{img_data}" class="pitch-image" style="width: 100%; display: block;">
+                    <img src="{img_data}" class="pitch-image" style="width: 100%; display: block;">
                     <div class="pitch-overlay">
                         {click_areas_html}
                     </div>
                 </div>
             '''),
-            ui.tags.script("""
-                document.querySelectorAll('.pitch-click-area').forEach(function(area) {
-                    area.addEventListener('click', function() {
-                        var playerName = this.getAttribute('data-player');
-                        if (playerName) {
-                            Shiny.setInputValue('pitch_player_click', playerName, {priority: 'event'});
-                        }
-                    });
-                });
-            """)
         )
 
 
@@ -2636,86 +4923,20 @@ def server(input, output, session):
     @output
     @render.ui
     def team_rankings():
-        """Display team stat rankings below the roster summary."""
+        """Send the team ranking matrix for the current scope; RANKINGS_JS does the rest."""
         season = get_current_season()
         players_data = get_season_players_data()
         events_data = get_season_events_data()
-        current_category = ranking_category.get()
-        current_stat = ranking_stat.get()
-        current_player = selected_player.get()
         game_filter = selected_game.get()
-        is_per_90 = ranking_per_90.get()
 
         # Determine accent color based on team
         is_defiance = input.team_select() == "defiance"
         accent_color = DEFIANCE_BLUE if is_defiance else ACCENT_GREEN
 
-        # Define stat categories with their stats - similar to fbref
-        # Note: "passes" = successful passes, "total_passes" = all attempts
-        RANKING_CATEGORIES = {
-            "passing": {
-                "label": "Passing",
-                "heatmap_type": "Pass",
-                "stats": [
-                    ("passes", "Passes", False, "all_passes"),
-                    ("progressive_passes", "Prog", False, "progressive_passes"),
-                    ("key_passes", "Key", False, "key_passes"),
-                    ("final_third_passes", "Final 3rd", False, "final_third_passes"),
-                    ("deep_passes", "Deep", False, "deep_passes"),
-                    ("xg_assisted", "xGA", True, None),
-                    ("pv_passing", "PV+", True, None),
-                ]
-            },
-            "carrying": {
-                "label": "Carrying",
-                "heatmap_type": "Carry",
-                "stats": [
-                    ("carries", "Carries", False, "all_carries"),
-                    ("progressive_carries", "Prog", False, "progressive_carries"),
-                    ("final_third_carries", "Final 3rd", False, "final_third_carries"),
-                    ("deep_carries", "Deep", False, "deep_carries"),
-                    ("pv_carrying", "PV+", True, None),
-                ]
-            },
-            "reception": {
-                "label": "Receiving",
-                "heatmap_type": "Reception",
-                "stats": [
-                    ("receptions", "Recv", False, "all_receptions"),
-                    ("final_third_receptions", "Final 3rd", False, "final_third_receptions"),
-                    ("deep_receptions", "Deep", False, "deep_receptions"),
-                    ("pv_receiving", "PV+", True, None),
-                ]
-            },
-            "shooting": {
-                "label": "Shooting",
-                "heatmap_type": "Shot",
-                "stats": [
-                    ("goals", "Goals", False, "goals"),
-                    ("shots", "Shots", False, "all_shots"),
-                    ("shots_on_target", "SOT", False, "shots_on_target"),
-                    ("total_xg", "xG", True, None),
-                    ("pv_shooting", "PV+", True, None),
-                ]
-            },
-            "defensive": {
-                "label": "Defensive",
-                "heatmap_type": "Defensive",
-                "stats": [
-                    ("defensive_actions", "Actions", False, "all_defensive"),
-                    ("tackles", "Tackles", False, "tackles"),
-                    ("interceptions", "Int", False, "interceptions"),
-                    ("clearances", "Clr", False, "clearances"),
-                    ("ball_recoveries", "Recv", False, "recoveries"),
-                    ("pv_defending", "PV+", True, None),
-                ]
-            },
-        }
-
         # If game filter is active, calculate stats from events for that game
         if game_filter and events_data:
             # Get all player_ids who have events in this game
-            game_events = [e for e in events_data if str(e.get("match_id")) == str(game_filter)]
+            game_events = season_game_events(season, game_filter)
             game_player_ids = set(e.get("player_id") for e in game_events if e.get("player_id"))
 
             # Build player stats from game events
@@ -2724,7 +4945,7 @@ def server(input, output, session):
                 player_id = player.get("player_id")
                 if player_id in game_player_ids:
                     # Calculate game-specific stats
-                    game_stats = get_game_stats(player_id, game_filter, events_data)
+                    game_stats = cached_game_stats(season, player_id, game_filter)
                     if game_stats:
                         # Merge player info with game stats
                         player_with_game_stats = {**player, **game_stats}
@@ -2736,126 +4957,6 @@ def server(input, output, session):
         if not active_players:
             return ui.HTML('<div class="team-rankings"><p style="color: #888; font-size: 12px;">No player data available</p></div>')
 
-        # Build category buttons
-        category_buttons = ""
-        for cat_key, cat_info in RANKING_CATEGORIES.items():
-            active_class = "active" if cat_key == current_category else ""
-            category_buttons += f'''
-                <button class="ranking-category-btn {active_class}" data-category="{cat_key}">
-                    {cat_info["label"]}
-                </button>
-            '''
-
-        # Get current category stats
-        cat_data = RANKING_CATEGORIES.get(current_category, RANKING_CATEGORIES["passing"])
-        stats_list = cat_data["stats"]
-        heatmap_type = cat_data.get("heatmap_type", "Overview")
-
-        # Default to first stat if none selected or invalid
-        valid_stat_keys = [s[0] for s in stats_list]
-        if current_stat not in valid_stat_keys:
-            current_stat = stats_list[0][0]
-
-        # Build stat selector buttons
-        stat_buttons = ""
-        for stat_tuple in stats_list:
-            stat_key_btn, stat_label, is_decimal, viz_type = stat_tuple
-            active_class = "active" if stat_key_btn == current_stat else ""
-            stat_buttons += f'''
-                <button class="ranking-stat-btn {active_class}" data-stat="{stat_key_btn}">
-                    {stat_label}
-                </button>
-            '''
-
-        # Get stat info for formatting
-        stat_info = next((s for s in stats_list if s[0] == current_stat), stats_list[0])
-        stat_key, stat_label, is_decimal, viz_type = stat_info
-
-        # Calculate per 90 values if enabled
-        def get_stat_value(player):
-            val = player.get(stat_key, 0)
-            val = float(val) if val is not None else 0
-            if is_per_90:
-                mins = player.get("mins", 0) or 1
-                if mins > 0:
-                    val = val / (mins / 90)
-            return val
-
-        # Sort players by the selected stat (descending)
-        sorted_players = sorted(active_players, key=get_stat_value, reverse=True)
-
-        # Take top 10 for display
-        top_players = sorted_players[:10]
-
-        # Build ranking table rows - make player names clickable
-        table_rows = ""
-        for idx, player in enumerate(top_players, 1):
-            name = player.get("name", "Unknown")
-            val = get_stat_value(player)
-
-            # Format value - remove trailing zeroes
-            if is_decimal or is_per_90:
-                formatted_val = format_decimal(val, 2)
-            else:
-                formatted_val = format_decimal(val, 1)
-
-            # Highlight if this is the selected player
-            highlighted = "highlighted" if name == current_player else ""
-
-            table_rows += f'''
-                <tr class="{highlighted}" data-player="{name}" style="cursor: pointer;">
-                    <td class="rank-col">{idx}</td>
-                    <td class="player-col">{name}</td>
-                    <td class="stat-col">{formatted_val}</td>
-                </tr>
-            '''
-
-        # Get full stat name for header
-        full_stat_names = {
-            "passes": "Successful Passes",
-            "total_passes": "Total Passes",
-            "progressive_passes": "Progressive Passes",
-            "key_passes": "Key Passes",
-            "final_third_passes": "Final Third Passes",
-            "deep_passes": "Deep Passes",
-            "xg_assisted": "xG Assisted",
-            "pv_passing": "Passing PV+",
-            "carries": "Carries",
-            "progressive_carries": "Progressive Carries",
-            "final_third_carries": "Final Third Carries",
-            "deep_carries": "Deep Carries",
-            "pv_carrying": "Carrying PV+",
-            "receptions": "Receptions",
-            "final_third_receptions": "Final Third Receptions",
-            "deep_receptions": "Deep Receptions",
-            "pv_receiving": "Receiving PV+",
-            "goals": "Goals",
-            "shots": "Shots",
-            "shots_on_target": "Shots on Target",
-            "total_xg": "Expected Goals",
-            "pv_shooting": "Shooting PV+",
-            "defensive_actions": "Defensive Actions",
-            "tackles": "Tackles",
-            "interceptions": "Interceptions",
-            "clearances": "Clearances",
-            "ball_recoveries": "Ball Recoveries",
-            "pv_defending": "Defending PV+",
-        }
-        stat_header = full_stat_names.get(stat_key, stat_label)
-        if is_per_90:
-            stat_header += " /90"
-
-        # Per 90 toggle button - hide when filtered to specific game
-        if game_filter:
-            per_90_btn = ''
-        else:
-            per_90_active = "active" if is_per_90 else ""
-            per_90_btn = f'''
-                <button class="ranking-stat-btn {per_90_active}" id="ranking-per90-btn" style="margin-left: auto;">
-                    Per 90
-                </button>
-            '''
-
         # Game filter indicator
         game_indicator = ""
         if game_filter:
@@ -2865,88 +4966,23 @@ def server(input, output, session):
             venue = match_info.get("venue", "")
             game_indicator = f'<div style="font-size: 10px; color: {accent_color}; margin-bottom: 8px;">Filtered: {venue} {opponent}</div>'
 
-        rankings_html = f'''
-        <div class="team-rankings">
-            <div style="display: flex; align-items: center; margin-bottom: 8px;">
-                <h4 style="margin: 0;">TEAM RANKINGS</h4>
-                {per_90_btn}
-            </div>
-            {game_indicator}
-            <div class="ranking-category-buttons">
-                {category_buttons}
-            </div>
-            <div class="ranking-stat-selector">
-                {stat_buttons}
-            </div>
-            <table class="ranking-table">
-                <thead>
-                    <tr>
-                        <th>#</th>
-                        <th>Player</th>
-                        <th class="stat-col">{stat_header}</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {table_rows}
-                </tbody>
-            </table>
-        </div>
-        <script>
-            // Category button clicks
-            document.querySelectorAll('.ranking-category-btn').forEach(function(btn) {{
-                btn.addEventListener('click', function() {{
-                    var category = this.getAttribute('data-category');
-                    Shiny.setInputValue('ranking_category_click', category, {{priority: 'event'}});
-                }});
-            }});
-            // Stat button clicks
-            document.querySelectorAll('.ranking-stat-btn:not(#ranking-per90-btn)').forEach(function(btn) {{
-                btn.addEventListener('click', function() {{
-                    var stat = this.getAttribute('data-stat');
-                    Shiny.setInputValue('ranking_stat_click', stat, {{priority: 'event'}});
-                }});
-            }});
-            // Per 90 toggle
-            var per90Btn = document.getElementById('ranking-per90-btn');
-            if (per90Btn) {{
-                per90Btn.addEventListener('click', function() {{
-                    Shiny.setInputValue('ranking_per90_click', Date.now(), {{priority: 'event'}});
-                }});
-            }}
-            // Player row clicks - select player and update visualizations
-            document.querySelectorAll('.ranking-table tbody tr').forEach(function(row) {{
-                row.addEventListener('click', function() {{
-                    var playerName = this.getAttribute('data-player');
-                    if (playerName) {{
-                        Shiny.setInputValue('ranking_player_click', playerName, {{priority: 'event'}});
-                    }}
-                }});
-            }});
-        </script>
-        '''
-
-        return ui.HTML(rankings_html)
+        # Per 90 is hidden when filtered to a specific game
+        payload = ranking_payload(active_players, per_90_available=not game_filter, indicator=game_indicator)
+        # Later selections move the highlight via the ranking_highlight message
+        with reactive.isolate():
+            payload["player"] = selected_player.get()
+        payload_json = json.dumps(payload).replace("</", "<\\/")
 
+        return ui.HTML(f'''
+        <div class="team-rankings" id="team-rankings-root"></div>
+        <script type="application/json" id="team-rankings-data">{payload_json}</script>
+        <script>window.renderTeamRankings && window.renderTeamRankings();</script>
+        ''')
 
-    # Handle ranking category button clicks
     @reactive.effect
-    @reactive.event(input.ranking_category_click)
-    def _handle_ranking_category():
-        new_category = input.ranking_category_click()
-        if new_category:
-            ranking_category.set(new_category)
-            # Reset stat to first stat of new category
-            ranking_stat.set(None)
-
-            # Update heatmap type to match category
-            category_to_heatmap = {
-                "passing": "Pass",
-                "carrying": "Carry",
-                "reception": "Reception",
-                "shooting": "Shot",
-                "defensive": "Defensive",
-            }
-            # Note: We can't directly set heatmap_type input, but we can set stat_visualization
+    async def _highlight_ranked_player():
+        """Move the rankings highlight in the browser instead of re-rendering the table."""
+        await session.send_custom_message("ranking_highlight", {"player": selected_player.get()})
 
 
     # Handle ranking stat button clicks
@@ -2955,8 +4991,6 @@ def server(input, output, session):
     def _handle_ranking_stat():
         new_stat = input.ranking_stat_click()
         if new_stat:
-            ranking_stat.set(new_stat)
-
             # Map stat to visualization type for action map
             STAT_TO_VIZ = {
                 "passes": "all_passes",
@@ -2985,14 +5019,6 @@ def server(input, output, session):
                 stat_visualization.set(viz)
 
 
-    # Handle ranking per 90 toggle
-    @reactive.effect
-    @reactive.event(input.ranking_per90_click)
-    def _handle_ranking_per90():
-        current = ranking_per_90.get()
-        ranking_per_90.set(not current)
-
-
     # Handle player click from rankings
     @reactive.effect
     @reactive.event(input.ranking_player_click)
@@ -3001,17 +5027,6 @@ def server(input, output, session):
         if player_name:
             selected_player.set(player_name)
 
-            # Map current category to heatmap type
-            current_cat = ranking_category.get()
-            category_to_heatmap = {
-                "passing": "Pass",
-                "carrying": "Carry",
-                "reception": "Reception",
-                "shooting": "Shot",
-                "defensive": "Defensive",
-            }
-            # We could update heatmap_type here if we had access to update inputs
-
 
     def format_salary(salary):
         """Format salary as currency (e.g., $2,500,000)."""
@@ -3030,7 +5045,7 @@ def server(input, output, session):
         if not name:
             return ui.p("Select a player")
 
-        player = get_player_data(name, get_season_player_lookup())
+        player = selected_player_record()
 
         # Get all roster designations for this player from depth chart
         roster_badges = []
@@ -3090,7 +5105,7 @@ def server(input, output, session):
 
             # Use image_url from database if available, fallback to depth chart photo with season fallback
             season = get_current_season()
-            photo_url = get_player_photo_with_fallback(name, season, player_entry)
+            photo_url = cached_photo_url(name, season, player_photo_url(name, season, player_entry))
 
             # Get position from primary_general_position
             position = player.get('primary_general_position', player.get('position', 'N/A'))
@@ -3122,14 +5137,14 @@ def server(input, output, session):
                         style="flex: 1;"
                     ),
                     # Radar chart on the right
-                    ui.HTML(f'<img src="data:image/png;base64,{radar_img}" alt="Player radar" style="width: 200px; height: 200px;">'),
+                    ui.HTML(f'<img src="{radar_img}" alt="Player radar" style="width: 200px; height: 200px;">'),
                     style="display: flex; align-items: center; gap: 15px;"
                 ),
             )
         else:
             # Use photo with fallback even when player data not found
             season = get_current_season()
-            photo_url = get_player_photo_with_fallback(name, season, player_entry)
+            photo_url = cached_photo_url(name, season, player_photo_url(name, season, player_entry))
             badges_html = ""
             for badge in roster_badges:
                 badges_html += f'<span class="designation-badge" style="margin-right: 5px; margin-bottom: 5px;">{badge}</span>'
@@ -3199,20 +5214,13 @@ def server(input, output, session):
         if not name:
             return ui.p("Select a player")
 
-        player = get_player_data(name, get_season_player_lookup())
+        # Season stats, or game-specific stats if a game filter is active
+        player = selected_player_stats()
         if not player:
             return ui.p("No stats available")
-
-        # Check for game filter - use game-specific stats if active
         game_filter = selected_game.get()
-        if game_filter and player.get("player_id"):
-            game_stats = get_game_stats(player.get("player_id"), game_filter, get_season_events_data())
-            if game_stats:
-                # Merge game stats with player data (keep player info like name, position)
-                player = {**player, **game_stats}
 
-        heatmap_type = input.heatmap_type()
-        current_viz = stat_visualization.get()
+        heatmap_type, current_viz = view_controls()
         is_per_90 = per_90_mode.get()
 
         # Calculate per 90 divisor (minutes / 90)
@@ -3437,201 +5445,31 @@ def server(input, output, session):
         stat_visualization.set(input.stat_viz_click())
 
 
-    def render_trajectory_viz(player_id, viz_type, game_filter=None, accent_color=None, events_data=None):
-        """Render trajectory visualization with comet effect (line from start to end)."""
-        from matplotlib.collections import LineCollection
-
+    def trajectory_job(player_id, viz_type, game_filter=None, accent_color=None):
+        """Resolve a trajectory visualization (comet effect) to ready UI or a RenderJob."""
         if accent_color is None:
             accent_color = ACCENT_GREEN
-        if events_data is None:
-            events_data = get_season_events_data()
-
-        # Define which event types and filters to use for each viz_type
-        VIZ_CONFIG = {
-            "key_passes": {"event_type": "Pass", "filter": lambda e: e.get("is_keypass", False), "title": "Key Passes", "needs_end": True},
-            "assists": {"event_type": "Pass", "filter": lambda e: e.get("is_keypass", False), "title": "Assists", "needs_end": True},  # Approximation
-            "all_carries": {"event_type": "Carry", "filter": lambda e: True, "title": "Carries", "needs_end": True},
-            "carries": {"event_type": "Carry", "filter": lambda e: True, "title": "Carries", "needs_end": True},
-            "clearances": {"event_type": "Clearance", "filter": lambda e: True, "title": "Clearances", "needs_end": False},
-            "tackles": {"event_type": "Tackle", "filter": lambda e: True, "title": "Tackles", "needs_end": False},
-            "interceptions": {"event_type": "Interception", "filter": lambda e: True, "title": "Interceptions", "needs_end": False},
-            "recoveries": {"event_type": "BallRecovery", "filter": lambda e: True, "title": "Ball Recoveries", "needs_end": False},
-            "goals": {"event_type": "Goal", "filter": lambda e: True, "title": "Goals", "needs_end": False},
-            # Shot-related visualizations
-            "all_shots": {"event_type": ["Shot", "MissedShots", "SavedShot", "ShotOnPost", "Goal"], "filter": lambda e: True, "title": "All Shots", "needs_end": False},
-            "shots_on_target": {"event_type": ["SavedShot", "Goal"], "filter": lambda e: True, "title": "Shots on Target", "needs_end": False},
-            # Defensive visualizations
-            "all_defensive": {"event_type": ["Tackle", "Interception", "Clearance", "BallRecovery"], "filter": lambda e: True, "title": "Defensive Actions", "needs_end": False},
-            # Pass-related visualizations
-            "all_passes": {"event_type": "Pass", "filter": lambda e: True, "title": "All Passes", "needs_end": True},
-            "progressive_passes": {"event_type": "Pass", "filter": lambda e: e.get("is_progressive_pass", False), "title": "Progressive Passes", "needs_end": True},
-            "final_third_passes": {"event_type": "Pass", "filter": lambda e: e.get("is_final_third_pass", False), "title": "Final Third Passes", "needs_end": True},
-            "deep_passes": {"event_type": "Pass", "filter": lambda e: e.get("is_deep_pass", False), "title": "Deep Passes", "needs_end": True},
-            # Carry-related visualizations
-            "final_third_carries": {"event_type": "Carry", "filter": lambda e: e.get("is_final_third_carry", False), "title": "Final Third Carries", "needs_end": True},
-            "deep_carries": {"event_type": "Carry", "filter": lambda e: e.get("is_deep_carry", False), "title": "Deep Carries", "needs_end": True},
-            "progressive_carries": {"event_type": "Carry", "filter": lambda e: e.get("is_progressive_carry", False), "title": "Progressive Carries", "needs_end": True},
-            # Reception visualizations
-            "all_receptions": {"event_type": "Reception", "filter": lambda e: True, "title": "Receptions", "needs_end": False},
-            "final_third_receptions": {"event_type": "Reception", "filter": lambda e: e.get("x", 0) >= 66.67, "title": "Final Third Receptions", "needs_end": False},
-            "deep_receptions": {"event_type": "Reception", "filter": lambda e: e.get("x", 0) >= 83.33, "title": "Deep Receptions", "needs_end": False},
-        }
 
-        config = VIZ_CONFIG.get(viz_type)
-        if not config:
+        selection = VIZ_EVENT_SELECTIONS.get(viz_type)
+        if not selection:
             return ui.p(f"Unknown visualization type", style=f"color: {SUBTEXT_COLOR};")
+        title = VIZ_TITLES[viz_type]
+        needs_end = selection[2]
 
-        # Filter events - handle both single event type and list of event types
-        event_types = config["event_type"]
-        if isinstance(event_types, str):
-            event_types = [event_types]
-
-        events = [e for e in events_data
-                  if e["player_id"] == player_id
-                  and e["type_display_name"] in event_types
-                  and config["filter"](e)
-                  and e["x"] is not None and e["y"] is not None]
-
-        # Apply game filter if specified
-        if game_filter:
-            events = [e for e in events if str(e.get("match_id")) == str(game_filter)]
-
-        if config["needs_end"]:
-            events = [e for e in events if e.get("end_x") is not None and e.get("end_y") is not None]
+        events = select_view_events(get_current_season(), player_id, selection, game_filter or None,
+                                    require_end=needs_end)
 
         if len(events) < 1:
-            return ui.p(f"No {config['title'].lower()} data available", style=f"color: {SUBTEXT_COLOR};")
-
-        # Create pitch
-        HEATMAP_BG = "#000000"
-        fig, ax = plt.subplots(figsize=(10, 7), facecolor=HEATMAP_BG)
-        ax.set_facecolor(HEATMAP_BG)
-
-        P_WIDTH = 120
-        P_HEIGHT = 80
-
-        if config["needs_end"]:
-            # Draw trajectory lines with comet effect
-            for e in events:
-                start_x = e["x"] * P_WIDTH / 100
-                start_y = e["y"] * P_HEIGHT / 100
-                end_x = e["end_x"] * P_WIDTH / 100
-                end_y = e["end_y"] * P_HEIGHT / 100
-
-                # Clip to pitch bounds
-                start_x = np.clip(start_x, 0.1, P_WIDTH - 0.1)
-                start_y = np.clip(start_y, 0.1, P_HEIGHT - 0.1)
-                end_x = np.clip(end_x, 0.1, P_WIDTH - 0.1)
-                end_y = np.clip(end_y, 0.1, P_HEIGHT - 0.1)
-
-                # Check if this is an unsuccessful outcome
-                is_unsuccessful = e.get("outcome_type_display_name") == "Unsuccessful"
-                # Use grey for unsuccessful, accent color for successful
-                comet_color = '#666666' if is_unsuccessful else accent_color
-
-                # Create comet effect - line that fades from start to end
-                # Draw multiple segments with increasing alpha
-                n_segments = 10
-                alphas = np.linspace(0.1, 0.8, n_segments)
-                widths = np.linspace(1, 3, n_segments)
-
-                for i in range(n_segments):
-                    t1 = i / n_segments
-                    t2 = (i + 1) / n_segments
-                    x1 = start_x + (end_x - start_x) * t1
-                    y1 = start_y + (end_y - start_y) * t1
-                    x2 = start_x + (end_x - start_x) * t2
-                    y2 = start_y + (end_y - start_y) * t2
-                    ax.plot([x1, x2], [y1, y2], color=comet_color, alpha=alphas[i],
-                            linewidth=widths[i], solid_capstyle='round', zorder=2)
-
-                # Draw start point (small circle)
-                if is_unsuccessful:
-                    ax.scatter(start_x, start_y, s=30, c='#666666', alpha=0.5,
-                              edgecolors='none', zorder=3)
-                else:
-                    ax.scatter(start_x, start_y, s=30, c=accent_color, alpha=0.5,
-                              edgecolors='none', zorder=3)
-
-                # Draw end point (larger circle)
-                if is_unsuccessful:
-                    ax.scatter(end_x, end_y, s=80, c='#666666', alpha=0.7,
-                              edgecolors='none', zorder=4)
-                else:
-                    ax.scatter(end_x, end_y, s=80, c=accent_color, alpha=0.9,
-                              edgecolors='white', linewidth=1, zorder=4)
-        else:
-            # Just show points for events without end coordinates
-            for e in events:
-                ex = e["x"] * P_WIDTH / 100
-                ey = e["y"] * P_HEIGHT / 100
-                ex = np.clip(ex, 0.1, P_WIDTH - 0.1)
-                ey = np.clip(ey, 0.1, P_HEIGHT - 0.1)
-
-                # Check if this is an unsuccessful outcome
-                is_unsuccessful = e.get("outcome_type_display_name") == "Unsuccessful"
-
-                if viz_type == "goals":
-                    # Show goals as stars
-                    ax.scatter(ex, ey, s=200, c=accent_color, marker='*',
-                              edgecolors='white', linewidth=1.5, zorder=3)
-                elif is_unsuccessful:
-                    # Unsuccessful outcomes: grey
-                    ax.scatter(ex, ey, s=100, c='#666666', alpha=0.7,
-                              edgecolors='none', zorder=3)
-                else:
-                    ax.scatter(ex, ey, s=100, c=accent_color, alpha=0.8,
-                              edgecolors='white', linewidth=1, zorder=3)
-
-        # Draw pitch lines
-        lw = 2
-        line_col = "#ffffff"
-
-        rect = plt.Rectangle((0, 0), P_WIDTH, P_HEIGHT, fill=False,
-                              edgecolor=line_col, linewidth=lw, zorder=10)
-        ax.add_patch(rect)
-
-        ax.plot([P_WIDTH/2, P_WIDTH/2], [0, P_HEIGHT], color=line_col, lw=lw, zorder=10)
-
-        circle = plt.Circle((P_WIDTH/2, P_HEIGHT/2), 10, fill=False, color=line_col, lw=lw, zorder=10)
-        ax.add_patch(circle)
-        ax.scatter(P_WIDTH/2, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-
-        box_depth = 18
-        box_height = 44
-        box_top = (P_HEIGHT - box_height) / 2
-
-        ax.plot([0, box_depth, box_depth, 0],
-                [box_top, box_top, box_top + box_height, box_top + box_height],
-                color=line_col, lw=lw, zorder=10)
-        ax.plot([P_WIDTH, P_WIDTH - box_depth, P_WIDTH - box_depth, P_WIDTH],
-                [box_top, box_top, box_top + box_height, box_top + box_height],
-                color=line_col, lw=lw, zorder=10)
-
-        six_depth = 6
-        six_height = 20
-        six_top = (P_HEIGHT - six_height) / 2
-
-        ax.plot([0, six_depth, six_depth, 0],
-                [six_top, six_top, six_top + six_height, six_top + six_height],
-                color=line_col, lw=lw, zorder=10)
-        ax.plot([P_WIDTH, P_WIDTH - six_depth, P_WIDTH - six_depth, P_WIDTH],
-                [six_top, six_top, six_top + six_height, six_top + six_height],
-                color=line_col, lw=lw, zorder=10)
-
-        ax.scatter(12, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-        ax.scatter(P_WIDTH - 12, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-
-        ax.set_xlim(-1, P_WIDTH + 1)
-        ax.set_ylim(-1, P_HEIGHT + 1)
-        ax.set_aspect('equal')
-        ax.axis('off')
-
-        ax.set_title(f"{config['title']}: {len(events)} events", color=SUBTEXT_COLOR, fontsize=10, pad=5)
+            return ui.p(f"No {title.lower()} data available", style=f"color: {SUBTEXT_COLOR};")
 
-        img_data = fig_to_base64(fig, dpi=100)
+        render_key = ("trajectory", SEASON_VERSIONS[get_current_season()], player_id, viz_type,
+                      game_filter, accent_color)
+        cached_html = RENDER_CACHE.get(render_key)
+        if cached_html is not None:
+            return ui.HTML(cached_html)
 
-        return ui.HTML(f'<img src="data:image/png;base64,{img_data}" style="width: 100%; display: block; margin: 0 auto;">')
+        return RenderJob(render_key, render_trajectory_html,
+                         (events, title, needs_end, viz_type, accent_color))
 
 
     @output
@@ -3775,25 +5613,16 @@ def server(input, output, session):
     @render.download(filename=lambda: f"{selected_player.get() or 'player'}_{input.heatmap_type().lower()}_action_map.png")
     async def export_action_map():
         """Export current action map as PNG with player info and stats."""
-        from io import BytesIO
-        from matplotlib.patches import FancyBboxPatch, Circle
-        import matplotlib.gridspec as gridspec
-        from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-        from PIL import Image
-        import urllib.request
-
         name = selected_player.get()
         if not name:
             yield b""
             return
 
-        player = get_player_data(name, get_season_player_lookup())
+        player = selected_player_record()
         if not player:
             yield b""
             return
 
-        events_data = get_season_events_data()
-
         # Get player entry from depth chart for photo URL
         player_entry = None
         depth_chart, _, _ = get_current_team_data()
@@ -3823,19 +5652,6 @@ def server(input, output, session):
 
         # Determine title based on what's being shown
         if viz_type:
-            # Get title from VIZ_CONFIG
-            VIZ_TITLES = {
-                "key_passes": "Key Passes", "assists": "Assists", "all_carries": "Carries",
-                "carries": "Carries", "clearances": "Clearances", "tackles": "Tackles",
-                "interceptions": "Interceptions", "recoveries": "Ball Recoveries", "goals": "Goals",
-                "all_shots": "All Shots", "shots_on_target": "Shots on Target",
-                "all_defensive": "Defensive Actions", "all_passes": "All Passes",
-                "progressive_passes": "Progressive Passes", "final_third_passes": "Final Third Passes",
-                "deep_passes": "Deep Passes", "final_third_carries": "Final Third Carries",
-                "deep_carries": "Deep Carries", "progressive_carries": "Progressive Carries",
-                "all_receptions": "Receptions", "final_third_receptions": "Final Third Receptions",
-                "deep_receptions": "Deep Receptions"
-            }
             map_title = VIZ_TITLES.get(viz_type, viz_type.replace("_", " ").title())
         else:
             loc_label = "End Location" if loc_toggle == "end" else "Start Location"
@@ -3856,265 +5672,37 @@ def server(input, output, session):
         is_defiance = input.team_select() == "defiance"
         accent_color = DEFIANCE_BLUE if is_defiance else ACCENT_GREEN
 
-        # Create figure with header, pitch, and stats below
-        # No headshot image - just the pitch with stats underneath
-        fig = plt.figure(figsize=(12, 9), facecolor='#0a0a0a')
-
-        # Header area - left aligned (no player image)
-        header_left = 0.05
-
-        # Player name and title - left aligned
-        fig.text(header_left, 0.96, f"{player['name']} - {map_title}", fontsize=18, fontweight='bold',
-                ha='left', color=accent_color)
-        fig.text(header_left, 0.93, game_context, fontsize=12, ha='left', color=TEXT_COLOR)
-
-        # Position and basic info
-        position = player.get('primary_general_position', player.get('position', 'N/A'))
-        age = player.get('age', 'N/A')
-        fig.text(header_left, 0.90, f"#{player.get('shirt_no', '-')} | {position} | Age {age}",
-                fontsize=10, ha='left', color=SUBTEXT_COLOR)
-
-        # Create pitch subplot - more space now without headshot, stats go below
-        ax = fig.add_axes([0.05, 0.18, 0.9, 0.70])
-        ax.set_facecolor('#000000')
-
-        P_WIDTH, P_HEIGHT = 120, 80
-
         # Get events for visualization
         use_destination = heatmap_type in ["Pass", "Carry"] and loc_toggle == "end"
 
+        # The export draws every event with a start point (no end-point filter)
         if viz_type:
-            # Use viz_type to filter events
-            VIZ_CONFIG_EXPORT = {
-                "key_passes": ("Pass", lambda e: e.get("is_keypass", False)),
-                "assists": ("Pass", lambda e: e.get("is_keypass", False)),
-                "all_carries": ("Carry", lambda e: True),
-                "carries": ("Carry", lambda e: True),
-                "all_passes": ("Pass", lambda e: True),
-                "progressive_passes": ("Pass", lambda e: e.get("is_progressive_pass", False)),
-                "final_third_passes": ("Pass", lambda e: e.get("is_final_third_pass", False)),
-                "deep_passes": ("Pass", lambda e: e.get("is_deep_pass", False)),
-                "final_third_carries": ("Carry", lambda e: e.get("is_final_third_carry", False)),
-                "deep_carries": ("Carry", lambda e: e.get("is_deep_carry", False)),
-                "progressive_carries": ("Carry", lambda e: e.get("is_progressive_carry", False)),
-            }
-            if viz_type in VIZ_CONFIG_EXPORT:
-                evt_type, evt_filter = VIZ_CONFIG_EXPORT[viz_type]
-                events = [e for e in events_data if e["player_id"] == player_id
-                         and e["type_display_name"] == evt_type and evt_filter(e)
-                         and e["x"] is not None and e["y"] is not None]
-            else:
-                # Handle other viz types (shots, defensive, receptions)
-                evt_map = {
-                    "goals": ["Goal"], "all_shots": ["Shot", "MissedShots", "SavedShot", "ShotOnPost", "Goal"],
-                    "shots_on_target": ["SavedShot", "Goal"],
-                    "all_defensive": ["Tackle", "Interception", "Clearance", "BallRecovery"],
-                    "tackles": ["Tackle"], "interceptions": ["Interception"],
-                    "clearances": ["Clearance"], "recoveries": ["BallRecovery"],
-                    "all_receptions": ["Reception"],
-                    "final_third_receptions": ["Reception"], "deep_receptions": ["Reception"]
-                }
-                evt_types = evt_map.get(viz_type, [viz_type])
-                events = [e for e in events_data if e["player_id"] == player_id
-                         and e["type_display_name"] in evt_types
-                         and e["x"] is not None and e["y"] is not None]
-                # Filter for zone-based receptions
-                if viz_type == "final_third_receptions":
-                    events = [e for e in events if e.get("x", 0) >= 66.67]
-                elif viz_type == "deep_receptions":
-                    events = [e for e in events if e.get("x", 0) >= 83.33]
+            selection = VIZ_EVENT_SELECTIONS.get(viz_type, ([viz_type], None, False))
         else:
-            # Use heatmap_type
-            evt_map = {"Pass": ["Pass"], "Carry": ["Carry"], "Reception": ["Reception"],
-                      "Shot": ["Shot", "MissedShots", "SavedShot", "ShotOnPost", "Goal"],
-                      "Defensive": ["Tackle", "Interception", "Clearance", "BallRecovery"],
-                      "Overview": ["Pass", "Carry", "Reception", "Shot", "MissedShots", "SavedShot", "ShotOnPost", "Goal", "Tackle", "Interception", "Clearance", "BallRecovery"]}
-            evt_types = evt_map.get(heatmap_type, [heatmap_type])
-            events = [e for e in events_data if e["player_id"] == player_id
-                     and e["type_display_name"] in evt_types
-                     and e["x"] is not None and e["y"] is not None]
-
-        # Apply game filter
-        if game_filter:
-            events = [e for e in events if str(e.get("match_id")) == str(game_filter)]
-
-        # Plot events - match the heatmap display logic
-        if events:
-            if use_destination:
-                xs = np.array([e["end_x"] * P_WIDTH / 100 for e in events if e.get("end_x") is not None])
-                ys = np.array([e["end_y"] * P_HEIGHT / 100 for e in events if e.get("end_y") is not None])
-            else:
-                xs = np.array([e["x"] * P_WIDTH / 100 for e in events])
-                ys = np.array([e["y"] * P_HEIGHT / 100 for e in events])
-
-            xs = np.clip(xs, 0.1, P_WIDTH - 0.1)
-            ys = np.clip(ys, 0.1, P_HEIGHT - 0.1)
-
-            if current_heatmap_mode == "kde" and len(xs) >= 3:
-                # KDE Heat Map mode - show density as color gradient
-                try:
-                    from scipy.stats import gaussian_kde
-                    from matplotlib.colors import LinearSegmentedColormap
-                    xy = np.vstack([xs, ys])
-                    kde = gaussian_kde(xy, bw_method=0.15)
-                    x_grid = np.linspace(0, P_WIDTH, 100)
-                    y_grid = np.linspace(0, P_HEIGHT, 70)
-                    X, Y = np.meshgrid(x_grid, y_grid)
-                    positions = np.vstack([X.ravel(), Y.ravel()])
-                    Z = kde(positions).reshape(X.shape)
-                    if is_defiance:
-                        # Blue colormap for Defiance
-                        colors = ['#000000', '#1a3d4d', '#2d5a6d', '#3d7a8d', '#4d9aad', '#5BC0EB']
-                    else:
-                        # Green colormap for Sounders
-                        colors = ['#000000', '#1a3d1a', '#2d5a2d', '#3d7a3d', '#5D9741', '#96D35F']
-                    cmap = LinearSegmentedColormap.from_list('team_heat', colors)
-                    ax.contourf(X, Y, Z, levels=20, cmap=cmap, alpha=0.8, zorder=1)
-                except Exception:
-                    ax.scatter(xs, ys, s=100, c=accent_color, alpha=0.7, edgecolors='white', linewidth=0.5, zorder=2)
-            else:
-                # Action mode - show individual dots with density-based alpha
-                n_bins_x, n_bins_y = 24, 16
-                H, _, _ = np.histogram2d(xs, ys, bins=[n_bins_x, n_bins_y], range=[[0, P_WIDTH], [0, P_HEIGHT]])
-                max_count = H.max() if H.max() > 0 else 1
-
-                is_shots_heatmap = heatmap_type == "Shot"
-                can_draw_trajectories = draw_trajectories
-
-                for e in events:
-                    if use_destination:
-                        ex = e["end_x"] * P_WIDTH / 100 if e.get("end_x") else 0
-                        ey = e["end_y"] * P_HEIGHT / 100 if e.get("end_y") else 0
-                    else:
-                        ex = e["x"] * P_WIDTH / 100
-                        ey = e["y"] * P_HEIGHT / 100
-                    ex = np.clip(ex, 0.1, P_WIDTH - 0.1)
-                    ey = np.clip(ey, 0.1, P_HEIGHT - 0.1)
-
-                    bin_x = min(int(ex / P_WIDTH * n_bins_x), n_bins_x - 1)
-                    bin_y = min(int(ey / P_HEIGHT * n_bins_y), n_bins_y - 1)
-                    density = H[bin_x, bin_y]
-                    alpha = 0.15 + 0.75 * (density / max_count) ** 0.5
-
-                    # Check if this is an unsuccessful outcome
-                    is_unsuccessful = e.get("outcome_type_display_name") == "Unsuccessful"
-                    # Use grey for unsuccessful, accent color for successful
-                    comet_color = '#666666' if is_unsuccessful else accent_color
-
-                    # Draw trajectory comets if enabled
-                    if can_draw_trajectories and e.get("x") is not None and e.get("end_x") is not None:
-                        start_x = e["x"] * P_WIDTH / 100
-                        start_y = e["y"] * P_HEIGHT / 100
-                        end_x = e["end_x"] * P_WIDTH / 100
-                        end_y = e["end_y"] * P_HEIGHT / 100
-                        n_segments = 10
-                        for seg in range(n_segments):
-                            t0, t1 = seg / n_segments, (seg + 1) / n_segments
-                            x0 = start_x + t0 * (end_x - start_x)
-                            y0 = start_y + t0 * (end_y - start_y)
-                            x1 = start_x + t1 * (end_x - start_x)
-                            y1 = start_y + t1 * (end_y - start_y)
-                            lw_seg = 0.5 + 3.5 * t1
-                            alpha_seg = 0.1 + 0.3 * t1
-                            ax.plot([x0, x1], [y0, y1], color=comet_color, lw=lw_seg, alpha=alpha_seg, zorder=1)
-
-                    # Goals shown as stars
-                    if is_shots_heatmap and e.get("type_display_name") == "Goal":
-                        ax.scatter(ex, ey, s=220, c=accent_color, marker='*', edgecolors='white', linewidth=1.5, zorder=3)
-                    elif is_unsuccessful:
-                        # Unsuccessful outcomes: grey
-                        ax.scatter(ex, ey, s=100, c='#666666', alpha=0.7, edgecolors='none', zorder=2)
-                    else:
-                        ax.scatter(ex, ey, s=100, c=accent_color, alpha=alpha, edgecolors='none', zorder=2)
-
-        # Draw pitch lines
-        lw = 2
-        line_col = "#ffffff"
-        rect = plt.Rectangle((0, 0), P_WIDTH, P_HEIGHT, fill=False, edgecolor=line_col, linewidth=lw, zorder=10)
-        ax.add_patch(rect)
-        ax.plot([P_WIDTH/2, P_WIDTH/2], [0, P_HEIGHT], color=line_col, lw=lw, zorder=10)
-        circle = plt.Circle((P_WIDTH/2, P_HEIGHT/2), 10, fill=False, color=line_col, lw=lw, zorder=10)
-        ax.add_patch(circle)
-        ax.scatter(P_WIDTH/2, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-
-        # Penalty areas
-        box_depth, box_height = 18, 44
-        box_top = (P_HEIGHT - box_height) / 2
-        ax.plot([0, box_depth, box_depth, 0], [box_top, box_top, box_top + box_height, box_top + box_height],
-               color=line_col, lw=lw, zorder=10)
-        ax.plot([P_WIDTH, P_WIDTH - box_depth, P_WIDTH - box_depth, P_WIDTH],
-               [box_top, box_top, box_top + box_height, box_top + box_height], color=line_col, lw=lw, zorder=10)
-
-        # 6-yard boxes
-        six_depth, six_height = 6, 20
-        six_top = (P_HEIGHT - six_height) / 2
-        ax.plot([0, six_depth, six_depth, 0], [six_top, six_top, six_top + six_height, six_top + six_height],
-               color=line_col, lw=lw, zorder=10)
-        ax.plot([P_WIDTH, P_WIDTH - six_depth, P_WIDTH - six_depth, P_WIDTH],
-               [six_top, six_top, six_top + six_height, six_top + six_height], color=line_col, lw=lw, zorder=10)
-
-        ax.scatter(12, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-        ax.scatter(P_WIDTH - 12, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-
-        ax.set_xlim(-1, P_WIDTH + 1)
-        ax.set_ylim(-1, P_HEIGHT + 1)
-        ax.set_aspect('equal')
-        ax.axis('off')
+            selection = HEATMAP_EVENT_SELECTIONS.get(heatmap_type, ([heatmap_type], None, False))
+        events = select_view_events(season, player_id, selection, game_filter or None)
 
         # Get stats for this player (game-specific or season)
-        stats_player = player.copy()
-        if game_filter:
-            game_stats = get_game_stats(player_id, game_filter)
-            if game_stats:
-                stats_player = {**player, **game_stats}
-
-        # Build stats line based on heatmap type
-        if heatmap_type == "Pass" or (viz_type and "pass" in viz_type.lower()):
-            total_p = stats_player.get("total_passes", 0) or 0
-            succ_p = stats_player.get("passes", 0) or 0
-            pass_pct = round((succ_p / total_p * 100) if total_p > 0 else 0, 1)
-            stats_text = f"Passes: {total_p} ({pass_pct}%) | Key Passes: {stats_player.get('key_passes', 0)} | Prog: {stats_player.get('progressive_passes', 0)}"
-        elif heatmap_type == "Carry" or (viz_type and "carr" in viz_type.lower()):
-            stats_text = f"Carries: {stats_player.get('carries', 0)} | Final 3rd: {stats_player.get('final_third_carries', 0)} | Progressive: {stats_player.get('progressive_carries', 0)}"
-        elif heatmap_type == "Shot" or (viz_type and "shot" in viz_type.lower()) or (viz_type and "goal" in viz_type.lower()):
-            shots = stats_player.get("shots", 0) or 0
-            goals = stats_player.get("goals", 0) or 0
-            stats_text = f"Shots: {shots} | Goals: {goals} | SOT: {stats_player.get('shots_on_target', 0)}"
-        elif heatmap_type == "Defensive" or (viz_type and "defen" in viz_type.lower()) or (viz_type and "tackle" in viz_type.lower()) or (viz_type and "intercept" in viz_type.lower()):
-            stats_text = f"Tackles: {stats_player.get('tackles', 0)} | Interceptions: {stats_player.get('interceptions', 0)} | Recoveries: {stats_player.get('ball_recoveries', 0)}"
-        elif heatmap_type == "Reception" or (viz_type and "recep" in viz_type.lower()):
-            stats_text = f"Receptions: {stats_player.get('receptions', 0)} | Final 3rd: {stats_player.get('final_third_receptions', 0)} | Deep: {stats_player.get('deep_receptions', 0)}"
-        else:
-            stats_text = f"Mins: {stats_player.get('mins', 0)} | Goals: {stats_player.get('goals', 0)} | Assists: {stats_player.get('assists', 0)}"
-
-        # Event count and detailed stats - below the pitch
-        fig.text(header_left, 0.12, f"{len(events)} events", fontsize=11, ha='left', color=TEXT_COLOR, fontweight='bold')
-        fig.text(header_left, 0.08, stats_text, fontsize=10, ha='left', color=SUBTEXT_COLOR)
-
-        # Footer - left aligned
-        fig.text(header_left, 0.02, "Data from Opta | Powered by Sunday League Stats", fontsize=8, ha='left', color='#666')
+        stats_player = selected_player_stats()
+        # The export keeps events without end coordinates (needs_end False)
+        kde_key = ("export", SEASON_VERSIONS[season], player_id, viz_type or heatmap_type, game_filter,
+                   use_destination, False)
 
-        # Save to buffer
-        buf = BytesIO()
-        fig.savefig(buf, format='png', dpi=150, bbox_inches='tight', facecolor=fig.get_facecolor(), edgecolor='none')
-        buf.seek(0)
-        plt.close(fig)
-        yield buf.getvalue()
+        png_data = await run_render_async(None, render_export_png, player, map_title, game_context, events,
+                                          heatmap_type, viz_type, use_destination, current_heatmap_mode,
+                                          draw_trajectories, accent_color, is_defiance, stats_player, kde_key)
+        yield png_data
 
 
-    @output
-    @render.ui
-    def heatmap_display():
-        """Display heat map for selected player, or trajectory viz if stat is clicked."""
+    def heatmap_job_for(heatmap_type, viz_type, loc_toggle, current_heatmap_mode):
+        """Resolve one heatmap view to ready UI or a RenderJob for the render executor."""
         name = selected_player.get()
-        heatmap_type = input.heatmap_type()
-        viz_type = stat_visualization.get()
         game_filter = selected_game.get()
 
         if not name:
             return ui.p("Select a player")
 
-        player = get_player_data(name, get_season_player_lookup())
+        player = selected_player_record()
         if not player:
             return ui.p("No event data available")
 
@@ -4122,11 +5710,6 @@ def server(input, output, session):
         if not player_id:
             return ui.p("Player ID not found")
 
-        events_data = get_season_events_data()
-
-        # Get location toggle and current mode
-        loc_toggle = location_toggle.get()
-        current_heatmap_mode = heatmap_mode.get()
         draw_trajectories = current_heatmap_mode == "trajectory"
 
         # Determine accent color based on team selection
@@ -4134,92 +5717,20 @@ def server(input, output, session):
         accent_color = DEFIANCE_BLUE if is_defiance else ACCENT_GREEN
 
         # If viz_type is set (stat clicked), use trajectory mode only if mode is "trajectory"
-        if viz_type and current_heatmap_mode == "trajectory":
-            return render_trajectory_viz(player_id, viz_type, game_filter, accent_color=accent_color)
-
-        # Determine event type and whether to use origin or destination coordinates
-        use_destination = False
-        needs_end_coords = False  # For trajectory drawing
+        if viz_type and current_heatmap_mode == "trajectory" and not CLIENT_SIDE_RENDERING:
+            return trajectory_job(player_id, viz_type, game_filter, accent_color=accent_color)
 
-        # If viz_type is set, filter based on that instead of heatmap_type
+        # Events and coordinates to use: drill-downs (viz_type) and Pass/Carry maps draw
+        # start-to-end, so they need end points; Pass/Carry can map the end point instead
         if viz_type:
-            # Use the VIZ_CONFIG to determine filtering
-            VIZ_CONFIG_FILTER = {
-                "key_passes": {"event_type": ["Pass"], "filter": lambda e: e.get("is_keypass", False), "needs_end": True},
-                "assists": {"event_type": ["Pass"], "filter": lambda e: e.get("is_keypass", False), "needs_end": True},
-                "all_carries": {"event_type": ["Carry"], "filter": lambda e: True, "needs_end": True},
-                "carries": {"event_type": ["Carry"], "filter": lambda e: True, "needs_end": True},
-                "all_passes": {"event_type": ["Pass"], "filter": lambda e: True, "needs_end": True},
-                "progressive_passes": {"event_type": ["Pass"], "filter": lambda e: e.get("is_progressive_pass", False), "needs_end": True},
-                "final_third_passes": {"event_type": ["Pass"], "filter": lambda e: e.get("is_final_third_pass", False), "needs_end": True},
-                "deep_passes": {"event_type": ["Pass"], "filter": lambda e: e.get("is_deep_pass", False), "needs_end": True},
-                "final_third_carries": {"event_type": ["Carry"], "filter": lambda e: e.get("is_final_third_carry", False), "needs_end": True},
-                "deep_carries": {"event_type": ["Carry"], "filter": lambda e: e.get("is_deep_carry", False), "needs_end": True},
-                "progressive_carries": {"event_type": ["Carry"], "filter": lambda e: e.get("is_progressive_carry", False), "needs_end": True},
-                "goals": {"event_type": ["Goal"], "filter": lambda e: True, "needs_end": False},
-                "all_shots": {"event_type": ["Shot", "MissedShots", "SavedShot", "ShotOnPost", "Goal"], "filter": lambda e: True, "needs_end": False},
-                "shots_on_target": {"event_type": ["SavedShot", "Goal"], "filter": lambda e: True, "needs_end": False},
-                "all_defensive": {"event_type": ["Tackle", "Interception", "Clearance", "BallRecovery"], "filter": lambda e: True, "needs_end": False},
-                "tackles": {"event_type": ["Tackle"], "filter": lambda e: True, "needs_end": False},
-                "interceptions": {"event_type": ["Interception"], "filter": lambda e: True, "needs_end": False},
-                "clearances": {"event_type": ["Clearance"], "filter": lambda e: True, "needs_end": False},
-                "recoveries": {"event_type": ["BallRecovery"], "filter": lambda e: True, "needs_end": False},
-                "all_receptions": {"event_type": ["Reception"], "filter": lambda e: True, "needs_end": False},
-                "final_third_receptions": {"event_type": ["Reception"], "filter": lambda e: e.get("x", 0) >= 66.67, "needs_end": False},
-                "deep_receptions": {"event_type": ["Reception"], "filter": lambda e: e.get("x", 0) >= 83.33, "needs_end": False},
-            }
-            config = VIZ_CONFIG_FILTER.get(viz_type, {"event_type": [], "filter": lambda e: True, "needs_end": False})
-            event_types = config["event_type"]
-            event_filter = config["filter"]
-            needs_end_coords = config["needs_end"]
-        elif heatmap_type == "Overview":
-            # Show all touch events for overview
-            event_types = ["Pass", "Carry", "Reception", "Shot", "MissedShots", "SavedShot", "ShotOnPost", "Goal", "Tackle", "Interception", "Clearance", "BallRecovery"]
-            event_filter = lambda e: True
-        elif heatmap_type == "Defensive":
-            event_types = ["Tackle", "Interception", "Clearance", "BallRecovery"]
-            event_filter = lambda e: True
-        elif heatmap_type == "Shot":
-            event_types = ["Shot", "MissedShots", "SavedShot", "ShotOnPost", "Goal"]
-            event_filter = lambda e: True
-        elif heatmap_type == "Pass":
-            event_types = ["Pass"]
-            use_destination = (loc_toggle == "end")
-            needs_end_coords = True
-            event_filter = lambda e: True
-        elif heatmap_type == "Carry":
-            event_types = ["Carry"]
-            use_destination = (loc_toggle == "end")
-            needs_end_coords = True
-            event_filter = lambda e: True
-        elif heatmap_type == "Reception":
-            event_types = ["Reception"]
-            event_filter = lambda e: True
-        else:
-            event_types = [heatmap_type]
-            event_filter = lambda e: True
-
-        # Filter events - for destination, also require end_x/end_y
-        if use_destination:
-            events = [e for e in events_data
-                      if e["player_id"] == player_id
-                      and e["type_display_name"] in event_types
-                      and event_filter(e)
-                      and e["end_x"] is not None and e["end_y"] is not None]
+            selection = VIZ_EVENT_SELECTIONS.get(viz_type, ([], None, False))
+            use_destination = False
         else:
-            events = [e for e in events_data
-                      if e["player_id"] == player_id
-                      and e["type_display_name"] in event_types
-                      and event_filter(e)
-                      and e["x"] is not None and e["y"] is not None]
-
-        # For needs_end_coords, also filter to ensure we have end coordinates
-        if needs_end_coords and not use_destination:
-            events = [e for e in events if e.get("end_x") is not None and e.get("end_y") is not None]
-
-        # Apply game filter if specified
-        if game_filter:
-            events = [e for e in events if str(e.get("match_id")) == str(game_filter)]
+            selection = HEATMAP_EVENT_SELECTIONS.get(heatmap_type, ([heatmap_type], None, False))
+            use_destination = selection[2] and loc_toggle == "end"
+        needs_end_coords = selection[2]
+        events = select_view_events(get_current_season(), player_id, selection, game_filter or None,
+                                    require_start=not use_destination, require_end=needs_end_coords)
 
         # Determine the label for error message
         display_label = viz_type.replace("_", " ").title() if viz_type else heatmap_type.lower()
@@ -4228,184 +5739,76 @@ def server(input, output, session):
             filter_msg = " for this game" if game_filter else ""
             return ui.p(f"No {display_label} data available{filter_msg}", style=f"color: {SUBTEXT_COLOR};")
 
-        # Create HORIZONTAL heatmap: 120 width x 80 height
-        # Black background with white lines
-        HEATMAP_BG = "#000000"
-        fig, ax = plt.subplots(figsize=(10, 7), facecolor=HEATMAP_BG)
-        ax.set_facecolor(HEATMAP_BG)
-
-        # Pitch dimensions for horizontal view
-        P_WIDTH = 120   # x-axis (length of pitch, attacking right)
-        P_HEIGHT = 80   # y-axis (width of pitch)
-
-        # Scale coordinates from 0-100 to horizontal pitch
-        # Use end_x/end_y for destination, x/y for origin
-        if use_destination:
-            xs = np.array([e["end_x"] * P_WIDTH / 100 for e in events])
-            ys = np.array([e["end_y"] * P_HEIGHT / 100 for e in events])
-        else:
-            xs = np.array([e["x"] * P_WIDTH / 100 for e in events])
-            ys = np.array([e["y"] * P_HEIGHT / 100 for e in events])
-
-        # Clip to pitch bounds
-        xs = np.clip(xs, 0.1, P_WIDTH - 0.1)
-        ys = np.clip(ys, 0.1, P_HEIGHT - 0.1)
-
-        if current_heatmap_mode == "kde" and len(xs) >= 3:
-            # KDE Heat Map mode - show density as color gradient
-            try:
-                # Create KDE
-                xy = np.vstack([xs, ys])
-                kde = gaussian_kde(xy, bw_method=0.15)
-
-                # Create grid for KDE evaluation
-                x_grid = np.linspace(0, P_WIDTH, 100)
-                y_grid = np.linspace(0, P_HEIGHT, 70)
-                X, Y = np.meshgrid(x_grid, y_grid)
-                positions = np.vstack([X.ravel(), Y.ravel()])
-                Z = kde(positions).reshape(X.shape)
-
-                # Plot KDE as filled contours with team-specific color map
-                from matplotlib.colors import LinearSegmentedColormap
-                if is_defiance:
-                    # Blue colormap for Defiance
-                    colors = ['#000000', '#1a3d4d', '#2d5a6d', '#3d7a8d', '#4d9aad', '#5BC0EB']
-                else:
-                    # Green colormap for Sounders
-                    colors = ['#000000', '#1a3d1a', '#2d5a2d', '#3d7a3d', '#5D9741', '#96D35F']
-                cmap = LinearSegmentedColormap.from_list('team_heat', colors)
-                ax.contourf(X, Y, Z, levels=20, cmap=cmap, alpha=0.8, zorder=1)
-            except Exception:
-                # Fall back to action mode if KDE fails
-                pass
+        if CLIENT_SIDE_RENDERING:
+            return event_canvas(events, heatmap_type, viz_type, loc_toggle, current_heatmap_mode,
+                                accent_color, is_defiance=is_defiance,
+                                title=display_label, needs_end=needs_end_coords)
+
+        render_key = ("heatmap", SEASON_VERSIONS[get_current_season()], player_id, heatmap_type, viz_type,
+                      game_filter, loc_toggle, current_heatmap_mode, is_defiance)
+        cached_html = RENDER_CACHE.get(render_key)
+        if cached_html is not None:
+            return ui.HTML(cached_html)
+
+        kde_key = ("heatmap", SEASON_VERSIONS[get_current_season()], player_id, viz_type or heatmap_type,
+                   game_filter, use_destination, needs_end_coords)
+        return RenderJob(render_key, render_heatmap_html,
+                         (events, heatmap_type, use_destination, current_heatmap_mode,
+                          draw_trajectories, accent_color, is_defiance, kde_key))
+
+    @reactive.calc
+    def heatmap_job():
+        """The heatmap view for the current controls."""
+        heatmap_type, viz_type = view_controls()
+        # In client-side mode the browser applies the location/mode toggles
+        # itself, so don't re-render when they change.
+        if CLIENT_SIDE_RENDERING:
+            with reactive.isolate():
+                loc_toggle, current_heatmap_mode = map_toggles()
         else:
-            # Action mode - show individual dots
-            # Create grid-based density for alpha values
-            n_bins_x = 24
-            n_bins_y = 16
-            H, xedges, yedges = np.histogram2d(xs, ys, bins=[n_bins_x, n_bins_y],
-                                                range=[[0, P_WIDTH], [0, P_HEIGHT]])
-
-            # For each event, find its bin and calculate alpha based on density
-            max_count = H.max() if H.max() > 0 else 1
-
-            # Draw circles for each event with alpha based on local density
-            # For shots heatmap, show goals as soccer balls
-            is_shots_heatmap = heatmap_type == "Shot"
-            can_draw_trajectories = draw_trajectories
-
-            for e in events:
-                if use_destination:
-                    ex = e["end_x"] * P_WIDTH / 100
-                    ey = e["end_y"] * P_HEIGHT / 100
-                else:
-                    ex = e["x"] * P_WIDTH / 100
-                    ey = e["y"] * P_HEIGHT / 100
-                ex = np.clip(ex, 0.1, P_WIDTH - 0.1)
-                ey = np.clip(ey, 0.1, P_HEIGHT - 0.1)
-
-                # Find which bin this point falls into
-                bin_x = min(int(ex / P_WIDTH * n_bins_x), n_bins_x - 1)
-                bin_y = min(int(ey / P_HEIGHT * n_bins_y), n_bins_y - 1)
-
-                # Alpha based on density in this bin (0.15 to 0.9)
-                density = H[bin_x, bin_y]
-                alpha = 0.15 + 0.75 * (density / max_count) ** 0.5
-
-                # Check if this is an unsuccessful outcome
-                is_unsuccessful = e.get("outcome_type_display_name") == "Unsuccessful"
-                # Use grey for unsuccessful, accent color for successful
-                comet_color = '#666666' if is_unsuccessful else accent_color
-
-                # Draw trajectory comets if enabled (for Pass/Carry)
-                # Comet effect: line gets thicker from origin to endpoint
-                if can_draw_trajectories and e.get("x") is not None and e.get("end_x") is not None:
-                    start_x = e["x"] * P_WIDTH / 100
-                    start_y = e["y"] * P_HEIGHT / 100
-                    end_x = e["end_x"] * P_WIDTH / 100
-                    end_y = e["end_y"] * P_HEIGHT / 100
-                    # Draw comet with 10 segments, increasing linewidth
-                    n_segments = 10
-                    for seg in range(n_segments):
-                        t0 = seg / n_segments
-                        t1 = (seg + 1) / n_segments
-                        x0 = start_x + t0 * (end_x - start_x)
-                        y0 = start_y + t0 * (end_y - start_y)
-                        x1 = start_x + t1 * (end_x - start_x)
-                        y1 = start_y + t1 * (end_y - start_y)
-                        # Linewidth grows from 0.5 to 4, alpha grows from 0.1 to 0.4
-                        lw_seg = 0.5 + 3.5 * t1
-                        alpha_seg = 0.1 + 0.3 * t1
-                        ax.plot([x0, x1], [y0, y1], color=comet_color, lw=lw_seg, alpha=alpha_seg, zorder=1)
-
-                # Check if this is a goal - show star with white outline
-                if is_shots_heatmap and e.get("type_display_name") == "Goal":
-                    ax.scatter(ex, ey, s=220, c=accent_color, marker='*', edgecolors='white', linewidth=1.5, zorder=3)
-                elif is_unsuccessful:
-                    # Unsuccessful outcomes: grey
-                    ax.scatter(ex, ey, s=100, c='#666666', alpha=0.7, edgecolors='none', zorder=2)
-                else:
-                    ax.scatter(ex, ey, s=100, c=accent_color, alpha=alpha, edgecolors='none', zorder=2)
-
-        # Draw pitch lines ON TOP of heatmap
-        lw = 2
-        line_col = "#ffffff"  # White lines
-
-        # Outer boundary - draw as rectangle to ensure all sides visible
-        rect = plt.Rectangle((0, 0), P_WIDTH, P_HEIGHT, fill=False,
-                              edgecolor=line_col, linewidth=lw, zorder=10)
-        ax.add_patch(rect)
-
-        # Center line (vertical)
-        ax.plot([P_WIDTH/2, P_WIDTH/2], [0, P_HEIGHT], color=line_col, lw=lw, zorder=10)
-
-        # Center circle
-        circle = plt.Circle((P_WIDTH/2, P_HEIGHT/2), 10, fill=False, color=line_col, lw=lw, zorder=10)
-        ax.add_patch(circle)
-        ax.scatter(P_WIDTH/2, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-
-        # Penalty areas (18 yards deep, 44 yards wide)
-        box_depth = 18
-        box_height = 44
-        box_top = (P_HEIGHT - box_height) / 2
-
-        # Left penalty area
-        ax.plot([0, box_depth, box_depth, 0],
-                [box_top, box_top, box_top + box_height, box_top + box_height],
-                color=line_col, lw=lw, zorder=10)
-
-        # Right penalty area
-        ax.plot([P_WIDTH, P_WIDTH - box_depth, P_WIDTH - box_depth, P_WIDTH],
-                [box_top, box_top, box_top + box_height, box_top + box_height],
-                color=line_col, lw=lw, zorder=10)
-
-        # 6-yard boxes
-        six_depth = 6
-        six_height = 20
-        six_top = (P_HEIGHT - six_height) / 2
-
-        ax.plot([0, six_depth, six_depth, 0],
-                [six_top, six_top, six_top + six_height, six_top + six_height],
-                color=line_col, lw=lw, zorder=10)
-        ax.plot([P_WIDTH, P_WIDTH - six_depth, P_WIDTH - six_depth, P_WIDTH],
-                [six_top, six_top, six_top + six_height, six_top + six_height],
-                color=line_col, lw=lw, zorder=10)
-
-        # Penalty spots
-        ax.scatter(12, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-        ax.scatter(P_WIDTH - 12, P_HEIGHT/2, s=25, color=line_col, zorder=10)
-
-        # Set limits with small padding to show full boundary
-        ax.set_xlim(-1, P_WIDTH + 1)
-        ax.set_ylim(-1, P_HEIGHT + 1)
-        ax.set_aspect('equal')
-        ax.axis('off')
+            loc_toggle, current_heatmap_mode = map_toggles()
+        return heatmap_job_for(heatmap_type, viz_type, loc_toggle, current_heatmap_mode)
+
+    # Bumped whenever the visible heatmap changes, so queued prefetches can tell
+    # they are no longer for the view on screen
+    heatmap_generation = [0]
+
+    @reactive.extended_task
+    async def heatmap_task(render_key, fn, args):
+        return await run_render_async(render_key, fn, *args)
+
+    @reactive.effect(priority=1)
+    def _start_heatmap_render():
+        """Hand heavy heatmap renders to the render executor, dropping any stale one."""
+        job = heatmap_job()
+        heatmap_generation[0] += 1
+        heatmap_task.cancel()
+        if isinstance(job, RenderJob):
+            heatmap_task.invoke(*job)
 
-        ax.set_title(f"{len(events)} events", color=SUBTEXT_COLOR, fontsize=10, pad=5)
-
-        img_data = fig_to_base64(fig, dpi=100)
+    @reactive.effect
+    def _prefetch_next_views():
+        """Once the current heatmap is on screen, pre-render the views likely to be clicked next."""
+        if not PREFETCH_ENABLED:
+            return
+        job = heatmap_job()
+        if isinstance(job, RenderJob) and heatmap_task.status() != "success":
+            return  # Wait until the view on screen has finished rendering
+        with reactive.isolate():
+            generation = heatmap_generation[0]
+            views = likely_next_views(*view_controls(), *map_toggles())
+            jobs = [j for j in (heatmap_job_for(*view) for view in views) if isinstance(j, RenderJob)]
+        prefetch_renders(jobs, lambda: heatmap_generation[0] == generation)
 
-        return ui.HTML(f'<img src="data:image/png;base64,{img_data}" style="width: 100%; display: block; margin: 0 auto;">')
+    @output
+    @render.ui
+    def heatmap_display():
+        """Display heat map for selected player, or trajectory viz if stat is clicked."""
+        job = heatmap_job()
+        if not isinstance(job, RenderJob):
+            return job
+        return ui.HTML(heatmap_task.result())
 
 
-app = App(app_ui, server)
+app = App(app_ui, server,
+          static_assets={f"/{PHOTO_URL_PREFIX}": PHOTO_CACHE_DIR} if PHOTO_CACHE_ENABLED else None)
@@ -0,0 +1,149 @@
+"""
+Local cache for American Soccer Analysis (ASA) API pulls.
+
+League-wide responses (salaries per season, the all-time player table) are
+stored under data/asa_cache as columnar files and reused until they are older
+than their TTL. Team-level views are filtered from the cached tables, so an ETL
+run only downloads a league table when its cache has expired.
+
+Set ASA_CACHE_REFRESH=1 to ignore cached tables for a run.
+"""
+
+import os
+import threading
+import time
+from importlib.util import find_spec
+import pandas as pd
+
+# ========== CONFIGURATION ==========
+ASA_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "asa_cache")
+ASA_CACHE_TTL_HOURS = {
+    "salaries": float(os.environ.get("ASA_SALARY_TTL_HOURS", "24")),
+    "players": float(os.environ.get("ASA_PLAYERS_TTL_HOURS", "168")),  # Changes slowly
+}
+ASA_CACHE_REFRESH = os.environ.get("ASA_CACHE_REFRESH", "0") == "1"
+
+# Parquet when an engine is installed, pickle otherwise (both keep dtypes)
+CACHE_FORMAT = "parquet" if find_spec("pyarrow") or find_spec("fastparquet") else "pkl"
+
+_client = None
+_client_lock = threading.Lock()
+_tables = {}             # name -> DataFrame loaded this run
+_table_locks = {}
+_table_locks_lock = threading.Lock()
+_team_views = {}         # (league, season, team_id) -> DataFrame
+
+
+def get_client():
+    """Shared ASA client (its constructor downloads the entity tables)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from itscalledsoccer.client import AmericanSoccerAnalysis
+            _client = AmericanSoccerAnalysis()
+        return _client
+
+
+# ========== DISK CACHE ==========
+
+def _cache_path(name: str) -> str:
+    return os.path.join(ASA_CACHE_DIR, f"{name}.{CACHE_FORMAT}")
+
+
+def _read(path: str) -> pd.DataFrame:
+    if CACHE_FORMAT == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _write(df: pd.DataFrame, path: str):
+    os.makedirs(ASA_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _age_hours(path: str) -> float:
+    return (time.time() - os.path.getmtime(path)) / 3600
+
+
+def cached_table(name: str, fetch, ttl_hours: float) -> pd.DataFrame:
+    """DataFrame for name from memory or disk, calling fetch() when the cache has expired.
+
+    If the download fails, an expired copy is used rather than nothing.
+    """
+    with _table_locks_lock:
+        lock = _table_locks.setdefault(name, threading.Lock())
+
+    with lock:
+        if name in _tables:
+            return _tables[name]
+
+        path = _cache_path(name)
+        cached = os.path.exists(path)
+        if cached and not ASA_CACHE_REFRESH and _age_hours(path) <= ttl_hours:
+            df = _read(path)
+            print(f"  ASA cache hit: {name} ({len(df)} rows, {_age_hours(path):.1f}h old)")
+        else:
+            try:
+                df = pd.DataFrame(fetch())
+            except Exception as e:
+                if not cached:
+                    raise
+                print(f"  Warning: ASA fetch for {name} failed ({e}); using expired cache")
+                df = _read(path)
+            else:
+                _write(df, path)
+                print(f"  ASA cache refreshed: {name} ({len(df)} rows)")
+
+        _tables[name] = df
+        return df
+
+
+# ========== LEAGUE TABLES ==========
+
+def league_salaries(season: int, league: str = "mls") -> pd.DataFrame:
+    """Every salary record in a league for a season."""
+    return cached_table(
+        f"salaries_{league}_{season}",
+        lambda: get_client().get_player_salaries(leagues=[league], season_name=str(season)),
+        ASA_CACHE_TTL_HOURS["salaries"],
+    )
+
+
+def league_players(league: str = "mls") -> pd.DataFrame:
+    """ASA's player table for a league (all seasons)."""
+    return cached_table(
+        f"players_{league}",
+        lambda: get_client().get_players(leagues=[league]),
+        ASA_CACHE_TTL_HOURS["players"],
+    )
+
+
+def team_salaries(season: int, team_id: str, league: str = "mls") -> pd.DataFrame:
+    """One row per player on a team for a season: player_name, base_salary,
+    guaranteed_compensation, primary_broad_position, primary_general_position."""
+    key = (league, season, team_id)
+    if key in _team_views:
+        return _team_views[key]
+
+    salaries = league_salaries(season, league)
+    team = salaries[salaries["team_id"] == team_id]
+
+    # Only the team's players are needed from the (large) player table
+    players = league_players(league)
+    players = players[players["player_id"].isin(team["player_id"])]
+    merged = team.merge(players, on="player_id", how="left")
+
+    # Deduplicate - take max salary per player
+    view = merged.groupby("player_name", as_index=False).agg({
+        "base_salary": "max",
+        "guaranteed_compensation": "max",
+        "primary_broad_position": "first",
+        "primary_general_position": "first",
+    })
+    _team_views[key] = view
+    return view
@@ -0,0 +1,200 @@
+"""
+Content-hash manifest for the exported JSON data files.
+
+Writers go through DataManifest.write(): the records are serialized exactly as
+before (json, indent=2), hashed, and only written - atomically - when the hash
+differs from the one recorded in data/manifest.json. Each file also keeps a hash
+per part (per player for players files, per match for events and matches files),
+so save() can emit data/changes.json listing which players and matches changed
+in which season. Downstream steps (percentiles, stat cubes, pre-rendered images)
+can rebuild only those.
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+# ========== CONFIGURATION ==========
+MANIFEST_NAME = "manifest.json"
+CHANGES_NAME = "changes.json"
+PART_KEYS = {"players": "player_id", "events": "match_id", "matches": "match_id"}
+
+
+def json_text(records) -> str:
+    """Serialized form of a data file (same bytes json.dump(..., indent=2) writes)."""
+    return json.dumps(records, indent=2)
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str) -> str | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return content_hash(f.read())
+
+
+def file_kind(path: str) -> str:
+    """File name without season suffix and extension ('players' for players_2024.json)."""
+    return re.sub(r"(_\d{4})?\.\w+$", "", os.path.basename(path))
+
+
+def file_season(path: str) -> str:
+    """Season from the file name suffix or a season directory, else 'current'."""
+    match = re.search(r"_(\d{4})\.\w+$", path) or re.search(r"(?:^|[\\/])(\d{4})[\\/]", path)
+    return match.group(1) if match else "current"
+
+
+def part_hashes(records: list, key: str) -> dict:
+    """Hash of each group of records sharing a key value (in file order)."""
+    groups = {}
+    for record in records:
+        groups.setdefault(str(record.get(key)), []).append(record)
+    return {k: content_hash(json.dumps(v, sort_keys=True)) for k, v in groups.items()}
+
+
+def atomic_write(path: str, content):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb" if isinstance(content, bytes) else "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_bytes_if_changed(path: str, data: bytes, previous_hash: str = None) -> dict:
+    """write_if_changed for a binary file (no parts)."""
+    digest = content_hash(data)
+    if previous_hash is None:
+        previous_hash = file_hash(path)
+    written = digest != previous_hash
+    if written:
+        atomic_write(path, data)
+    return {"sha256": digest, "written": written, "parts": None}
+
+
+def write_if_changed(path: str, records: list, previous_hash: str = None, need_parts: bool = False) -> dict:
+    """Write records to path unless the file already holds them.
+
+    Returns {"sha256", "written", "parts"}; parts (hashes per player/match) are
+    computed when the file is written or need_parts is set, else None.
+    """
+    text = json_text(records)
+    digest = content_hash(text)
+    if previous_hash is None:
+        previous_hash = file_hash(path)
+
+    written = digest != previous_hash
+    if written:
+        atomic_write(path, text)
+
+    key = PART_KEYS.get(file_kind(path))
+    parts = part_hashes(records, key) if key and (written or need_parts) else None
+    return {"sha256": digest, "written": written, "parts": parts}
+
+
+class DataManifest:
+    """Hashes of the data files under root, and the changes made to them this run."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.path = os.path.join(root, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        self.previous = {rel: dict(entry) for rel, entry in self.entries.items()}
+        self.touched = set()
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def entry(self, path: str) -> dict:
+        return self.entries.get(self._rel(path), {})
+
+    def known_hash(self, path: str) -> str | None:
+        """The recorded hash, if the file still has the size and mtime it was recorded
+        with (None makes write_if_changed hash the file, e.g. after a manual edit)."""
+        entry = self.entry(path)
+        if not entry or not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        if (stat.st_size, stat.st_mtime_ns) != (entry.get("size"), entry.get("mtime_ns")):
+            return None
+        return entry["sha256"]
+
+    def record(self, path: str, result: dict, season: str = None):
+        """Store the outcome of write_if_changed (e.g. one run in another process)."""
+        rel = self._rel(path)
+        entry = self.entries.get(rel, {})
+        stat = os.stat(path)
+        self.entries[rel] = {
+            "sha256": result["sha256"],
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "season": str(season or entry.get("season") or file_season(rel)),
+            "kind": file_kind(rel),
+            "parts": result["parts"] if result["parts"] is not None else entry.get("parts"),
+        }
+        self.touched.add(rel)
+
+    def write(self, path: str, records: list, season=None) -> bool:
+        """Write records if they differ from the file's recorded hash. Returns whether it wrote."""
+        entry = self.entry(path)
+        result = write_if_changed(path, records, self.known_hash(path), need_parts="parts" not in entry)
+        self.record(path, result, season)
+        return result["written"]
+
+    def write_bytes(self, path: str, data: bytes, season=None) -> bool:
+        """write() for a binary file, e.g. derived numpy columns."""
+        result = write_bytes_if_changed(path, data, self.known_hash(path))
+        self.record(path, result, season)
+        return result["written"]
+
+    def changes(self) -> dict:
+        """What changed since this manifest was loaded, per file and per season."""
+        files, seasons = {}, {}
+        for rel in sorted(self.touched):
+            old, new = self.previous.get(rel), self.entries[rel]
+            if old and old.get("sha256") == new["sha256"]:
+                continue
+            old_parts, new_parts = (old or {}).get("parts") or {}, new.get("parts") or {}
+            change = {
+                "season": new["season"],
+                "kind": new["kind"],
+                "key": PART_KEYS.get(new["kind"]),
+                "new_file": old is None,
+                "added": sorted(set(new_parts) - set(old_parts)),
+                "removed": sorted(set(old_parts) - set(new_parts)),
+                "changed": sorted(k for k in set(old_parts) & set(new_parts) if old_parts[k] != new_parts[k]),
+            }
+            files[rel] = change
+            if change["key"] is None:
+                continue
+
+            affected = seasons.setdefault(new["season"], {"players": set(), "matches": set()})
+            ids = change["added"] + change["removed"] + change["changed"]
+            affected["players" if change["key"] == "player_id" else "matches"].update(ids)
+
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "files": files,
+            "seasons": {s: {k: sorted(v) for k, v in a.items()} for s, a in sorted(seasons.items())},
+        }
+
+    def save(self) -> dict:
+        """Persist the manifest and write this run's change list. Returns the change list."""
+        changes = self.changes()
+        atomic_write(self.path, json.dumps(self.entries, indent=2, sort_keys=True))
+        atomic_write(os.path.join(self.root, CHANGES_NAME), json.dumps(changes, indent=2))
+
+        unchanged = len(self.touched) - len(changes["files"])
+        print(f"Data files changed: {len(changes['files'])}, unchanged: {unchanged} "
+              f"(change list in {CHANGES_NAME})")
+        for season, affected in changes["seasons"].items():
+            print(f"  {season}: {len(affected['players'])} players, {len(affected['matches'])} matches changed")
+        return changes
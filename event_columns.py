@@ -0,0 +1,219 @@
+"""
+Render-ready event data, derived once at export time.
+
+Events are sorted by (match, player, type), with matches most recent first and
+minute/second order kept within each group. Everything the app used to derive
+from raw events on every render is stored next to them as numpy columns:
+
+    event_columns{suffix}.npy  one row per event, aligned with events{suffix}.json:
+                               type code, pitch-unit coordinates, gplus, xg, flag bits
+    event_offsets{suffix}.npy  [start, stop) rows of each (match, player, type) group
+    event_index{suffix}.json   code tables (matches, players, types), flag bits, and the
+                               sha256 of the events file the rows belong to
+
+The .npy files are plain arrays, so the app memory-maps them (np.load(mmap_mode="r"))
+and both the game stats and the map views select events by type code and flag
+instead of deriving anything. export_data writes them with the events; run
+python event_columns.py to rebuild them for every events file already in data/.
+"""
+
+import glob
+import io
+import json
+import os
+import re
+import numpy as np
+
+from data_manifest import DataManifest, content_hash, json_text
+
+# ========== CONFIGURATION ==========
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+FORMAT_VERSION = 2
+
+# Horizontal pitch the app draws on; event x/y are Opta 0-100 units
+PITCH_LENGTH = 120
+PITCH_WIDTH = 80
+FINAL_THIRD_X = 66.67   # Receptions at or beyond this x are in the final third
+DEEP_X = 83.33          # ... and at or beyond this one, deep
+
+# Type codes (index = code, OTHER_TYPE for anything else) - same order as the app's payload codes
+EVENT_TYPES = [
+    "Pass", "Carry", "Reception", "Shot", "MissedShots", "SavedShot",
+    "ShotOnPost", "Goal", "Tackle", "Interception", "Clearance", "BallRecovery",
+]
+OTHER_TYPE = 255
+ON_TARGET_TYPES = ("SavedShot", "Goal")
+
+# Every flag is read by the app: the game stats and the map views' event selection
+FLAG_NAMES = [
+    "successful", "has_end",
+    "shot", "goal", "on_target",
+    "key_pass", "assist", "shot_assist",
+    "progressive_pass", "final_third_pass", "deep_pass",
+    "progressive_carry", "final_third_carry", "deep_carry",
+    "final_third_reception", "deep_reception",
+]
+FLAGS = {name: 1 << bit for bit, name in enumerate(FLAG_NAMES)}
+
+COLUMNS_DTYPE = np.dtype([
+    ("match", "<i4"), ("player", "<i4"), ("type", "u1"), ("flags", "<u4"),
+    ("x", "<f8"), ("y", "<f8"), ("end_x", "<f8"), ("end_y", "<f8"),   # Pitch units, NaN if missing
+    ("gplus", "<f8"), ("xg", "<f8"),
+])
+OFFSETS_DTYPE = np.dtype([
+    ("match", "<i4"), ("player", "<i4"), ("type", "u1"), ("start", "<i8"), ("stop", "<i8"),
+])
+
+TYPE_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+
+def match_order(events: list, matches: list = None) -> list:
+    """Match ids (as strings) in display order: as listed in matches (most recent
+    first), then any other matches the events mention."""
+    seen = {str(e.get("match_id")) for e in events}
+    ordered = [str(m["match_id"]) for m in matches or [] if str(m["match_id"]) in seen]
+    listed = set(ordered)
+    return ordered + sorted(seen - listed)
+
+
+def sort_events(events: list, matches: list = None):
+    """Events sorted by (match, player, type, minute, second). Returns (events, match ids, player ids)."""
+    match_ids = match_order(events, matches)
+    player_ids = sorted({str(e.get("player_id")) for e in events})
+    match_codes = {m: i for i, m in enumerate(match_ids)}
+    player_codes = {p: i for i, p in enumerate(player_ids)}
+
+    def key(e):
+        return (
+            match_codes[str(e.get("match_id"))],
+            player_codes[str(e.get("player_id"))],
+            TYPE_CODES.get(e.get("type_display_name"), OTHER_TYPE),
+            e.get("minute") if e.get("minute") is not None else -1,
+            e.get("second") if e.get("second") is not None else -1,
+        )
+    return sorted(events, key=key), match_ids, player_ids
+
+
+def _values(events: list, field: str) -> np.ndarray:
+    return np.array([e.get(field) for e in events], dtype="float64")  # None -> NaN
+
+
+def _flag(events: list, field: str) -> np.ndarray:
+    return np.array([bool(e.get(field)) for e in events], dtype=bool)
+
+
+def derive_columns(events: list, match_ids: list, player_ids: list):
+    """Column and offset arrays for events already in sort_events order."""
+    n = len(events)
+    columns = np.zeros(n, dtype=COLUMNS_DTYPE)
+    match_codes = {m: i for i, m in enumerate(match_ids)}
+    player_codes = {p: i for i, p in enumerate(player_ids)}
+    columns["match"] = [match_codes[str(e.get("match_id"))] for e in events]
+    columns["player"] = [player_codes[str(e.get("player_id"))] for e in events]
+    types = np.array([e.get("type_display_name") for e in events], dtype=object)
+    columns["type"] = [TYPE_CODES.get(t, OTHER_TYPE) for t in types]
+
+    x, y, end_x, end_y = (_values(events, f) for f in ("x", "y", "end_x", "end_y"))
+    columns["x"] = x * PITCH_LENGTH / 100
+    columns["y"] = y * PITCH_WIDTH / 100
+    columns["end_x"] = end_x * PITCH_LENGTH / 100
+    columns["end_y"] = end_y * PITCH_WIDTH / 100
+    columns["gplus"] = np.nan_to_num(_values(events, "gplus"))
+    columns["xg"] = np.nan_to_num(_values(events, "xg"))
+
+    outcome = np.array([e.get("outcome_type_display_name") for e in events], dtype=object)
+    is_pass, is_reception = types == "Pass", types == "Reception"
+    shot, blocked = _flag(events, "is_shot"), _flag(events, "is_blocked")
+    with np.errstate(invalid="ignore"):  # NaN x compares False
+        final_third_x, deep_x = x >= FINAL_THIRD_X, x >= DEEP_X
+    derived = {
+        "successful": outcome == "Successful",
+        "has_end": ~np.isnan(end_x) & ~np.isnan(end_y),
+        "shot": shot,
+        "goal": _flag(events, "is_goal"),
+        "on_target": shot & ~blocked & np.isin(types, ON_TARGET_TYPES),
+        "key_pass": _flag(events, "is_keypass"),
+        "assist": is_pass & _flag(events, "is_assist"),   # As the app's assists stat counts them
+        "shot_assist": _flag(events, "is_shotassist"),
+        "progressive_pass": _flag(events, "is_progressive_pass"),
+        "final_third_pass": _flag(events, "is_final_third_pass"),
+        "deep_pass": _flag(events, "is_deep_pass"),
+        "progressive_carry": _flag(events, "is_progressive_carry"),
+        "final_third_carry": _flag(events, "is_final_third_carry"),
+        "deep_carry": _flag(events, "is_deep_carry"),
+        "final_third_reception": is_reception & final_third_x,
+        "deep_reception": is_reception & deep_x,
+    }
+    flags = np.zeros(n, dtype="<u4")
+    for name, mask in derived.items():
+        flags[mask] |= FLAGS[name]
+    columns["flags"] = flags
+
+    # One offsets row per run of equal (match, player, type)
+    if n:
+        group = np.stack([columns["match"], columns["player"], columns["type"].astype("<i4")], axis=1)
+        starts = np.flatnonzero(np.r_[True, (group[1:] != group[:-1]).any(axis=1)])
+    else:
+        starts = np.zeros(0, dtype=int)
+    offsets = np.zeros(len(starts), dtype=OFFSETS_DTYPE)
+    for field in ("match", "player", "type"):
+        offsets[field] = columns[field][starts]
+    offsets["start"] = starts
+    offsets["stop"] = np.r_[starts[1:], n]
+    return columns, offsets
+
+
+def npy_bytes(array: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, array, allow_pickle=False)
+    return buf.getvalue()
+
+
+def save_event_data(manifest: DataManifest, data_dir: str, suffix: str, events: list,
+                    matches: list = None, season=None) -> list:
+    """Sort events, then write events{suffix}.json and its derived columns, offsets and
+    index through the manifest. Returns the sorted events."""
+    events, match_ids, player_ids = sort_events(events, matches)
+    columns, offsets = derive_columns(events, match_ids, player_ids)
+    index = {
+        "version": FORMAT_VERSION,
+        "events_sha256": content_hash(json_text(events)),
+        "count": len(events),
+        "pitch": [PITCH_LENGTH, PITCH_WIDTH],
+        "thresholds": {"final_third_x": FINAL_THIRD_X, "deep_x": DEEP_X},
+        "types": EVENT_TYPES,
+        "flags": FLAGS,
+        "matches": match_ids,
+        "players": player_ids,
+    }
+
+    manifest.write(os.path.join(data_dir, f"events{suffix}.json"), events, season)
+    manifest.write_bytes(os.path.join(data_dir, f"event_columns{suffix}.npy"), npy_bytes(columns), season)
+    manifest.write_bytes(os.path.join(data_dir, f"event_offsets{suffix}.npy"), npy_bytes(offsets), season)
+    manifest.write(os.path.join(data_dir, f"event_index{suffix}.json"), index, season)
+    return events
+
+
+def main():
+    """Rebuild the derived event data for every events*.json in DATA_DIR."""
+    manifest = DataManifest(DATA_DIR)
+    for events_path in sorted(glob.glob(os.path.join(DATA_DIR, "events*.json"))):
+        name = re.fullmatch(r"events(_\d{4})?\.json", os.path.basename(events_path))
+        if not name:
+            continue
+        suffix = name.group(1) or ""
+        with open(events_path) as f:
+            events = json.load(f)
+        matches_path = os.path.join(DATA_DIR, f"matches{suffix}.json")
+        matches = None
+        if os.path.exists(matches_path):
+            with open(matches_path) as f:
+                matches = json.load(f)
+
+        events = save_event_data(manifest, DATA_DIR, suffix, events, matches)
+        print(f"{os.path.basename(events_path)}: {len(events)} events derived")
+    manifest.save()
+
+
+if __name__ == "__main__":
+    main()
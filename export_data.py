@@ -1,13 +1,37 @@
 """
 Export Seattle Sounders data from Supabase to JSON files for Shinylive dashboard.
 Run this script to refresh the data: python export_data.py
+
+python export_data.py --league exports every team instead, with one query per
+table, into data/league/<season>/<team_id>/ (partitions written in parallel).
+
+Queries are extracted with Postgres COPY into typed columns (see bulk_extract),
+concurrently, each on its own connection from a small pool.
+Set EXTRACT_MODE=pandas to go through pd.read_sql instead, or EXPORT_SQLITE to
+the path of a SQLite copy of the tables to export from that.
+
+Files are only rewritten when their content changed (see data_manifest); the
+players/matches that changed are listed in data/changes.json. Events are saved
+sorted by match/player/type with render-ready columns for the app (see
+event_columns).
 """
 
-import json
 import os
-import psycopg2
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
 
+from bulk_extract import column_values, extract_frame, frame_records
+from data_manifest import DataManifest, write_if_changed
+from event_columns import save_event_data
+
 # Database configuration (same as your notebooks)
 DB_CONFIG = {
     "dbname": "postgres",
@@ -17,10 +41,96 @@ DB_CONFIG = {
     "port": 5432,
 }
 
+# "copy" (COPY / SQLite bulk fetch into typed columns) or "pandas" (pd.read_sql)
+EXTRACT_MODE = os.environ.get("EXTRACT_MODE", "copy")
+
+# Local SQLite stand-in for the database (same tables and columns)
+SQLITE_PATH = os.environ.get("EXPORT_SQLITE")
+
+# Connections for concurrent extraction (the league export runs four queries at once)
+POOL_SIZE = int(os.environ.get("EXPORT_POOL_SIZE", "4"))
+
 # Output directory
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# League-wide export
+LEAGUE_MODE = "--league" in sys.argv
+LEAGUE_DIR = os.path.join(DATA_DIR, "league")
+LEAGUE_WORKERS = min(8, os.cpu_count() or 1)   # Processes writing team partitions
+SEASON_PATTERN = r"_\((\d{4})\)$"             # player_id suffix, e.g. '313037_(2025)'
+
+
+class SQLitePool:
+    """getconn/putconn/closeall over SQLite connections, like psycopg2's ThreadedConnectionPool."""
+
+    def __init__(self, path, maxconn):
+        self.path = path
+        self.maxconn = maxconn
+        self.idle = []
+        self.opened = []
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+            if len(self.opened) >= self.maxconn:
+                raise RuntimeError(f"connection pool exhausted ({self.maxconn} connections)")
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.opened.append(conn)
+            return conn
+
+    def putconn(self, conn):
+        with self.lock:
+            self.idle.append(conn)
+
+    def closeall(self):
+        with self.lock:
+            for conn in self.opened:
+                conn.close()
+            self.opened, self.idle = [], []
+
+
+def connection_pool(size=POOL_SIZE):
+    """Pool of connections to the SQLite stand-in if EXPORT_SQLITE is set, else to Postgres."""
+    if SQLITE_PATH:
+        return SQLitePool(SQLITE_PATH, size)
+    from psycopg2.pool import ThreadedConnectionPool
+    return ThreadedConnectionPool(1, size, **DB_CONFIG)
+
+
+@contextmanager
+def pooled_connection(pool):
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+
+def extract_concurrently(pool, jobs):
+    """Run jobs ({name: (func, *args)}, func taking a connection first) at the same time,
+    each on its own pooled connection. Returns {name: result}; a failed job's error is raised."""
+    def run(name, func, *args):
+        start = time.time()
+        with pooled_connection(pool) as conn:
+            result = func(conn, *args)
+        rows = len(result) if result is not None else 0
+        print(f"  {name}: {rows} rows in {time.time() - start:.1f}s")
+        return result
+
+    with ThreadPoolExecutor(max_workers=min(POOL_SIZE, len(jobs)), thread_name_prefix="extract") as executor:
+        futures = {name: executor.submit(run, name, *job) for name, job in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def read_frame(conn, query):
+    """Query result as a DataFrame, via EXTRACT_MODE."""
+    if EXTRACT_MODE == "pandas":
+        return pd.read_sql(query, conn)
+    return extract_frame(conn, query)
+
 
 def get_sounders_team_id(conn):
     """Find Seattle Sounders team_id."""
@@ -29,19 +139,19 @@ def get_sounders_team_id(conn):
     FROM teams
     WHERE LOWER(name) LIKE '%seattle%' OR LOWER(name) LIKE '%sounders%'
     """
-    df = pd.read_sql(query, conn)
+    df = read_frame(conn, query)
     if df.empty:
         raise ValueError("Seattle Sounders not found in database")
     print(f"Found team: {df.iloc[0]['name']} (ID: {df.iloc[0]['team_id']})")
     return str(df.iloc[0]["team_id"])
 
 
-def export_players(conn, team_id):
-    """Export Sounders players with aggregated stats."""
-
-    # Get player info and stats
-    query = f"""
+def players_query(team_id=None):
+    """Player info and aggregated stats for one team, or every team when team_id is None."""
+    where = f"WHERE p.team_id = '{team_id}'" if team_id else ""
+    return f"""
     SELECT
+        p.team_id,
         p.player_id,
         p.name,
         p.age,
@@ -99,43 +209,44 @@ def export_players(conn, team_id):
         SUM(COALESCE(e.gplus_defending, 0)) as pv_defending
     FROM players p
     LEFT JOIN match_event e ON p.player_id = e.player_id
-    WHERE p.team_id = '{team_id}'
-    GROUP BY p.player_id, p.name, p.age, p.position, p.shirt_no,
+    {where}
+    GROUP BY p.team_id, p.player_id, p.name, p.age, p.position, p.shirt_no,
              p.nationality, p.base_salary, p.primary_broad_position,
              p.primary_general_position, p.image_url, p.mins, p.gp, p.gs
     ORDER BY p.name
     """
 
-    df = pd.read_sql(query, conn)
 
-    # Convert to list of dicts
-    players = df.to_dict(orient="records")
+def player_records(df):
+    """players_query rows -> players.json records."""
+    # Convert to list of dicts (plain Python values, None for NULL)
+    players = frame_records(df.drop(columns=["team_id", "season"], errors="ignore"))
 
-    # Clean up numeric types for JSON
     for p in players:
-        for key, val in p.items():
-            if pd.isna(val):
-                p[key] = None
-            elif hasattr(val, "item"):  # numpy types
-                p[key] = val.item()
         # Calculate xg_assisted (approximate using avg xG of ~0.15 per shot assist)
         shot_assists = p.get("shot_assists", 0) or 0
         p["xg_assisted"] = round(shot_assists * 0.15, 2)
+    return players
 
-    # Save to JSON
-    output_path = os.path.join(DATA_DIR, "players.json")
-    with open(output_path, "w") as f:
-        json.dump(players, f, indent=2)
 
-    print(f"Exported {len(players)} players to {output_path}")
-    return players
+def export_players(conn, team_id):
+    """Sounders players with aggregated stats (saved by main() once assists are added)."""
+    df = read_frame(conn, players_query(team_id))
+    return player_records(df)
 
 
-def export_events(conn, team_id):
-    """Export event coordinates for heat maps."""
+def save_json(manifest, path, records):
+    """Write records through the manifest (skipped when the content is unchanged)."""
+    written = manifest.write(path, records)
+    return path if written else f"{path} (unchanged)"
+
 
-    query = f"""
+def events_query(team_id=None):
+    """Heat map events for one team, or every team when team_id is None."""
+    team_filter = f"team_id = '{team_id}'\n      AND " if team_id else ""
+    return f"""
     SELECT
+        team_id,
         player_id,
         match_id,
         minute,
@@ -171,36 +282,68 @@ def export_events(conn, team_id):
         COALESCE(is_shot, false) as is_shot,
         COALESCE(is_blocked, false) as is_blocked
     FROM match_event
-    WHERE team_id = '{team_id}'
-      AND type_display_name IN ('Pass', 'Reception', 'Carry', 'Shot', 'MissedShots', 'SavedShot', 'ShotOnPost', 'Goal', 'Tackle', 'Interception', 'Clearance', 'BallRecovery')
+    WHERE {team_filter}type_display_name IN ('Pass', 'Reception', 'Carry', 'Shot', 'MissedShots', 'SavedShot', 'ShotOnPost', 'Goal', 'Tackle', 'Interception', 'Clearance', 'BallRecovery')
       AND x IS NOT NULL
       AND y IS NOT NULL
     """
 
-    df = pd.read_sql(query, conn)
 
-    # Convert to list of dicts
-    events = df.to_dict(orient="records")
-
-    # Clean up numeric types
-    for e in events:
-        for key, val in e.items():
-            if pd.isna(val):
-                e[key] = None
-            elif hasattr(val, "item"):
-                e[key] = val.item()
-
-    # Save to JSON
-    output_path = os.path.join(DATA_DIR, "events.json")
-    with open(output_path, "w") as f:
-        json.dump(events, f, indent=2)
-
-    print(f"Exported {len(events)} events to {output_path}")
-    return events
+def export_events(conn, team_id):
+    """Event coordinates for heat maps."""
+    df = read_frame(conn, events_query(team_id))
+
+    # Convert to list of dicts (plain Python values, None for NULL)
+    return frame_records(df.drop(columns=["team_id"]))
+
+
+def match_id_values(series):
+    """Match ids as exported: numeric ids become strings, text ids stay as they are."""
+    if pd.api.types.is_numeric_dtype(series):
+        return [None if v is None else str(v) for v in column_values(series)]
+    return column_values(series)
+
+
+def match_records(df, is_home):
+    """matches rows (match_id, home/away team names, match_date) -> matches.json records,
+    given a boolean Series saying which rows the exported team played at home."""
+    opponent = df['away_team_name'].where(is_home, df['home_team_name'])
+    venue = np.where(is_home, 'vs', '@')
+
+    # Format date
+    if pd.api.types.is_datetime64_any_dtype(df['match_date']):
+        start_date = df['match_date'].dt.strftime('%m/%d/%Y')
+    else:
+        start_date = df['match_date'].map(
+            lambda d: d.strftime('%m/%d/%Y') if hasattr(d, 'strftime') else str(d),
+            na_action='ignore',
+        )
+
+    return [
+        {'match_id': match_id, 'opponent': opp, 'venue': ven, 'start_date': date}
+        for match_id, opp, ven, date in zip(
+            match_id_values(df['match_id']),
+            column_values(opponent),
+            venue.tolist(),
+            column_values(start_date),
+        )
+    ]
+
+
+def placeholder_match_records(match_ids):
+    """Records for matches missing from the matches table (ids sorted newest first)."""
+    return [
+        {
+            'match_id': match_id,
+            'opponent': 'Opponent',
+            'venue': 'vs',
+            'start_date': f"Game {len(match_ids) - i}"
+        }
+        for i, match_id in enumerate(match_id_values(match_ids))
+    ]
 
 
 def export_matches(conn, team_id):
-    """Export match information (opponent and date) for Sounders games."""
+    """Match information (opponent and date) for Sounders games."""
 
     # Get match data from matches table
     # Schema: match_id, home_team_name, away_team_name, match_date
@@ -217,39 +360,15 @@ def export_matches(conn, team_id):
     """
 
     try:
-        df = pd.read_sql(query, conn)
-
-        # Process rows to determine opponent and venue
-        matches = []
-        for _, row in df.iterrows():
-            match_id = row['match_id']
-            home = row['home_team_name']
-            away = row['away_team_name']
-            match_date = row['match_date']
-
-            # Determine if Seattle is home or away
-            is_home = 'seattle' in str(home).lower()
-            opponent = away if is_home else home
-            venue = 'vs' if is_home else '@'
-
-            # Format date
-            if pd.notna(match_date):
-                if hasattr(match_date, 'strftime'):
-                    date_str = match_date.strftime('%m/%d/%Y')
-                else:
-                    date_str = str(match_date)
-            else:
-                date_str = None
-
-            matches.append({
-                'match_id': str(match_id) if hasattr(match_id, 'item') else match_id,
-                'opponent': opponent,
-                'venue': venue,
-                'start_date': date_str
-            })
+        df = read_frame(conn, query)
+
+        # Determine if Seattle is home or away
+        is_home = df['home_team_name'].astype(str).str.lower().str.contains('seattle', regex=False)
+        matches = match_records(df, is_home)
 
     except Exception as ex:
         print(f"Matches table query failed: {ex}")
+        conn.rollback()  # Postgres refuses further queries in the failed transaction
         # Fallback - get match IDs from events
         query = f"""
         SELECT DISTINCT match_id
@@ -257,22 +376,9 @@ def export_matches(conn, team_id):
         WHERE team_id = '{team_id}'
         ORDER BY match_id DESC
         """
-        df = pd.read_sql(query, conn)
-        matches = []
-        for i, row in df.iterrows():
-            matches.append({
-                'match_id': str(row['match_id']) if hasattr(row['match_id'], 'item') else row['match_id'],
-                'opponent': 'Opponent',
-                'venue': 'vs',
-                'start_date': f"Game {len(df) - i}"
-            })
-
-    # Save to JSON
-    output_path = os.path.join(DATA_DIR, "matches.json")
-    with open(output_path, "w") as f:
-        json.dump(matches, f, indent=2)
+        df = read_frame(conn, query)
+        matches = placeholder_match_records(df['match_id'])
 
-    print(f"Exported {len(matches)} matches to {output_path}")
     return matches
 
 
@@ -319,33 +425,219 @@ def calculate_assists_from_events(events, players):
     return players
 
 
-def main():
-    print("Connecting to database...")
-    conn = psycopg2.connect(**DB_CONFIG)
+def player_seasons(player_ids):
+    """Season of each row, from the player_id suffix (NaN when there is none)."""
+    return player_ids.astype(str).str.extract(SEASON_PATTERN, expand=False)
+
+
+def normalize_team_name(name):
+    """Accent-stripped, lower-case team name with punctuation collapsed."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text.casefold()).strip()
+
+
+def team_ids_by_name(teams):
+    """{normalized name: team_id} for the teams table (names two teams share are left out)."""
+    ids = {}
+    for team_id, name in zip(teams['team_id'].astype(str), column_values(teams['name'])):
+        key = normalize_team_name(name)
+        ids[key] = None if key in ids else team_id
+    return {key: team_id for key, team_id in ids.items() if team_id is not None}
+
+
+def add_match_team_ids(matches, teams):
+    """Add home_team_id/away_team_id to matches by exact normalized name (None when no
+    team has the name). Returns the names that matched no team."""
+    ids = team_ids_by_name(teams)
+    unknown = set()
+    for side in ("home", "away"):
+        names = matches[f'{side}_team_name']
+        matches[f'{side}_team_id'] = names.map(lambda name: ids.get(normalize_team_name(name)))
+        unknown.update(column_values(names[matches[f'{side}_team_id'].isna()]))
+    return sorted(unknown, key=str)
+
+
+def team_matches(matches, team_id, match_ids):
+    """The matches in match_ids that team_id played, and the ids of those that name
+    neither side as team_id."""
+    played = matches[matches['match_id'].isin(match_ids)]
+    ours = (played['home_team_id'] == team_id) | (played['away_team_id'] == team_id)
+    return played[ours], match_id_values(played['match_id'][~ours])
+
+
+def write_team_partition(out_dir, team_id, players_df, events_df, matches_df, previous_hashes):
+    """Write one team-season's players/events/matches JSON. Runs in a worker process.
 
+    matches_df holds just this team's matches (with home_team_id). It is None when
+    there are none to use (no matches table, or no match names the team), and then
+    placeholder records are written for the events' matches. Files whose content
+    hash matches previous_hashes (name -> sha256) are left alone. Returns the
+    record counts and the write_if_changed result per file.
+    """
+    players = player_records(players_df)
+    events = frame_records(events_df.drop(columns=["team_id", "season"]))
+
+    if matches_df is not None:
+        played = matches_df.sort_values('match_date', ascending=False, kind='stable')
+        matches = match_records(played, played['home_team_id'] == team_id)
+    else:
+        match_ids = events_df['match_id'].drop_duplicates()
+        matches = placeholder_match_records(match_ids.sort_values(ascending=False))
+
+    players = calculate_assists_from_events(events, players)
+
+    os.makedirs(out_dir, exist_ok=True)
+    results = {}
+    for name, records in (("players", players), ("events", events), ("matches", matches)):
+        results[name] = write_if_changed(
+            os.path.join(out_dir, f"{name}.json"), records,
+            previous_hashes.get(name), need_parts=previous_hashes.get(name) is None,
+        )
+    return (len(players), len(events), len(matches)), results
+
+
+def league_matches(conn):
+    """Every match (None if the matches table can't be read)."""
     try:
-        # Get Sounders team ID
-        team_id = get_sounders_team_id(conn)
+        return read_frame(conn, "SELECT match_id, home_team_name, away_team_name, match_date FROM matches")
+    except Exception as ex:
+        print(f"Matches table query failed: {ex}")
+        return None
+
+
+def export_league(pool, manifest):
+    """Export every team, one query per table, partitioned into LEAGUE_DIR/<season>/<team_id>/."""
+    print("Extracting league teams, players, events and matches...")
+    frames = extract_concurrently(pool, {
+        "teams": (read_frame, "SELECT team_id, name FROM teams"),
+        "players": (read_frame, players_query()),
+        "events": (read_frame, events_query()),
+        "matches": (league_matches,),
+    })
+    teams, players, events, matches = (frames[name] for name in ("teams", "players", "events", "matches"))
+    team_names = dict(zip(teams['team_id'].astype(str), column_values(teams['name'])))
+    print(f"Found {len(team_names)} teams")
+
+    for df in (players, events):
+        df['team_id'] = df['team_id'].astype(str)
+        df['season'] = player_seasons(df['player_id'])
+    unseasoned = int(players['season'].isna().sum() + events['season'].isna().sum())
+    if unseasoned:
+        print(f"Skipping {unseasoned} rows without a season in their player_id")
+    if matches is not None:
+        unknown_names = add_match_team_ids(matches, teams)
+        if unknown_names:
+            print(f"Team names in matches that match no single team: {unknown_names}")
+
+    player_parts = dict(list(players.dropna(subset=['season']).groupby(['team_id', 'season'])))
+    event_parts = dict(list(events.dropna(subset=['season']).groupby(['team_id', 'season'])))
+    keys = sorted(set(player_parts) | set(event_parts))
+    print(f"\nWriting {len(keys)} team-season partitions with {LEAGUE_WORKERS} workers...")
+
+    index = []
+    written = 0
+    unmatched = {}   # (team_id, season) -> match ids naming neither side as the team
+    with ProcessPoolExecutor(max_workers=LEAGUE_WORKERS) as workers:
+        futures = {}
+        for team_id, season in keys:
+            out_dir = os.path.join(LEAGUE_DIR, season, team_id)
+            previous_hashes = {
+                name: manifest.known_hash(os.path.join(out_dir, f"{name}.json"))
+                for name in ("players", "events", "matches")
+            }
+            event_part = event_parts.get((team_id, season), events.iloc[0:0])
+            team_played = None
+            if matches is not None:
+                team_played, unmatched_ids = team_matches(matches, team_id, event_part['match_id'])
+                if unmatched_ids:
+                    unmatched[(team_id, season)] = unmatched_ids
+                if team_played.empty:
+                    # No match names the team (e.g. its matches name differs from teams.name):
+                    # placeholder records still give the app its match ids
+                    team_played = None
+            futures[(team_id, season)] = workers.submit(
+                write_team_partition,
+                out_dir,
+                team_id,
+                player_parts.get((team_id, season), players.iloc[0:0]),
+                event_part,
+                team_played,
+                previous_hashes,
+            )
+        for (team_id, season), future in futures.items():
+            (n_players, n_events, n_matches), results = future.result()
+            out_dir = os.path.join(LEAGUE_DIR, season, team_id)
+            for name, result in results.items():
+                manifest.record(os.path.join(out_dir, f"{name}.json"), result, season)
+            written += sum(result["written"] for result in results.values())
+            index.append({
+                'season': season,
+                'team_id': team_id,
+                'team_name': team_names.get(team_id),
+                'path': os.path.join(season, team_id),
+                'players': n_players,
+                'events': n_events,
+                'matches': n_matches,
+            })
+
+    manifest.write(os.path.join(LEAGUE_DIR, "index.json"), index)
+
+    if unmatched:
+        print("\nMatches naming neither side as the team (left out of matches.json, or written as "
+              "placeholders when none of the team's matches name it):")
+        for (team_id, season), match_ids in sorted(unmatched.items()):
+            print(f"  {season} {team_names.get(team_id, team_id)} ({team_id}): {match_ids}")
 
-        # Export data
-        print("\nExporting player data...")
-        players = export_players(conn, team_id)
+    print("\n" + "="*50)
+    print("League export complete!")
+    print(f"Partitions: {len(index)} ({len({e['team_id'] for e in index})} teams, "
+          f"seasons {', '.join(sorted({e['season'] for e in index}))})")
+    print(f"Files written: {written} of {3 * len(index)} (the rest were unchanged)")
+    print(f"Players: {sum(e['players'] for e in index)}")
+    print(f"Events: {sum(e['events'] for e in index)}")
+    print("="*50)
 
-        print("\nExporting event data for heat maps...")
-        events = export_events(conn, team_id)
 
-        print("\nExporting match data...")
-        matches = export_matches(conn, team_id)
+def main():
+    print("Connecting to database...")
+    pool = connection_pool()
+    manifest = DataManifest(DATA_DIR)
+
+    try:
+        if LEAGUE_MODE:
+            export_league(pool, manifest)
+            manifest.save()
+            return
+
+        # Get Sounders team ID
+        with pooled_connection(pool) as conn:
+            team_id = get_sounders_team_id(conn)
+
+        # Extract data (the three queries run at the same time)
+        print("\nExtracting players, events and matches...")
+        start = time.time()
+        extracted = extract_concurrently(pool, {
+            "players": (export_players, team_id),
+            "events": (export_events, team_id),
+            "matches": (export_matches, team_id),
+        })
+        players, events, matches = extracted["players"], extracted["events"], extracted["matches"]
+        print(f"Extracted in {time.time() - start:.1f}s")
 
         # Calculate assists from events (is_shotassist where next shot is assisted goal)
         print("\nCalculating assists from events...")
         players = calculate_assists_from_events(events, players)
 
-        # Re-save players with corrected assists
-        output_path = os.path.join(DATA_DIR, "players.json")
-        with open(output_path, "w") as f:
-            json.dump(players, f, indent=2)
-        print(f"Updated players with calculated assists")
+        # Save each file once, after all derivations
+        print("\nSaving...")
+        for name, records in (("players", players), ("matches", matches)):
+            output_path = save_json(manifest, os.path.join(DATA_DIR, f"{name}.json"), records)
+            print(f"Saved {len(records)} {name} to {output_path}")
+
+        # Events are saved sorted, with their render-ready columns (see event_columns)
+        events = save_event_data(manifest, DATA_DIR, "", events, matches)
+        print(f"Saved {len(events)} events and their derived columns to {DATA_DIR}")
 
         print("\n" + "="*50)
         print("Export complete!")
@@ -353,9 +645,10 @@ def main():
         print(f"Events: {len(events)}")
         print(f"Matches: {len(matches)}")
         print("="*50)
+        manifest.save()
 
     finally:
-        conn.close()
+        pool.closeall()
 
 
 if __name__ == "__main__":
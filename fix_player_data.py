@@ -1,17 +1,33 @@
 """
-Fix player data for 2024 and 2025 seasons.
+Fix player data for the 2024, 2025 and 2026 seasons.
 Ensures all players have correct image_url, nationality, salary from ASA,
 and MLS stats (GP, GS, Mins) from the correct season.
 
-Run: python fix_player_data.py
+Seasons are refreshed as a pipeline: the ASA and MLS fetches for every season
+run concurrently (sharing a small pool of headless Chrome instances and
+asa_cache's cached league tables), and each season is matched and written as
+soon as its data is in. Players files are only rewritten when their content
+changed; the changed players are listed in data/changes.json (see data_manifest).
+MLS pages are read from mls_scraper's snapshot cache, so Chrome only starts
+for seasons whose snapshot is missing or stale.
+
+Run: python fix_player_data.py [season ...]
 """
 
 import json
 import os
+import queue
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import pandas as pd
-from thefuzz import fuzz
-import unicodedata
+
+from asa_cache import team_salaries
+from data_manifest import DataManifest
+from mls_scraper import get_mls_stats_with_images, needs_browser, new_chrome_driver
+from name_matching import NameMatcher, normalize_name
 
 # ========== CONFIGURATION ==========
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
@@ -20,6 +36,11 @@ CLUB_SLUG = "seattle-sounders-fc"
 # ASA team ID for Seattle Sounders
 SEATTLE_ASA_TEAM_ID = 'jYQJ19EqGR'
 
+# Seasons refreshed by main() and pipeline sizing
+SEASONS = [2024, 2025, 2026]
+MAX_WORKERS = 4          # Concurrent ASA/MLS fetches across all seasons
+BROWSER_POOL_SIZE = 2    # Headless Chrome instances shared between seasons
+
 # Manual name mappings for MLS website -> player_id
 MANUAL_MAPPINGS_2024 = {
     'J. Morris': '313037_(2024)',
@@ -149,6 +170,23 @@ ASA_NAME_TO_DB_2025 = {
     'Travian Sousa': '480643_(2025)',
 }
 
+
+def _for_season(mapping: dict, season: int) -> dict:
+    """Re-key a name -> '<id>_(<year>)' mapping to another season's player_ids."""
+    return {name: player_id.rsplit('_(', 1)[0] + f'_({season})' for name, player_id in mapping.items()}
+
+
+# 2026 carries the 2025 roster forward (players_2026.json uses the same base ids)
+MANUAL_MAPPINGS_2026 = _for_season(MANUAL_MAPPINGS_2025, 2026)
+ASA_NAME_TO_DB_2026 = _for_season(ASA_NAME_TO_DB_2025, 2026)
+
+# season -> (players file, MLS name mappings, ASA name mappings)
+SEASON_FILES = {
+    2024: ("players_2024.json", MANUAL_MAPPINGS_2024, ASA_NAME_TO_DB_2024),
+    2025: ("players.json", MANUAL_MAPPINGS_2025, ASA_NAME_TO_DB_2025),
+    2026: ("players_2026.json", MANUAL_MAPPINGS_2026, ASA_NAME_TO_DB_2026),
+}
+
 # Known nationalities for players
 NATIONALITIES = {
     'Albert Rusnák': 'Slovakia',
@@ -195,134 +233,73 @@ NATIONALITIES = {
 }
 
 
-def normalize_name(name: str) -> str:
-    """Normalize player name for matching."""
-    if not name:
-        return ""
-    name = unicodedata.normalize('NFD', name)
-    name = ''.join(c for c in name if unicodedata.category(c) != 'Mn')
-    return name.lower().strip()
-
-
-def match_player_name(scraped_name: str, players: list, threshold: int = 75) -> dict | None:
-    """Match a scraped player name to players using fuzzy matching."""
-    scraped_normalized = normalize_name(scraped_name)
-
-    best_match = None
-    best_score = 0
-
-    for player in players:
-        db_name = player.get('name', '')
-        db_normalized = normalize_name(db_name)
-
-        score = max(
-            fuzz.ratio(scraped_normalized, db_normalized),
-            fuzz.partial_ratio(scraped_normalized, db_normalized),
-            fuzz.token_sort_ratio(scraped_normalized, db_normalized)
-        )
-
-        if score > best_score:
-            best_score = score
-            best_match = player
-
-    return best_match if best_score >= threshold else None
-
-
-def get_mls_stats_with_images(club_slug: str, season: int) -> pd.DataFrame:
-    """Scrape player stats AND images from MLS website."""
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
-    from io import StringIO
-
-    url = f"https://www.mlssoccer.com/clubs/{club_slug}/stats/#season={season}&statType=general&position=all"
-
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36")
-
-    driver = webdriver.Chrome(options=options)
-
-    try:
-        print(f"  Loading {url}")
-        driver.get(url)
-
-        WebDriverWait(driver, 25).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr"))
-        )
-        time.sleep(3)
-
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-        player_images = {}
-
-        for row in rows:
+class BrowserPool:
+    """Headless Chrome instances reused across seasons, started on first use."""
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE):
+        self.size = size
+        self._idle = queue.Queue()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                start_new = self._idle.empty() and len(self._drivers) < self.size
+                if start_new:
+                    self._drivers.append(None)  # Reserve the slot while Chrome starts
+            if start_new:
+                break
+            driver = self._idle.get()
+            if driver is not None:
+                return driver
+            # None is posted when a slot frees up: go round again and take it
+        try:
+            driver = new_chrome_driver()
+        except Exception:
+            with self._lock:
+                self._drivers.remove(None)
+            self._idle.put(None)
+            raise
+        with self._lock:
+            self._drivers[self._drivers.index(None)] = driver
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._drivers.remove(driver)
+        self._idle.put(None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self):
+        """Borrow a driver; one that raised is replaced instead of reused."""
+        driver = self._acquire()
+        try:
+            yield driver
+        except Exception:
+            self._discard(driver)
+            raise
+        self._idle.put(driver)
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = [d for d in self._drivers if d is not None], []
+        for driver in drivers:
             try:
-                name_cell = row.find_element(By.CSS_SELECTOR, "td:first-child")
-                player_name = name_cell.text.strip()
-
-                try:
-                    img = row.find_element(By.CSS_SELECTOR, "img")
-                    img_url = img.get_attribute("src")
-                    if img_url and "placeholder" not in img_url.lower():
-                        player_images[player_name] = img_url
-                except:
-                    pass
-            except:
-                continue
-
-        html = driver.page_source
-        tables = pd.read_html(StringIO(html))
-
-        if not tables:
-            raise ValueError("No tables found")
-
-        df = tables[0]
-
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = [col[1] if isinstance(col, tuple) else col for col in df.columns]
-
-        result = pd.DataFrame()
-        result["player_name"] = df["Player"]
-        result["gp"] = pd.to_numeric(df["GP"], errors="coerce").fillna(0).astype(int)
-        result["gs"] = pd.to_numeric(df["GS"], errors="coerce").fillna(0).astype(int)
-        result["mins"] = pd.to_numeric(df["Mins"], errors="coerce").fillna(0).astype(int)
-        result["image_url"] = result["player_name"].map(player_images)
-
-        print(f"  Scraped {len(result)} players with {len(player_images)} images")
-        return result
-
-    finally:
-        driver.quit()
+                driver.quit()
+            except Exception:
+                pass
 
 
 def get_asa_salary_data(season: int, asa_name_map: dict) -> dict:
     """Get salary data from American Soccer Analysis for Seattle Sounders."""
-    from itscalledsoccer.client import AmericanSoccerAnalysis
-
     print(f"  Fetching ASA salary data for {season}...")
-    asa = AmericanSoccerAnalysis()
-
-    salary_raw = asa.get_player_salaries(leagues=["mls"], season_name=str(season))
-    salary_df = pd.DataFrame(salary_raw)
-
-    seattle_salaries = salary_df[salary_df['team_id'] == SEATTLE_ASA_TEAM_ID].copy()
-    print(f"  Found {len(seattle_salaries)} Seattle salary records")
-
-    players_df = asa.get_players(leagues=["mls"])
-    merged = seattle_salaries.merge(players_df, on="player_id", how="left")
-
-    merged = merged.groupby("player_name", as_index=False).agg({
-        "base_salary": "max",
-        "guaranteed_compensation": "max",
-        "primary_broad_position": "first",
-        "primary_general_position": "first",
-    })
+    merged = team_salaries(season, SEATTLE_ASA_TEAM_ID)
+    print(f"  [{season}] Found {len(merged)} Seattle players with salary records")
 
     results = {}
     for _, row in merged.iterrows():
@@ -336,53 +313,62 @@ def get_asa_salary_data(season: int, asa_name_map: dict) -> dict:
                 'primary_general_position': row.get('primary_general_position'),
             }
 
-    print(f"  Matched {len(results)} players to database IDs")
+    print(f"  [{season}] Matched {len(results)} players to database IDs")
     return results
 
 
+def fetch_asa(season: int) -> dict:
+    """Step 1: ASA salary/position data for a season ({} on failure)."""
+    try:
+        return get_asa_salary_data(season, SEASON_FILES[season][2])
+    except Exception as e:
+        print(f"  [{season}] Warning: ASA fetch failed: {e}")
+        return {}
+
+
+def fetch_mls(season: int, browsers: BrowserPool = None) -> pd.DataFrame | None:
+    """Step 2: MLS website stats and images for a season (None on failure)."""
+    try:
+        if browsers is None or not needs_browser(CLUB_SLUG, season):
+            return get_mls_stats_with_images(CLUB_SLUG, season)
+        with browsers.driver() as driver:
+            return get_mls_stats_with_images(CLUB_SLUG, season, driver=driver)
+    except Exception as e:
+        print(f"  [{season}] Warning: MLS scraping failed: {e}")
+        return None
+
+
 def fix_season_data(season: int):
-    """Fix player data for a specific season."""
+    """Fix player data for a specific season (fetches, then applies)."""
     print(f"\n{'='*60}")
     print(f"Fixing {season} data")
     print('='*60)
 
-    # Determine file names and mappings based on season
-    if season == 2024:
-        players_file = os.path.join(DATA_DIR, "players_2024.json")
-        manual_mappings = MANUAL_MAPPINGS_2024
-        asa_name_map = ASA_NAME_TO_DB_2024
-    else:
-        players_file = os.path.join(DATA_DIR, "players.json")
-        manual_mappings = MANUAL_MAPPINGS_2025
-        asa_name_map = ASA_NAME_TO_DB_2025
+    print("\nStep 1: Fetching ASA salary data...")
+    asa_data = fetch_asa(season)
+    print("\nStep 2: Scraping MLS website...")
+    mls_data = fetch_mls(season)
+    manifest = DataManifest(DATA_DIR)
+    apply_season_data(season, asa_data, mls_data, manifest)
+    manifest.save()
+
+
+def apply_season_data(season: int, asa_data: dict, mls_data: pd.DataFrame | None, manifest: DataManifest):
+    """Steps 3-5: merge fetched ASA/MLS data into a season's players file (written through manifest)."""
+    players_file_name, manual_mappings, _ = SEASON_FILES[season]
+    players_file = os.path.join(DATA_DIR, players_file_name)
 
     # Load existing players
     with open(players_file, 'r') as f:
         players = json.load(f)
 
-    print(f"Loaded {len(players)} players from {players_file}")
+    print(f"\n[{season}] Loaded {len(players)} players from {players_file}")
 
     # Create lookup by player_id
     players_by_id = {p['player_id']: p for p in players}
 
-    # Step 1: Get ASA salary data
-    print("\nStep 1: Fetching ASA salary data...")
-    try:
-        asa_data = get_asa_salary_data(season, asa_name_map)
-    except Exception as e:
-        print(f"  Warning: ASA fetch failed: {e}")
-        asa_data = {}
-
-    # Step 2: Scrape MLS website
-    print("\nStep 2: Scraping MLS website...")
-    try:
-        mls_data = get_mls_stats_with_images(CLUB_SLUG, season)
-    except Exception as e:
-        print(f"  Warning: MLS scraping failed: {e}")
-        mls_data = None
-
     # Step 3: Update player data
-    print("\nStep 3: Updating player data...")
+    print(f"\n[{season}] Step 3: Updating player data...")
     updates_count = 0
 
     # Update from ASA data
@@ -411,17 +397,18 @@ def fix_season_data(season: int):
 
     # Update from MLS data
     if mls_data is not None:
+        # Fuzzy-match every name without a manual mapping in one pass
+        unmapped = [name for name in mls_data['player_name'] if name not in manual_mappings]
+        fuzzy_matches = dict(zip(unmapped, NameMatcher(players, threshold=75).match_many(unmapped)))
+
         for _, row in mls_data.iterrows():
             scraped_name = row['player_name']
 
-            # Try manual mapping first
+            # Try manual mapping first, then fuzzy matching
             player_id = manual_mappings.get(scraped_name)
 
-            if not player_id:
-                # Try fuzzy matching
-                match = match_player_name(scraped_name, players)
-                if match:
-                    player_id = match['player_id']
+            if not player_id and fuzzy_matches.get(scraped_name):
+                player_id = fuzzy_matches[scraped_name]['player_id']
 
             if player_id and player_id in players_by_id:
                 player = players_by_id[player_id]
@@ -446,7 +433,7 @@ def fix_season_data(season: int):
                     updates_count += 1
 
     # Step 4: Fix missing nationalities
-    print("\nStep 4: Fixing missing nationalities...")
+    print(f"\n[{season}] Step 4: Fixing missing nationalities...")
     for player in players:
         if not player.get('nationality'):
             player_name = player.get('name', '')
@@ -458,14 +445,14 @@ def fix_season_data(season: int):
                     break
 
     # Step 5: Save updated data
-    print(f"\nStep 5: Saving {len(players)} players to {players_file}...")
-    with open(players_file, 'w') as f:
-        json.dump(players, f, indent=2)
+    print(f"\n[{season}] Step 5: Saving {len(players)} players to {players_file}...")
+    if not manifest.write(players_file, players, season):
+        print(f"[{season}] No changes - {players_file_name} left as it was")
 
-    print(f"Total updates: {updates_count}")
+    print(f"[{season}] Total updates: {updates_count}")
 
     # Print players with missing data
-    print("\nPlayers still missing data:")
+    print(f"\n[{season}] Players still missing data:")
     for p in players:
         missing = []
         if not p.get('nationality'):
@@ -481,17 +468,58 @@ def fix_season_data(season: int):
             print(f"  {p['name']}: missing {', '.join(missing)}")
 
 
+def refresh_seasons(seasons: list, max_workers: int = MAX_WORKERS, browser_pool_size: int = BROWSER_POOL_SIZE):
+    """Fetch every season's ASA and MLS data concurrently, applying each season as soon as
+    both of its fetches are done. Writes happen one at a time on a single writer thread."""
+    browsers = BrowserPool(browser_pool_size)
+    fetchers = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write")
+    manifest = DataManifest(DATA_DIR)
+    pending = {}
+    lock = threading.Lock()
+
+    def on_fetched(season, source, future):
+        with lock:
+            pending[season][source] = future.result()
+            ready = len(pending[season]) == 2
+        if ready:
+            writes.append(writer.submit(apply_season_data, season,
+                                        pending[season]["asa"], pending[season]["mls"], manifest))
+
+    writes = []
+    try:
+        for season in seasons:
+            pending[season] = {}
+            asa = fetchers.submit(fetch_asa, season)
+            mls = fetchers.submit(fetch_mls, season, browsers)
+            asa.add_done_callback(lambda f, season=season: on_fetched(season, "asa", f))
+            mls.add_done_callback(lambda f, season=season: on_fetched(season, "mls", f))
+        fetchers.shutdown(wait=True)
+        writer.shutdown(wait=True)
+        for write in writes:
+            write.result()  # Surface errors from matching/writing
+        manifest.save()
+    finally:
+        fetchers.shutdown(wait=False)
+        writer.shutdown(wait=False)
+        browsers.close()
+
+
 def main():
+    seasons = [int(arg) for arg in sys.argv[1:]] or SEASONS
+    unknown = [season for season in seasons if season not in SEASON_FILES]
+    if unknown:
+        sys.exit(f"No players file configured for season(s): {unknown}")
+
     print("="*60)
-    print("Fixing Seattle Sounders player data for 2024 and 2025")
+    print(f"Fixing Seattle Sounders player data for {', '.join(map(str, seasons))}")
     print("="*60)
 
-    # Fix both seasons
-    fix_season_data(2024)
-    fix_season_data(2025)
+    start = time.time()
+    refresh_seasons(seasons)
 
     print("\n" + "="*60)
-    print("Done!")
+    print(f"Done in {time.time() - start:.0f}s!")
     print("="*60)
 
 
@@ -0,0 +1,263 @@
+"""
+MLS club stats page scraper with an on-disk snapshot cache.
+
+The stats table on mlssoccer.com is rendered client-side, so getting it still
+takes a headless browser. Every rendered page is saved as a snapshot under
+data/snapshots and all parsing runs from snapshots: Chrome only starts when
+the newest snapshot for a club/season is missing or older than
+SNAPSHOT_MAX_AGE_HOURS. Re-runs and offline work (MLS_SNAPSHOT_ONLY=1) reuse
+the stored pages.
+"""
+
+import glob
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+import pandas as pd
+
+# ========== CONFIGURATION ==========
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "snapshots")
+SNAPSHOT_VERSION = 1             # Bump when the stored payload layout changes
+SNAPSHOT_MAX_AGE_HOURS = float(os.environ.get("MLS_SNAPSHOT_MAX_AGE_HOURS", "24"))
+SNAPSHOT_KEEP = 3                # Snapshots kept per club/season (older ones are pruned)
+SNAPSHOT_ONLY = os.environ.get("MLS_SNAPSHOT_ONLY", "0") == "1"  # Never start a browser
+RENDER_SETTLE_SECS = 3           # Let lazy images fill in after the table appears
+
+
+def stats_url(club_slug: str, season: int) -> str:
+    return f"https://www.mlssoccer.com/clubs/{club_slug}/stats/#season={season}&statType=general&position=all"
+
+
+# ========== BROWSER ==========
+
+def new_chrome_driver():
+    """Start a headless Chrome for scraping."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36")
+    return webdriver.Chrome(options=options)
+
+
+def render_page(url: str, driver=None, timeout: int = 25) -> str:
+    """Load url in Chrome and return the page source once the stats table has rows.
+
+    Pass a driver to reuse a running browser; otherwise one is started and quit afterwards.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    own_driver = driver is None
+    if own_driver:
+        driver = new_chrome_driver()
+
+    try:
+        print(f"  Loading {url}")
+        driver.get(url)
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr"))
+        )
+        time.sleep(RENDER_SETTLE_SECS)
+        return driver.page_source
+    finally:
+        if own_driver:
+            driver.quit()
+
+
+# ========== SNAPSHOTS ==========
+
+def _snapshot_glob(club_slug: str, season: int) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"mls_stats_{club_slug}_{season}_*.json.gz")
+
+
+def save_snapshot(club_slug: str, season: int, url: str, html: str) -> str:
+    """Store a rendered page and prune old snapshots. Returns the snapshot path."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    fetched_at = datetime.now(timezone.utc)
+    path = os.path.join(
+        SNAPSHOT_DIR, f"mls_stats_{club_slug}_{season}_{fetched_at:%Y%m%dT%H%M%S}.json.gz"
+    )
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "url": url,
+        "fetched_at": fetched_at.isoformat(),
+        "html": html,
+    }
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+    for old in sorted(glob.glob(_snapshot_glob(club_slug, season)))[:-SNAPSHOT_KEEP]:
+        os.remove(old)
+    return path
+
+
+def latest_snapshot(club_slug: str, season: int) -> dict | None:
+    """Newest readable snapshot for a club/season in the current format, or None."""
+    for path in sorted(glob.glob(_snapshot_glob(club_slug, season)), reverse=True):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if payload.get("version") == SNAPSHOT_VERSION:
+            payload["path"] = path
+            return payload
+    return None
+
+
+def snapshot_age_hours(snapshot: dict) -> float:
+    fetched_at = datetime.fromisoformat(snapshot["fetched_at"])
+    return (datetime.now(timezone.utc) - fetched_at).total_seconds() / 3600
+
+
+def fresh_snapshot(club_slug: str, season: int, max_age_hours: float = None,
+                   refresh: bool = False) -> dict | None:
+    """Latest snapshot if it can be used as-is (always, in snapshot-only mode), else None."""
+    max_age_hours = SNAPSHOT_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+    snapshot = latest_snapshot(club_slug, season)
+    if snapshot is None:
+        return None
+    if SNAPSHOT_ONLY or (not refresh and snapshot_age_hours(snapshot) <= max_age_hours):
+        return snapshot
+    return None
+
+
+def needs_browser(club_slug: str, season: int, max_age_hours: float = None, refresh: bool = False) -> bool:
+    """Whether load_stats_page would have to render the page."""
+    return not SNAPSHOT_ONLY and fresh_snapshot(club_slug, season, max_age_hours, refresh) is None
+
+
+def load_stats_page(club_slug: str, season: int, driver=None, max_age_hours: float = None,
+                    refresh: bool = False, timeout: int = 25) -> dict:
+    """Snapshot of the club stats page, rendering a fresh one only when needed."""
+    snapshot = fresh_snapshot(club_slug, season, max_age_hours, refresh)
+    if snapshot is not None:
+        print(f"  [{season}] Using snapshot {os.path.basename(snapshot['path'])}")
+        return snapshot
+    if SNAPSHOT_ONLY:
+        raise FileNotFoundError(f"No MLS snapshot for {club_slug} {season} in {SNAPSHOT_DIR}")
+
+    url = stats_url(club_slug, season)
+    html = render_page(url, driver=driver, timeout=timeout)
+    path = save_snapshot(club_slug, season, url, html)
+    print(f"  [{season}] Saved snapshot {os.path.basename(path)}")
+    return latest_snapshot(club_slug, season)
+
+
+# ========== PARSING ==========
+
+class _StatsTableParser(HTMLParser):
+    """Reads the first <table>: its header row, and each body row's cell text and first <img> src.
+
+    The header is the last <thead> row, or (as pd.read_html does) a leading row of
+    only <th> cells when there is no <thead>. Cells spanning several columns
+    are repeated across them; <tfoot> rows are skipped.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.columns = []
+        self.rows = []          # [(cell_texts, img_src or None)]
+        self._table_depth = 0
+        self._tables_seen = 0
+        self._section = None    # "thead", "tbody" or "tfoot"
+        self._cells = None
+        self._all_th = False
+        self._thead_columns = False
+        self._span = 1
+        self._img = None
+        self._text = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._table_depth += 1
+            if self._table_depth == 1:
+                self._tables_seen += 1
+        if self._tables_seen != 1 or self._table_depth != 1:
+            return
+        if tag in ("thead", "tbody", "tfoot"):
+            self._section = tag
+        elif tag == "tr":
+            self._cells, self._img, self._all_th = [], None, True
+        elif tag in ("td", "th") and self._cells is not None:
+            self._text = []
+            self._all_th = self._all_th and tag == "th"
+            span = dict(attrs).get("colspan") or "1"
+            self._span = int(span) if span.isdigit() and int(span) > 0 else 1
+        elif tag == "img" and self._cells is not None and self._img is None:
+            self._img = dict(attrs).get("src")
+
+    def handle_endtag(self, tag):
+        if tag == "table":
+            self._table_depth -= 1
+        if self._tables_seen != 1 or self._table_depth != 1:
+            return
+        if tag in ("thead", "tbody", "tfoot"):
+            self._section = None
+        elif tag in ("td", "th") and self._text is not None:
+            self._cells.extend([" ".join("".join(self._text).split())] * self._span)
+            self._text = None
+        elif tag == "tr" and self._cells is not None:
+            if self._section == "thead":
+                self.columns, self._thead_columns = self._cells, True
+            elif self._all_th and self._cells and not self.rows and not self._thead_columns:
+                self.columns = self._cells
+            elif self._section != "tfoot" and self._cells:
+                self.rows.append((self._cells, self._img))
+            self._cells = None
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+
+def parse_stats_page(html: str, season: int) -> pd.DataFrame:
+    """Stats table (player_name, gp, gs, mins, sub, season, image_url) from a rendered page."""
+    parser = _StatsTableParser()
+    parser.feed(html)
+
+    if not parser.columns or not parser.rows:
+        raise ValueError("No tables found")
+
+    # Short rows are padded (as pd.read_html does); rows wider than the header can't be lined up
+    width = len(parser.columns)
+    rows = [(cells + [None] * (width - len(cells)), src) for cells, src in parser.rows if len(cells) <= width]
+    if len(rows) < len(parser.rows):
+        print(f"  [{season}] Skipped {len(parser.rows) - len(rows)} rows with more cells than the header")
+
+    df = pd.DataFrame([cells for cells, _ in rows], columns=parser.columns)
+
+    result = pd.DataFrame()
+    result["player_name"] = df["Player"]
+    result["gp"] = pd.to_numeric(df["GP"], errors="coerce").fillna(0).astype(int)
+    result["gs"] = pd.to_numeric(df["GS"], errors="coerce").fillna(0).astype(int)
+    result["mins"] = pd.to_numeric(df["Mins"], errors="coerce").fillna(0).astype(int)
+    result["sub"] = pd.to_numeric(df.get("Sub", pd.Series(0, index=df.index)), errors="coerce").fillna(0).astype(int)   # Not on every page
+    result["season"] = season
+    result["image_url"] = [
+        src if src and "placeholder" not in src.lower() else None
+        for _, src in rows
+    ]
+    return result
+
+
+def get_mls_stats_with_images(club_slug: str, season: int, driver=None, timeout: int = 25,
+                              max_age_hours: float = None, refresh: bool = False) -> pd.DataFrame:
+    """Player stats AND images for a club/season, from a snapshot of the MLS website."""
+    snapshot = load_stats_page(club_slug, season, driver=driver, max_age_hours=max_age_hours,
+                               refresh=refresh, timeout=timeout)
+    result = parse_stats_page(snapshot["html"], season)
+    print(f"  [{season}] Scraped {len(result)} players with {result['image_url'].notna().sum()} images")
+    return result
@@ -0,0 +1,137 @@
+"""
+Fuzzy matching of scraped player names against database players.
+
+NameMatcher normalizes every candidate name once, indexes candidates by surname
+token and initials, and scores each scraped name only against the candidates
+sharing a key with it, falling back to the whole list when none of those clear
+the threshold. Scoring uses rapidfuzz's cdist, so names are scored in C rather
+than pair by pair in Python.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+# Surname tokens shorter than this ("de", "la") are too common to block on
+MIN_BLOCK_TOKEN_LEN = 3
+BLOCK_PREFIX_LEN = 4     # Surname prefix key, so 'Musovsky' still meets 'Musovski'
+# (scorer, processor) pairs scoring the same as thefuzz's ratio/partial_ratio/token_sort_ratio
+SCORERS = (
+    (fuzz.ratio, None),
+    (fuzz.partial_ratio, None),
+    (fuzz.token_sort_ratio, utils.default_process),
+)
+ABBREVIATION_SCORE = 95  # 'D. Musovski' vs 'Danny Musovski'
+
+
+@lru_cache(maxsize=None)
+def normalize_name(name: str) -> str:
+    """Normalize player name for matching."""
+    if not name:
+        return ""
+    name = unicodedata.normalize('NFD', name)
+    name = ''.join(c for c in name if unicodedata.category(c) != 'Mn')
+    return name.lower().strip()
+
+
+def name_tokens(normalized: str) -> list:
+    return [t for t in re.split(r"[\s\-.']+", normalized) if t]
+
+
+def block_keys(normalized: str) -> set:
+    """Blocking keys for a normalized name: surname tokens, surname prefix, and initials."""
+    tokens = name_tokens(normalized)
+    if not tokens:
+        return set()
+    surname = tokens[1:] or tokens  # Single names ('Nouhou') block on themselves
+    keys = {t for t in surname if len(t) >= MIN_BLOCK_TOKEN_LEN}
+    keys.add(surname[-1][:BLOCK_PREFIX_LEN] + "*")
+    keys.add(f"{tokens[0][0]}.{tokens[-1][0]}")
+    return keys
+
+
+def expand_abbreviated_name(abbrev_name: str) -> list:
+    """Expand 'D. Musovski' to possible patterns."""
+    parts = abbrev_name.split()
+    if len(parts) >= 2 and len(parts[0]) <= 2 and parts[0].endswith('.'):
+        initial = parts[0].replace('.', '').lower()
+        last_name = ' '.join(parts[1:]).lower()
+        return [initial, last_name]
+    return [abbrev_name.lower()]
+
+
+class NameMatcher:
+    """Matches names to the best-scoring candidate dict (score = max of SCORERS).
+
+    With abbreviations=True, 'X. Lastname' also scores ABBREVIATION_SCORE against
+    any candidate starting with the initial and containing the last name.
+    """
+
+    def __init__(self, candidates: list, key: str = 'name', threshold: int = 75,
+                 abbreviations: bool = False):
+        self.candidates = candidates
+        self.threshold = threshold
+        self.abbreviations = abbreviations
+        self.names = [normalize_name(c.get(key, '') or '') for c in candidates]
+        self.blocks = {}
+        for i, name in enumerate(self.names):
+            for k in block_keys(name):
+                self.blocks.setdefault(k, []).append(i)
+
+    def _block(self, normalized: str) -> list:
+        found = set()
+        for k in block_keys(normalized):
+            found.update(self.blocks.get(k, ()))
+        return sorted(found)
+
+    def _scores(self, queries: list, indices: list, workers: int = 1) -> np.ndarray:
+        """(len(queries), len(indices)) matrix of best scorer results."""
+        choices = [self.names[i] for i in indices]
+        scores = np.zeros((len(queries), len(choices)))
+        for scorer, processor in SCORERS:
+            matrix = process.cdist(queries, choices, scorer=scorer, processor=processor, workers=workers)
+            np.maximum(scores, matrix, out=scores)
+        return np.rint(scores)  # Whole-number scores, like thefuzz
+
+    def _abbreviation_scores(self, raw_name: str, indices: list) -> np.ndarray:
+        parts = expand_abbreviated_name(raw_name)
+        scores = np.zeros(len(indices))
+        if self.abbreviations and len(parts) == 2:
+            initial, last_name = parts
+            for j, i in enumerate(indices):
+                if last_name in self.names[i] and self.names[i].startswith(initial):
+                    scores[j] = ABBREVIATION_SCORE
+        return scores
+
+    def _best(self, raw_name: str, scores: np.ndarray, indices: list) -> dict | None:
+        if not indices:
+            return None
+        scores = np.maximum(scores, self._abbreviation_scores(raw_name, indices))
+        j = int(np.argmax(scores))  # First best, as the old pairwise loop kept
+        return self.candidates[indices[j]] if scores[j] >= self.threshold else None
+
+    def match_many(self, raw_names: list) -> list:
+        """Best candidate (or None) for each name, in order."""
+        results = [None] * len(raw_names)
+        unmatched = []
+        for n, raw_name in enumerate(raw_names):
+            query = normalize_name(raw_name or '')
+            indices = self._block(query)
+            if indices:
+                results[n] = self._best(raw_name, self._scores([query], indices)[0], indices)
+            if results[n] is None:
+                unmatched.append(n)
+
+        if unmatched:
+            # Nothing in the block cleared the threshold: one matrix against everyone
+            everyone = list(range(len(self.candidates)))
+            queries = [normalize_name(raw_names[n] or '') for n in unmatched]
+            matrix = self._scores(queries, everyone, workers=-1)
+            for row, n in enumerate(unmatched):
+                results[n] = self._best(raw_names[n], matrix[row], everyone)
+        return results
+
+    def match(self, raw_name: str) -> dict | None:
+        return self.match_many([raw_name])[0]
@@ -3,19 +3,23 @@ Populate 2024 Sounders player data (salary, mins, gp, gs, image_url) from:
 1. ASA (American Soccer Analysis) - salary and position data
 2. MLS Website - GP, GS, Mins, Sub, and player images
 
-Run: python populate_2024_data.py
+Run: python populate_2024_data.py [--dry-run]
 """
 
+import sys
 import pandas as pd
-import time
-import unicodedata
-from thefuzz import fuzz
 from supabase import create_client
 
+from asa_cache import team_salaries
+from mls_scraper import get_mls_stats_with_images
+from name_matching import NameMatcher
+from supabase_writer import BatchWriter, print_summary
+
 # ========== CONFIGURATION ==========
 SEASON = 2024
 CLUB = "seattle-sounders-fc"
 MATCH_THRESHOLD = 80
+DRY_RUN = "--dry-run" in sys.argv  # Report the changes without writing them
 
 # Supabase credentials
 PROJECT_URL = "https://vvwfcbbyddyodkjuwdbq.supabase.co"
@@ -82,168 +86,16 @@ SEATTLE_ASA_TEAM_ID = 'jYQJ19EqGR'
 # ===================================
 
 
-def normalize_name(name: str) -> str:
-    """Normalize player name for matching."""
-    if not name:
-        return ""
-    name = unicodedata.normalize('NFD', name)
-    name = ''.join(c for c in name if unicodedata.category(c) != 'Mn')
-    return name.lower().strip()
-
-
-def expand_abbreviated_name(abbrev_name: str) -> list:
-    """Expand 'D. Musovski' to possible patterns."""
-    parts = abbrev_name.split()
-    if len(parts) >= 2 and len(parts[0]) <= 2 and parts[0].endswith('.'):
-        initial = parts[0].replace('.', '').lower()
-        last_name = ' '.join(parts[1:]).lower()
-        return [initial, last_name]
-    return [abbrev_name.lower()]
-
-
-def match_player_to_db(scraped_name: str, db_players: list, threshold: int = 80) -> dict | None:
-    """Match a scraped player name to database players using fuzzy matching."""
-    if not db_players:
-        return None
-
-    scraped_normalized = normalize_name(scraped_name)
-    name_parts = expand_abbreviated_name(scraped_name)
-
-    best_match = None
-    best_score = 0
-
-    for player in db_players:
-        db_name = player.get('name', '')
-        db_normalized = normalize_name(db_name)
-
-        score1 = fuzz.ratio(scraped_normalized, db_normalized)
-        score2 = fuzz.partial_ratio(scraped_normalized, db_normalized)
-        score3 = fuzz.token_sort_ratio(scraped_normalized, db_normalized)
-
-        score4 = 0
-        if len(name_parts) == 2:
-            initial, last_name = name_parts
-            db_lower = db_normalized
-            if last_name in db_lower and db_lower.startswith(initial):
-                score4 = 95
-
-        max_score = max(score1, score2, score3, score4)
-
-        if max_score > best_score:
-            best_score = max_score
-            best_match = player
-
-    if best_score >= threshold:
-        return best_match
-
-    return None
-
-
-def get_mls_stats_with_images(club_slug: str, season: int, timeout: int = 25) -> pd.DataFrame:
-    """Scrape player stats AND images from MLS website."""
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
-    from io import StringIO
-
-    url = f"https://www.mlssoccer.com/clubs/{club_slug}/stats/#season={season}&statType=general&position=all"
-
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36")
-
-    driver = webdriver.Chrome(options=options)
-
-    try:
-        print(f"Loading {url}")
-        driver.get(url)
-
-        WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr"))
-        )
-        time.sleep(3)
-
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-        player_images = {}
-
-        for row in rows:
-            try:
-                name_cell = row.find_element(By.CSS_SELECTOR, "td:first-child")
-                player_name = name_cell.text.strip()
-
-                try:
-                    img = row.find_element(By.CSS_SELECTOR, "img")
-                    img_url = img.get_attribute("src")
-                    if img_url and "placeholder" not in img_url.lower():
-                        player_images[player_name] = img_url
-                except:
-                    pass
-            except:
-                continue
-
-        html = driver.page_source
-        tables = pd.read_html(StringIO(html))
-
-        if not tables:
-            raise ValueError("No tables found")
-
-        df = tables[0]
-
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = [col[1] if isinstance(col, tuple) else col for col in df.columns]
-
-        result = pd.DataFrame()
-        result["player_name"] = df["Player"]
-        result["gp"] = pd.to_numeric(df["GP"], errors="coerce").fillna(0).astype(int)
-        result["gs"] = pd.to_numeric(df["GS"], errors="coerce").fillna(0).astype(int)
-        result["mins"] = pd.to_numeric(df["Mins"], errors="coerce").fillna(0).astype(int)
-        result["sub"] = pd.to_numeric(df["Sub"], errors="coerce").fillna(0).astype(int)
-        result["season"] = season
-        result["image_url"] = result["player_name"].map(player_images)
-
-        return result
-
-    finally:
-        driver.quit()
-
-
 def get_asa_salary_data(season: int) -> list:
     """Get salary data from American Soccer Analysis for Seattle Sounders.
 
     Returns a list of dicts with db_player_id, base_salary, and position info.
     """
-    from itscalledsoccer.client import AmericanSoccerAnalysis
-
     print(f"Fetching ASA salary data for {season}...")
-    asa = AmericanSoccerAnalysis()
-
-    # Get salary data for Seattle only
-    salary_raw = asa.get_player_salaries(leagues=["mls"], season_name=str(season))
-    salary_df = pd.DataFrame(salary_raw)
-
-    # Filter to Seattle Sounders
-    seattle_salaries = salary_df[salary_df['team_id'] == SEATTLE_ASA_TEAM_ID].copy()
-    print(f"Found {len(seattle_salaries)} Seattle salary records")
-
-    # Get player info for names and positions
-    players_df = asa.get_players(leagues=["mls"])
 
-    # Merge with player info to get names
-    merged = seattle_salaries.merge(players_df, on="player_id", how="left")
-
-    # Deduplicate - take max salary per player
-    merged = merged.groupby("player_name", as_index=False).agg({
-        "base_salary": "max",
-        "guaranteed_compensation": "max",
-        "primary_broad_position": "first",
-        "primary_general_position": "first",
-    })
+    # Seattle's rows from the cached league salary/player tables, one per player
+    merged = team_salaries(season, SEATTLE_ASA_TEAM_ID)
+    print(f"Found {len(merged)} Seattle players with salary records")
 
     # Map to database player IDs using ASA_NAME_TO_DB_2024
     results = []
@@ -316,6 +168,10 @@ def main():
     unmatched_mls = []
 
     if mls_data is not None:
+        matcher = NameMatcher(season_players, threshold=MATCH_THRESHOLD, abbreviations=True)
+        unmapped = [name for name in mls_data['player_name'] if name not in MANUAL_MAPPINGS_2024]
+        fuzzy_matches = dict(zip(unmapped, matcher.match_many(unmapped)))
+
         for _, row in mls_data.iterrows():
             scraped_name = row['player_name']
 
@@ -334,7 +190,7 @@ def main():
                 })
                 continue
 
-            match = match_player_to_db(scraped_name, season_players, MATCH_THRESHOLD)
+            match = fuzzy_matches.get(scraped_name)
 
             if match:
                 matches.append({
@@ -374,8 +230,7 @@ def main():
     print("Step 4: Uploading to Supabase...")
     print("-"*40)
 
-    updated = 0
-    errors = []
+    writer = BatchWriter(supabase, "players")
 
     for m in matches:
         update_data = {
@@ -387,48 +242,24 @@ def main():
         if m.get('image_url') and pd.notna(m['image_url']):
             update_data['image_url'] = m['image_url']
 
-        # Add salary data if available
-        player_id = m['db_player_id']
-        if player_id in salary_matches:
-            sal_data = salary_matches[player_id]
-            update_data['base_salary'] = sal_data['base_salary']
-            if sal_data.get('primary_broad_position'):
-                update_data['primary_broad_position'] = sal_data['primary_broad_position']
-            if sal_data.get('primary_general_position'):
-                update_data['primary_general_position'] = sal_data['primary_general_position']
-
-        try:
-            supabase.table("players").update(update_data).eq("player_id", player_id).execute()
-            updated += 1
-            print(f"  Updated {player_id} ({m['db_name']}): GP={m['gp']}, GS={m['gs']}, Mins={m['mins']}, Salary={update_data.get('base_salary', 'N/A')}")
-        except Exception as e:
-            errors.append(f"{player_id}: {e}")
-
-    # Also update players that only have salary data (no MLS stats match)
-    matched_ids = {m['db_player_id'] for m in matches}
+        writer.update(m['db_player_id'], update_data)
+
+    # Salary data, including players that have no MLS stats match
     for player_id, sal_data in salary_matches.items():
-        if player_id not in matched_ids:
-            try:
-                update_data = {'base_salary': sal_data['base_salary']}
-                if sal_data.get('primary_broad_position'):
-                    update_data['primary_broad_position'] = sal_data['primary_broad_position']
-                if sal_data.get('primary_general_position'):
-                    update_data['primary_general_position'] = sal_data['primary_general_position']
-
-                supabase.table("players").update(update_data).eq("player_id", player_id).execute()
-                updated += 1
-                print(f"  Updated salary only for {player_id}: Salary={sal_data['base_salary']}")
-            except Exception as e:
-                errors.append(f"{player_id}: {e}")
+        update_data = {'base_salary': sal_data['base_salary']}
+        if sal_data.get('primary_broad_position'):
+            update_data['primary_broad_position'] = sal_data['primary_broad_position']
+        if sal_data.get('primary_general_position'):
+            update_data['primary_general_position'] = sal_data['primary_general_position']
+
+        writer.update(player_id, update_data)
+
+    summary = writer.flush(dry_run=DRY_RUN)
 
     print("\n" + "="*60)
-    print("SUMMARY")
+    print("SUMMARY" + (" (dry run - nothing written)" if DRY_RUN else ""))
     print("="*60)
-    print(f"Total updated: {updated}")
-    if errors:
-        print(f"Errors: {len(errors)}")
-        for e in errors[:5]:
-            print(f"  - {e}")
+    print_summary(summary)
     print("="*60)
 
 
@@ -0,0 +1,174 @@
+"""
+Batched, diffed writes to a Supabase (PostgREST) table.
+
+BatchWriter collects field updates per row, reads the current rows in a few
+chunked selects, and writes the rows whose fields actually changed as bulk
+upserts. An upsert is an INSERT ... ON CONFLICT, so each upserted row is the
+whole current row with the changes applied (NOT NULL columns included), and
+unknown keys are reported and never written, so it can't insert a new row.
+
+Upserts also need INSERT permission. If the table rejects them (e.g. row level
+security allows only UPDATE), the remaining rows are written with update()
+requests instead, one per set of identical new values, filtered with in().
+"""
+
+import math
+
+# ========== CONFIGURATION ==========
+SELECT_CHUNK = 200     # Keys per `in` filter (keeps the request URL short)
+UPSERT_CHUNK = 500     # Rows per bulk upsert request
+UPDATE_CHUNK = 200     # Keys per fallback update's `in` filter
+
+
+def _plain(value):
+    """JSON-safe value: numpy scalars -> Python, NaN -> None."""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _same(old, new) -> bool:
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)) and not isinstance(old, bool):
+        return math.isclose(float(old), float(new), rel_tol=0, abs_tol=1e-9)
+    return old == new
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class BatchWriter:
+    """Queue updates with update(), then flush() them in bulk."""
+
+    def __init__(self, client, table: str, key: str = "player_id"):
+        self.client = client
+        self.table = table
+        self.key = key
+        self.pending = {}       # key value -> {field: new value}
+
+    def update(self, key_value, fields: dict):
+        """Queue new values for a row; later calls for the same row add to earlier ones."""
+        self.pending.setdefault(key_value, {}).update(
+            {field: _plain(value) for field, value in fields.items()}
+        )
+
+    def _current_rows(self) -> dict:
+        """Whole current rows (every column, so upserts carry the NOT NULL ones)."""
+        rows = {}
+        keys = list(self.pending)
+        for chunk in _chunks(keys, SELECT_CHUNK):
+            response = self.client.table(self.table).select("*").in_(self.key, chunk).execute()
+            rows.update({row[self.key]: row for row in response.data})
+        return rows
+
+    def plan(self) -> dict:
+        """Diff queued values against the table: {"changes": {key: {field: (old, new)}}, ...}."""
+        current = self._current_rows()
+
+        changes, missing = {}, []
+        for key_value, update in self.pending.items():
+            row = current.get(key_value)
+            if row is None:
+                missing.append(key_value)
+                continue
+            diff = {
+                field: (row.get(field), value)
+                for field, value in update.items()
+                if not _same(row.get(field), value)
+            }
+            if diff:
+                changes[key_value] = diff
+
+        return {
+            "changes": changes,
+            "unchanged": len(self.pending) - len(changes) - len(missing),
+            "missing": missing,
+            "current": current,
+        }
+
+    def flush(self, dry_run: bool = False) -> dict:
+        """Write every changed field (or just report it, with dry_run). Returns the summary."""
+        plan = self.plan()
+        groups = {}   # column set -> upsert rows (PostgREST needs the same keys on every row)
+        for key_value, diff in plan["changes"].items():
+            row = dict(plan["current"][key_value])
+            row.update({field: new for field, (_, new) in diff.items()})
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        summary = {
+            "queued": len(self.pending),
+            "changed": len(plan["changes"]),
+            "unchanged": plan["unchanged"],
+            "missing": plan["missing"],
+            "field_counts": {},
+            "requests": 0,
+            "written": 0,
+            "errors": [],
+            "upsert_rejected": None,   # Error that switched the writes to update() requests
+            "dry_run": dry_run,
+            "changes": plan["changes"],
+        }
+        for diff in plan["changes"].values():
+            for field in diff:
+                summary["field_counts"][field] = summary["field_counts"].get(field, 0) + 1
+
+        for rows in groups.values():
+            for chunk in _chunks(rows, UPSERT_CHUNK):
+                if dry_run:
+                    summary["requests"] += 1
+                    continue
+                keys = [row[self.key] for row in chunk]
+                if summary["upsert_rejected"] is None:
+                    summary["requests"] += 1
+                    try:
+                        self.client.table(self.table).upsert(chunk, on_conflict=self.key).execute()
+                        summary["written"] += len(chunk)
+                        continue
+                    except Exception as e:
+                        summary["upsert_rejected"] = str(e)
+                self._update_rows(keys, plan["changes"], summary)
+
+        self.pending = {}
+        return summary
+
+    def _update_rows(self, keys: list, changes: dict, summary: dict):
+        """Write rows with update().in_(), one request per set of identical new values."""
+        groups = {}   # (field, new value) pairs -> keys
+        for key_value in keys:
+            values = tuple(sorted((field, new) for field, (_, new) in changes[key_value].items()))
+            groups.setdefault(values, []).append(key_value)
+
+        for values, group_keys in groups.items():
+            for chunk in _chunks(group_keys, UPDATE_CHUNK):
+                summary["requests"] += 1
+                try:
+                    self.client.table(self.table).update(dict(values)).in_(self.key, chunk).execute()
+                    summary["written"] += len(chunk)
+                except Exception as e:
+                    summary["errors"].append(f"{len(chunk)} rows ({', '.join(f for f, _ in values)}): {e}")
+
+
+def print_summary(summary: dict, verbose: bool = True):
+    """Print what flush() did (or would do, for a dry run)."""
+    verb = "Would write" if summary["dry_run"] else "Wrote"
+    if verbose:
+        for key_value, diff in summary["changes"].items():
+            fields = ", ".join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in diff.items())
+            print(f"  {key_value}: {fields}")
+    print(f"Queued rows: {summary['queued']}  changed: {summary['changed']}  "
+          f"unchanged: {summary['unchanged']}  not in table: {len(summary['missing'])}")
+    if summary["field_counts"]:
+        print("Changed fields: " + ", ".join(f"{f}={n}" for f, n in sorted(summary["field_counts"].items())))
+    print(f"{verb} {summary['changed'] if summary['dry_run'] else summary['written']} rows "
+          f"in {summary['requests']} request(s)")
+    if summary["upsert_rejected"]:
+        print(f"Bulk upsert rejected, used update() requests instead: {summary['upsert_rejected']}")
+    if summary["missing"]:
+        print(f"Not in table (skipped): {summary['missing']}")
+    if summary["errors"]:
+        print(f"Errors: {len(summary['errors'])}")
+        for e in summary["errors"][:5]:
+            print(f"  - {e}")